@@ -0,0 +1,102 @@
+# Benchmark recall and latency of collection settings (HNSW, quantisation, on-disk storage) against a local Qdrant
+# Every setting is loaded into a temporary collection, and searched with a range of search time ef values. Recall@k is
+# measured against exact nearest neighbours computed with numpy.
+# Insert project root into the python path.
+import sys
+import os.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import argparse
+import dataclasses
+import time
+from typing import List
+import numpy as np
+from qdrant_client import QdrantClient, models
+from src.config.config_loader import ConfigurationLoader
+from src.database.collection_settings import CollectionSettings
+
+SETTINGS = {
+    'default': CollectionSettings(),
+    'm32': CollectionSettings(hnsw_m=32, hnsw_ef_construct=200),
+    'scalar': CollectionSettings(quantization='scalar', quantization_oversampling=2.0),
+    'scalar-on-disk': CollectionSettings(quantization='scalar', quantization_oversampling=2.0, on_disk_vectors=True,
+                                         hnsw_on_disk=True, on_disk_payload=True),
+    'binary': CollectionSettings(quantization='binary', quantization_oversampling=3.0),
+    'binary-no-rescore': CollectionSettings(quantization='binary', quantization_rescore=False),
+}
+EF_VALUES = [32, 64, 128, 256]
+
+
+def sample_vectors(client: QdrantClient, collection: str, count: int, dimensions: int) -> np.ndarray:
+    """Vectors of the live collection if it has enough of them, clustered random vectors otherwise. Uniform random
+    vectors have no neighbourhood structure and would understate the recall of HNSW."""
+    if client.collection_exists(collection) and client.count(collection, exact=True).count >= count:
+        vectors, offset = [], None
+        while len(vectors) < count:
+            points, offset = client.scroll(collection, limit=1000, offset=offset, with_payload=False,
+                                           with_vectors=True)
+            vectors.extend(point.vector for point in points)
+            if offset is None:
+                break
+        print(f"Using {count} vectors of {collection}")
+        return np.asarray(vectors[:count], dtype=np.float32)
+
+    print(f"Using {count} synthetic vectors")
+    rng = np.random.default_rng(0)
+    centres = rng.normal(size=(max(count // 100, 1), dimensions))
+    vectors = centres[rng.integers(len(centres), size=count)] + 0.3 * rng.normal(size=(count, dimensions))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def load(client: QdrantClient, name: str, settings: CollectionSettings, vectors: np.ndarray) -> float:
+    """Create a collection with the settings, upload the vectors and wait until they are indexed."""
+    if client.collection_exists(name):
+        client.delete_collection(name)
+    client.create_collection(collection_name=name, **settings.create_collection_kwargs(vectors.shape[1]))
+    started = time.perf_counter()
+    client.upload_collection(collection_name=name, vectors=vectors, ids=range(len(vectors)), batch_size=256)
+    while client.get_collection(name).status != models.CollectionStatus.GREEN:
+        time.sleep(0.5)
+    return time.perf_counter() - started
+
+
+def search(client: QdrantClient, name: str, settings: CollectionSettings, queries: np.ndarray, k: int):
+    """Run the queries one by one, returning the ids of the results and the latencies in milliseconds."""
+    ids: List[List[int]] = []
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        points = client.query_points(collection_name=name, query=query.tolist(), limit=k,
+                                     search_params=settings.search_params(), with_payload=False).points
+        latencies.append((time.perf_counter() - started) * 1000)
+        ids.append([point.id for point in points])
+    return ids, np.array(latencies)
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description="Benchmark recall and latency of collection settings")
+    arg_parser.add_argument('--points', type=int, default=100_000)
+    arg_parser.add_argument('--queries', type=int, default=200)
+    arg_parser.add_argument('-k', type=int, default=10)
+    arg_parser.add_argument('--settings', nargs='*', default=list(SETTINGS), choices=list(SETTINGS))
+    args = arg_parser.parse_args()
+
+    conf = ConfigurationLoader().get_config()['database']
+    client = QdrantClient(url=conf['url'], timeout=300)
+    vectors = sample_vectors(client, conf['collection'], args.points + args.queries, conf['embedding_dimensions'])
+    points, queries = vectors[:args.points], vectors[args.points:]
+    # The DOT distance of the collections, exact neighbours by brute force
+    exact = np.argsort(-(queries @ points.T), axis=1)[:, :args.k]
+
+    print(f"{'settings':>18} {'ef':>4} {'recall@' + str(args.k):>9} {'p50 ms':>7} {'p95 ms':>7} {'load s':>7}")
+    for settings_name in args.settings:
+        collection = f"benchmark-{settings_name}"
+        load_seconds = load(client, collection, SETTINGS[settings_name], points)
+        for ef in EF_VALUES:
+            settings = dataclasses.replace(SETTINGS[settings_name], hnsw_ef=ef)
+            # Warm up
+            search(client, collection, settings, queries[:10], args.k)
+            ids, latencies = search(client, collection, settings, queries, args.k)
+            recall = np.mean([len(set(found) & set(truth)) / args.k for found, truth in zip(ids, exact.tolist())])
+            print(f"{settings_name:>18} {ef:>4} {recall:>9.3f} {np.percentile(latencies, 50):>7.2f} "
+                  f"{np.percentile(latencies, 95):>7.2f} {load_seconds:>7.1f}")
+        client.delete_collection(collection)
@@ -0,0 +1,57 @@
+# Benchmark embedding throughput and memory of the SentenceTransformer and the quantised ONNX models on the CPU
+# Insert project root into the python path.
+import sys
+import os.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import random
+import resource
+import time
+from typing import List
+from src.arxiv_agent.ml.embedding_model_base import EmbeddingModel
+from src.arxiv_agent.ml.embedding_model_onnx import EmbeddingOnnx
+from src.arxiv_agent.ml.embedding_model_sentence_transformer import EmbeddingSentenceTransformer
+from src.importer.snapshot import SnapshotReader
+
+CORPUS_SIZE = 2000
+
+WORDS = ("we propose a novel method for learning representations of molecular graphs that outperforms prior work on "
+         "several benchmarks while requiring fewer parameters and less training data than existing approaches").split()
+
+
+def synthetic_abstracts(count: int) -> List[str]:
+    """Abstracts with the skewed length distribution of real ones, from a couple of sentences to a full page."""
+    rng = random.Random(0)
+    return [' '.join(rng.choice(WORDS) for _ in range(int(rng.lognormvariate(5.0, 0.45)))) for _ in range(count)]
+
+
+def max_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def benchmark(name: str, model: EmbeddingModel, texts: List[str]) -> None:
+    # Warm up
+    model.encode_array(texts[:32])
+    started = time.perf_counter()
+    model.encode_array(texts)
+    elapsed = time.perf_counter() - started
+    print(f"{name:>22}: {elapsed:7.1f} s, {len(texts) / elapsed:7.1f} sentences/s, peak RSS {max_rss_mb():.0f} MB")
+
+
+if __name__ == '__main__':
+    # usage: python scripts/benchmark_embedding_backends.py {sentence_transformers|onnx} [snapshot.json[.gz]]
+    # The peak memory of a process covers everything it has loaded, so run each backend in a process of its own.
+    backend = sys.argv[1] if len(sys.argv) > 1 else 'onnx'
+    if len(sys.argv) > 2:
+        abstracts = []
+        for paper in SnapshotReader(sys.argv[2]):
+            abstracts.append(paper['abstract'])
+            if len(abstracts) >= CORPUS_SIZE:
+                break
+    else:
+        abstracts = synthetic_abstracts(CORPUS_SIZE)
+
+    if backend == 'onnx':
+        benchmark('onnx int8', EmbeddingOnnx(), abstracts)
+    else:
+        benchmark('sentence_transformers', EmbeddingSentenceTransformer(), abstracts)
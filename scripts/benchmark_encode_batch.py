@@ -0,0 +1,62 @@
+# Benchmark embedding throughput of fixed size batches in arrival order against length-bucketed token budget batches
+# Insert project root into the python path.
+import sys
+import os.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import random
+import time
+from typing import Callable, List
+import numpy as np
+from src.arxiv_agent.ml.embedding_model_sentence_transformer import EmbeddingSentenceTransformer
+from src.importer.snapshot import SnapshotReader
+
+BATCH_SIZE = 32
+CORPUS_SIZE = 2000
+
+WORDS = ("we propose a novel method for learning representations of molecular graphs that outperforms prior work on "
+         "several benchmarks while requiring fewer parameters and less training data than existing approaches").split()
+
+
+def synthetic_abstracts(count: int) -> List[str]:
+    """Abstracts with the skewed length distribution of real ones, from a couple of sentences to a full page."""
+    rng = random.Random(0)
+    return [' '.join(rng.choice(WORDS) for _ in range(int(rng.lognormvariate(5.0, 0.45)))) for _ in range(count)]
+
+
+def fixed_batches(model: EmbeddingSentenceTransformer, texts: List[str]) -> np.ndarray:
+    """The batching encode_batch did before: windows of BATCH_SIZE texts in arrival order."""
+    return np.concatenate([model.model.encode(texts[i:i + BATCH_SIZE], batch_size=BATCH_SIZE,
+                                               normalize_embeddings=model.normalize)
+                           for i in range(0, len(texts), BATCH_SIZE)])
+
+
+def benchmark(name: str, encode: Callable[[], np.ndarray], count: int) -> np.ndarray:
+    started = time.perf_counter()
+    embeddings = encode()
+    elapsed = time.perf_counter() - started
+    print(f"{name:>14}: {elapsed:7.1f} s, {count / elapsed:7.1f} sentences/s")
+    return embeddings
+
+
+if __name__ == '__main__':
+    # usage: python scripts/benchmark_encode_batch.py [snapshot.json[.gz]]
+    if len(sys.argv) > 1:
+        reader = SnapshotReader(sys.argv[1])
+        abstracts = []
+        for paper in reader:
+            abstracts.append(paper['abstract'])
+            if len(abstracts) >= CORPUS_SIZE:
+                break
+    else:
+        abstracts = synthetic_abstracts(CORPUS_SIZE)
+
+    model = EmbeddingSentenceTransformer()
+    lengths = model.token_lengths(abstracts)
+    print(f"{len(abstracts)} abstracts, {np.mean(lengths):.0f} tokens on average, {max(lengths)} at most, "
+          f"token budget {model.max_batch_tokens}")
+    # Warm up
+    model.encode_array(abstracts[:BATCH_SIZE])
+
+    before = benchmark('fixed batches', lambda: fixed_batches(model, abstracts), len(abstracts))
+    after = benchmark('token budget', lambda: model.encode_array(abstracts), len(abstracts))
+    print(f"largest difference of the embeddings: {np.abs(before - after).max():.2e}")
@@ -0,0 +1,87 @@
+# Benchmark the TeX to text conversion against the earlier regex based implementation
+# Insert project root into the python path.
+import sys
+import os.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import re
+import time
+from typing import Any, Callable, Dict, List
+from src.arxiv_agent.parser.tex_parser import ArxivTexParser
+from src.arxiv_agent.parser.tex_to_text import tex_to_text
+
+ROUNDS = 5
+
+
+def regex_tex_to_text(main_tex: str) -> Dict[str, Any]:
+    """The regex passes ArxivTexParser used before the single pass conversion, for comparison."""
+    text = re.sub(r'%.*$', '', main_tex, flags=re.MULTILINE)
+    text = re.sub(r'\\[a-zA-Z]+(?:\[.*?\])?(?:\{.*?\})?', '', text)
+    text = re.sub(r'\\begin\{equation\*?\}.*?\\end\{equation\*?\}', '', text, flags=re.DOTALL)
+    text = re.sub(r'\$\$.*?\$\$', '', text, flags=re.DOTALL)
+    text = re.sub(r'\$.*?\$', '', text)
+    text = re.sub(r'\s+', ' ', text)
+    return {
+        'sections': re.findall(r'\\(?:section|subsection|subsubsection)\{([^}]+)\}', main_tex),
+        'figures': re.findall(r'\\caption\{([^}]+)\}', main_tex),
+        'equations': re.findall(r'\\begin\{equation\*?\}(.*?)\\end\{equation\*?\}', main_tex, re.DOTALL),
+        'bibliography': re.findall(r'\\bibitem(?:\[[^\]]*\])?\{([^}]+)\}(.*?)(?=\\bibitem|\n\n|$)', main_tex,
+                                   re.DOTALL),
+        'main_text': text.strip(),
+    }
+
+
+PROSE = ("Deep learning models have achieved remarkable results across a wide range of tasks, yet their behaviour "
+         "under distribution shift remains poorly understood. In this work we study the problem in detail and show "
+         "that simple interventions can improve robustness considerably without sacrificing accuracy.\n")
+
+
+def synthetic_document(sections: int = 200) -> str:
+    """A generated paper with the usual mix of text, math, figures, citations and references."""
+    parts = ["\\documentclass{article}\n\\usepackage{amsmath}\n\\begin{document}\n"]
+    for i in range(sections):
+        parts.append(
+            f"\\section{{Section {i}}}\\label{{sec:{i}}}\n" + PROSE * 4 + "\n"
+            "We build on prior work~\\cite{a,b} and show that $f(x) = \\sum_i w_i x_i$ converges "
+            "(see \\emph{Appendix}, \\ref{app}). % reviewer comment\n"
+            "\\begin{equation}\n  \\mathcal{L} = \\frac{1}{N}\\sum_{n=1}^N \\ell(y_n, \\hat{y}_n)\n\\end{equation}\n"
+            "\\begin{figure}[t]\\centering\\includegraphics[width=0.9\\linewidth]{fig.pdf}"
+            f"\\caption{{Results of experiment {i} with \\textbf{{bold}} claims.}}\\end{{figure}}\n\n"
+        )
+    parts.append("\\begin{thebibliography}{9}\n")
+    for i in range(sections):
+        parts.append(f"\\bibitem{{ref{i}}} A. Author. \\newblock Title {i}. \\newblock Venue, 2024.\n")
+    parts.append("\\end{thebibliography}\n\\end{document}\n")
+    return ''.join(parts)
+
+
+def benchmark(name: str, convert: Callable[[], Dict[str, Any]], size: int) -> None:
+    timings: List[float] = []
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        result = convert()
+        timings.append(time.perf_counter() - started)
+    best = min(timings)
+    print(f"{name:>12}: {best * 1000:8.1f} ms, {size / best / 1024 / 1024:6.2f} MB/s, "
+          f"{len(result['main_text'])} chars of text, {len(result['sections'])} sections, "
+          f"{len(result['equations'])} equations, {len(result['bibliography'])} references")
+
+
+if __name__ == '__main__':
+    # usage: python scripts/benchmark_tex_to_text.py [e-print or .tex file ...]
+    if len(sys.argv) > 1:
+        documents = []
+        for path in sys.argv[1:]:
+            with open(path, 'rb') as f:
+                main_name, files = ArxivTexParser._read_sources(f)
+            if main_name is None:
+                print(f"{path}: no main TeX file found, skipped")
+                continue
+            documents.append((path, main_name, files))
+    else:
+        documents = [('synthetic', 'main.tex', {'main.tex': synthetic_document()})]
+
+    for path, main_name, files in documents:
+        size = sum(len(source) for source in files.values())
+        print(f"{path} ({size / 1024:.0f} kB of TeX in {len(files)} files, best of {ROUNDS}):")
+        benchmark('regex', lambda: regex_tex_to_text(files[main_name]), size)
+        benchmark('single pass', lambda: tex_to_text(files[main_name], files, main_name), size)
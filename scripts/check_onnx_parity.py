@@ -0,0 +1,59 @@
+# Compare the embeddings of the quantised ONNX model with the reference SentenceTransformer model
+# Insert project root into the python path.
+import sys
+import os.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import numpy as np
+from src.arxiv_agent.ml.embedding_model_onnx import EmbeddingOnnx
+from src.arxiv_agent.ml.embedding_model_sentence_transformer import EmbeddingSentenceTransformer
+from src.importer.snapshot import SnapshotReader
+
+# Lowest acceptable cosine similarity of a fixture to its reference embedding
+MIN_COSINE = 0.98
+
+FIXTURES = [
+    "graph neural networks",
+    "How do transformers handle long documents?",
+    "Molecular Relational Learning (MRL) is a rapidly growing field that focuses on understanding the interaction "
+    "dynamics between molecules, which is crucial for applications ranging from catalyst engineering to drug "
+    "discovery. Despite recent progress, earlier MRL approaches are limited to using only the 2D topological "
+    "structure of molecules, as obtaining the 3D interaction geometry remains prohibitively expensive.",
+    "We prove that the spectral gap of the Laplacian on a compact Riemannian manifold with Ricci curvature bounded "
+    "below by $K > 0$ satisfies $\\lambda_1 \\geq nK/(n-1)$, and characterise the equality case.",
+    "Large language models (LLMs) can be steered with in-context examples. We study when in-context learning "
+    "recovers gradient descent, and show a construction for linear regression with a single attention layer.",
+    "Reinforcement learning from human feedback; reward model over-optimisation; KL penalty.",
+    "Wir untersuchen die Stabilität numerischer Verfahren für steife Differentialgleichungen.",
+    "Quantum error correction with surface codes below the threshold: a experimental demonstration on 72 qubits "
+    "with logical error rates suppressed by a factor of 2.14 with every increase of the code distance.",
+    "A survey of federated learning: privacy, communication efficiency, heterogeneity and open problems.",
+    "",
+    "Dark matter halo profiles from weak lensing of 10^5 galaxy clusters in DES Y3.",
+    "We release a dataset of 1.2M annotated images of rare plant species together with baselines for fine-grained "
+    "classification, long-tailed recognition and out-of-distribution detection, and discuss annotation noise.",
+]
+
+
+def cosine(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return (a * b).sum(axis=1) / np.maximum(np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1), 1e-12)
+
+
+if __name__ == '__main__':
+    # usage: python scripts/check_onnx_parity.py [snapshot.json[.gz] for 1000 more abstracts]
+    texts = list(FIXTURES)
+    if len(sys.argv) > 1:
+        for paper in SnapshotReader(sys.argv[1]):
+            texts.append(paper['abstract'])
+            if len(texts) >= len(FIXTURES) + 1000:
+                break
+
+    reference = EmbeddingSentenceTransformer(normalize=False).encode_array(texts)
+    quantised = EmbeddingOnnx(normalize=False).encode_array(texts)
+    similarities = cosine(reference, quantised)
+    worst = int(np.argmin(similarities))
+    print(f"{len(texts)} texts: cosine similarity mean {similarities.mean():.4f}, min {similarities.min():.4f} "
+          f"({texts[worst][:60]!r})")
+    if similarities.min() < MIN_COSINE:
+        print(f"FAILED: cosine similarity below {MIN_COSINE}")
+        sys.exit(1)
+    print("OK")
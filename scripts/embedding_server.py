@@ -0,0 +1,33 @@
+# Serve the embedding model to the other processes on this host, see src/arxiv_agent/ml/embedding_server.py
+# Select the server with 'backend: server' in the 'embedding' section of the configuration of the clients.
+# Insert project root into the python path.
+import sys
+import os.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import logging
+from src.arxiv_agent.ml.embedding_cache import CachedEmbeddingModel
+from src.arxiv_agent.ml.embedding_model_factory import create_embedding_model
+from src.arxiv_agent.ml.embedding_server import EmbeddingServer, MicroBatcher
+from src.config.config_loader import ConfigurationLoader
+
+logging.basicConfig(format="%(asctime)s %(name)s - %(levelname)s - %(message)s", level=logging.INFO)
+
+
+if __name__ == '__main__':
+    conf = ConfigurationLoader().get_config().get('embedding_server', {})
+    backend = conf.get('backend', 'sentence_transformers')
+    if backend == 'server':
+        print("The embedding server cannot use the server backend itself")
+        sys.exit(1)
+    model = create_embedding_model(backend)
+    batcher = MicroBatcher(model,
+                           max_batch_texts=conf.get('max_batch_texts', MicroBatcher.DEFAULT_MAX_BATCH_TEXTS),
+                           max_wait_ms=conf.get('max_wait_ms', MicroBatcher.DEFAULT_MAX_WAIT_MS))
+    # The clients cache the embeddings under this name
+    server = EmbeddingServer(batcher, CachedEmbeddingModel.cache_name(model),
+                             host=conf.get('host', EmbeddingServer.DEFAULT_HOST),
+                             port=conf.get('port', EmbeddingServer.DEFAULT_PORT))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
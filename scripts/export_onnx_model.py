@@ -0,0 +1,73 @@
+# Export the SentenceTransformer embedding model to ONNX with dynamically int8 quantised weights, for EmbeddingOnnx
+# Insert project root into the python path.
+import sys
+import os.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import json
+from pathlib import Path
+import torch
+from onnxruntime.quantization import QuantType, quantize_dynamic
+from sentence_transformers import SentenceTransformer
+from src.arxiv_agent.ml.embedding_model_onnx import EmbeddingOnnx
+
+OPSET = 17
+
+
+class Encoder(torch.nn.Module):
+    """The transformer of the model returning its token embeddings, the pooling runs outside the graph."""
+
+    def __init__(self, model: torch.nn.Module):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask, token_type_ids):
+        return self.model(input_ids=input_ids, attention_mask=attention_mask,
+                          token_type_ids=token_type_ids).last_hidden_state
+
+
+def export(model_name: str, output_dir: Path) -> None:
+    st_model = SentenceTransformer(model_name, device='cpu')
+    transformer, pooling = st_model[0], st_model[1]
+    if pooling.pooling_mode_cls_token:
+        mode = 'cls'
+    elif pooling.pooling_mode_mean_tokens:
+        mode = 'mean'
+    else:
+        raise ValueError(f"Unsupported pooling of {model_name}: {pooling.get_pooling_mode_str()}")
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    fp32_path = output_dir / "model_fp32.onnx"
+    sample = st_model.tokenizer(["A sample abstract to trace the graph with."], return_tensors='pt')
+    inputs = (sample['input_ids'], sample['attention_mask'],
+              sample.get('token_type_ids', torch.zeros_like(sample['input_ids'])))
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in ('input_ids', 'attention_mask', 'token_type_ids')}
+    dynamic_axes['last_hidden_state'] = {0: 'batch', 1: 'sequence'}
+    with torch.no_grad():
+        torch.onnx.export(Encoder(transformer.auto_model).eval(), inputs, str(fp32_path),
+                          input_names=['input_ids', 'attention_mask', 'token_type_ids'],
+                          output_names=['last_hidden_state'], dynamic_axes=dynamic_axes, opset_version=OPSET)
+    print(f"Exported {fp32_path} ({fp32_path.stat().st_size / 1e6:.0f} MB)")
+
+    int8_path = output_dir / EmbeddingOnnx.MODEL_FILENAME
+    quantize_dynamic(str(fp32_path), str(int8_path), weight_type=QuantType.QInt8)
+    fp32_path.unlink()
+    print(f"Quantised {int8_path} ({int8_path.stat().st_size / 1e6:.0f} MB)")
+
+    # The fast tokenizer is saved as tokenizer.json, which the tokenizers library reads without transformers
+    st_model.tokenizer.save_pretrained(str(output_dir))
+    config = {
+        'model_name': model_name,
+        'pooling': mode,
+        'max_seq_length': st_model.max_seq_length,
+        'dimensions': st_model.get_sentence_embedding_dimension(),
+        'pad_token_id': st_model.tokenizer.pad_token_id,
+    }
+    with open(output_dir / EmbeddingOnnx.CONFIG_FILENAME, 'w', encoding='utf-8') as f:
+        json.dump(config, f, indent=2)
+    print(f"Wrote {output_dir / EmbeddingOnnx.CONFIG_FILENAME}: {config}")
+
+
+if __name__ == '__main__':
+    # usage: python scripts/export_onnx_model.py [model name [output directory]]
+    name = sys.argv[1] if len(sys.argv) > 1 else "malteos/scincl"
+    export(name, Path(sys.argv[2] if len(sys.argv) > 2 else EmbeddingOnnx.DEFAULT_PATH))
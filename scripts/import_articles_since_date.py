@@ -3,63 +3,72 @@
 import sys
 import os.path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-import json
 from datetime import datetime, timedelta, timezone
 from src.article_registry import ArticleRegistry
-from src.config.config_loader import ConfigurationLoader
-from src.arxiv_agent.ml.embedding_model_sentence_transformer import EmbeddingSentenceTransformer as EmbeddingModel
-from src.arxiv_agent.models.articles import Article
+from src.arxiv_agent.ml.embedding_cache import EmbeddingCache
+from src.arxiv_agent.ml.embedding_model_factory import get_embedding_model
+from src.arxiv_agent.parser.download_cache import DownloadCache
+from src.arxiv_agent.parser.oai_harvester import ArxivOAIHarvester
+from src.arxiv_agent.parser.parse_executor import ParseExecutor
 from src.arxiv_agent.parser.parser import ArxivParser
+from src.arxiv_agent.parser.transport import ArxivTransport
+from src.config.config_loader import ConfigurationLoader
 from src.database.database_client_qdrant import DatabaseClientQdrant as DatabaseClient
+from src.importer.journal import ImportJournal
+from src.importer.pipeline import ImportPipeline
 from typing import Optional
 
 
 def import_articles_since_date(date_and_time: Optional[datetime] = None):
     conf = ConfigurationLoader().get_config()
-    parser = ArxivParser()
+    parse_executor = None
+    if conf.get('importer', {}).get('parse_executor', {}).get('enabled', False):
+        parse_executor = ParseExecutor()
+    parser = ArxivParser(parse_executor=parse_executor)
     article_registry = ArticleRegistry()
-    model = EmbeddingModel()
+    model = get_embedding_model()
     db_client = DatabaseClient.get_instance()
+    journal = ImportJournal.for_registry_root(article_registry.root)
+    harvester = None
+    if conf.get('importer', {}).get('listing_source', 'api') == 'oai':
+        harvester = ArxivOAIHarvester.for_registry_root(article_registry.root)
     if not date_and_time:
-        date_and_time = db_client.get_latest_import_date()
-        date_and_time = date_and_time + timedelta(days=1)
-    while date_and_time < datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0):
-        print(f"Processing {str(date_and_time)} ...")
-        article_dicts = []
-        try:
-            for category in conf['articles']['categories']:
-                print(f"Processing {category} ...")
-                article_dicts.extend(parser.get_daily_papers(date_and_time, category))
-
-            # Clean up duplicates from overlapping categories
-            ids = set()
-            cleaned = []
-            for article_dict in article_dicts:
-                if article_dict['arxiv_id'] not in ids:
-                    ids.add(article_dict['arxiv_id'])
-                    cleaned.append(article_dict)
-            article_dicts = cleaned
-
-            for article_dict in article_dicts:
-                try:
-                    pass
-                    article_directory = article_registry.create_article_dir_from_dict(article_dict)
-                    parser.save_papers([article_dict], str(article_directory))
-                    with open(os.path.join(article_directory, 'article.json')) as f:
-                        data = json.load(f)
-                    article = Article(**data)
-                    embedding = model.encode(article.abstract)
-                    result = db_client.insert([article], [embedding])
-                    print(f"Inserted paper {article_dict['arxiv_id']} with op_info: {result}")
-                except Exception as e:
-                    print(f"Failed to process {article_dict['arxiv_id']}. Exception: {str(e)}")
-                    continue
-
-            print(f"Processing {str(date_and_time)} finished.")
-            date_and_time = date_and_time + timedelta(days=1)
-        except Exception as e:
-            print(f"Failed process batch {str(date_and_time)}. Exception: {str(e)}")
+        # Resume from the first partially imported day, if any
+        date_and_time = journal.get_first_incomplete_day()
+        if not date_and_time and harvester:
+            # Continue after the last harvested day
+            watermark = harvester.get_watermark(conf['articles']['categories'])
+            date_and_time = watermark + timedelta(days=1) if watermark else None
+        if not date_and_time:
+            date_and_time = db_client.get_latest_import_date()
             date_and_time = date_and_time + timedelta(days=1)
+    end = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    print(f"Processing {str(date_and_time)} - {str(end)} ...")
+    pipeline = ImportPipeline(parser, article_registry, model, db_client, journal, lister=harvester)
+    try:
+        stats = pipeline.run(date_and_time, end)
+    finally:
+        if parse_executor:
+            parse_executor.close()
+    for stage, stage_stats in stats.items():
+        print(f"{stage}: processed {stage_stats.processed}, failed {stage_stats.failed}, "
+              f"busy {stage_stats.busy_seconds:.1f}s")
+    routing_stats = parser.stats
+    print(f"routing: downloads {routing_stats.downloads}, parsed {routing_stats.parsed}, failed "
+          f"{routing_stats.failed}, fallbacks {routing_stats.fallbacks}, PDFs from e-print "
+          f"{routing_stats.pdf_from_eprint}")
+    transport_stats = ArxivTransport.get_instance().stats
+    print(f"transport: {transport_stats.requests} requests, {transport_stats.retries} retries, "
+          f"{transport_stats.bytes / 1e6:.1f} MB, sleeping {transport_stats.sleep_seconds:.1f}s, "
+          f"transferring {transport_stats.transfer_seconds:.1f}s")
+    cache = DownloadCache.get_instance()
+    if cache:
+        print(f"download cache: {cache.hits} hits, {cache.misses} misses, {cache.size() / 1e9:.2f} GB")
+    embedding_cache = EmbeddingCache.get_instance()
+    if embedding_cache:
+        print(f"embedding cache: {embedding_cache.hits} hits, {embedding_cache.misses} misses, "
+              f"{embedding_cache.size() / 1e6:.1f} MB")
     print(f"import_articles_since_date finished.")
 
 if __name__ == '__main__':
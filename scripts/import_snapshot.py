@@ -0,0 +1,54 @@
+# Script to seed the database from a local arXiv metadata snapshot, embedding the abstracts of the papers
+# Insert project root into the python path.
+import sys
+import os.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from datetime import datetime, timezone
+from src.article_registry import ArticleRegistry
+from src.arxiv_agent.ml.embedding_cache import EmbeddingCache
+from src.arxiv_agent.ml.embedding_model_factory import get_embedding_model
+from src.arxiv_agent.parser.parser import ArxivParser
+from src.config.config_loader import ConfigurationLoader
+from src.database.database_client_qdrant import DatabaseClientQdrant as DatabaseClient
+from src.importer.journal import ImportJournal
+from src.importer.pipeline import ImportPipeline
+from src.importer.snapshot import SnapshotReader
+from typing import Optional
+
+
+def import_snapshot(path: str, start: Optional[datetime] = None, end: Optional[datetime] = None):
+    conf = ConfigurationLoader().get_config()
+    categories = conf.get('articles', {}).get('categories')
+    reader = SnapshotReader(path, categories, start, end)
+    article_registry = ArticleRegistry()
+    journal = ImportJournal.for_registry_root(article_registry.root)
+    model = get_embedding_model()
+    db_client = DatabaseClient.get_instance()
+    pipeline = ImportPipeline(ArxivParser(), article_registry, model, db_client, journal)
+
+    print(f"Importing {path} ({str(start)} - {str(end)}) ...")
+    # Snapshots are large, the collection is indexed once at the end
+    with db_client.bulk_load():
+        stats = pipeline.run_snapshot(reader)
+    for stage, stage_stats in stats.items():
+        print(f"{stage}: processed {stage_stats.processed}, failed {stage_stats.failed}, "
+              f"busy {stage_stats.busy_seconds:.1f}s")
+    reader_stats = reader.stats
+    print(f"snapshot: {reader_stats.lines} lines, {reader_stats.matched} matching papers, {reader_stats.invalid} "
+          f"invalid records, {reader_stats.unsupported_ids} old style ids skipped")
+    embedding_cache = EmbeddingCache.get_instance()
+    if embedding_cache:
+        print(f"embedding cache: {embedding_cache.hits} hits, {embedding_cache.misses} misses, "
+              f"{embedding_cache.size() / 1e6:.1f} MB")
+    print(f"import_snapshot finished.")
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("usage: python scripts/import_snapshot.py <snapshot.json[.gz]> [<YYYY-MM-DD> [<YYYY-MM-DD>]]")
+        sys.exit(1)
+    try:
+        dates = [datetime.strptime(arg, "%Y-%m-%d").replace(tzinfo=timezone.utc) for arg in sys.argv[2:4]]
+    except ValueError:
+        print("Invalid date format. Use YYYY-MM-DD.")
+        sys.exit(1)
+    import_snapshot(sys.argv[1], *dates)
@@ -0,0 +1,30 @@
+# Re-embed the article collection (and the chunk collection if chunking is enabled) with the current embedding model
+# into a new version of it, and switch the configured collection name to the new version when done.
+# An interrupted reindex continues where it stopped when the script is run again.
+# Insert project root into the python path.
+import sys
+import os.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import logging
+from src.arxiv_agent.ml.embedding_model_factory import get_embedding_model
+from src.config.config_loader import ConfigurationLoader
+from src.database.database_client_qdrant import DatabaseClientQdrant as DatabaseClient
+from src.database.reindex import Reindexer
+
+logging.basicConfig(format="%(asctime)s %(name)s - %(levelname)s - %(message)s", level=logging.INFO)
+
+
+if __name__ == '__main__':
+    # usage: python scripts/reindex.py [--delete-old] [--replace-collection]
+    # --replace-collection reindexes a collection created before collections were addressed by aliases. It is deleted
+    # right before the switch, and searches fail for the moment in between.
+    delete_old = '--delete-old' in sys.argv[1:]
+    replace_collection = '--replace-collection' in sys.argv[1:]
+    conf = ConfigurationLoader().get_config()
+    reindexer = Reindexer(DatabaseClient.get_instance(), get_embedding_model(), conf['articles']['download_location'],
+                          batch_size=conf.get('reindex', {}).get('batch_size', Reindexer.DEFAULT_BATCH_SIZE))
+    stats = [reindexer.reindex_articles(delete_old=delete_old, replace_collection=replace_collection)]
+    if conf.get('chunks', {}).get('enabled', False):
+        stats.append(reindexer.reindex_chunks(delete_old=delete_old, replace_collection=replace_collection))
+    for s in stats:
+        print(f"{s.source} -> {s.target}: {s.points} points in {s.seconds / 60:.1f} min")
@@ -1,12 +1,12 @@
 # Query articles from project database
 import sys
-from src.arxiv_agent.ml.embedding_model_sentence_transformer import EmbeddingSentenceTransformer as EmbeddingModel
+from src.arxiv_agent.ml.embedding_model_factory import get_embedding_model
 from src.database.database_client_qdrant import DatabaseClientQdrant as Client
 
 
 def search_papers(query):
     db_client = Client.get_instance()
-    embedding_model = EmbeddingModel()
+    embedding_model = get_embedding_model()
     query_embedding = embedding_model.encode(query)
     return db_client.search(query_embedding, limit=5)
 
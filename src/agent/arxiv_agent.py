@@ -1,7 +1,8 @@
 import logging
 import random
 from agent_framework import AgentFramework
-from src.arxiv_agent.ml.embedding_model_sentence_transformer import EmbeddingSentenceTransformer as Embedding
+from src.arxiv_agent.ml.embedding_model_factory import preload_embedding_model
+from src.arxiv_agent.ml.model_registry import ModelRegistry
 from src.database.database_client_qdrant import DatabaseClientQdrant as DatabaseClient
 
 
@@ -19,7 +20,8 @@ def weather_forecast(location: str = None) -> str:
     response = responses[random.randrange(0,4)]
     return response
 
-embedding_model = Embedding()
+# The database client embeds the queries with the shared embedding model, which loads while the LLM loads below
+preload_embedding_model()
 
 database_client = DatabaseClient.get_instance()
 
@@ -45,8 +47,11 @@ if False:
 # Transformers
 if True:
     from transformers import pipeline
-    toolpipe = pipeline("text-generation", model="/Users/henrikynsilehto/models/Llama-3-Groq-8B-Tool-Use")
-    pipe = pipeline("text-generation", model="/Users/henrikynsilehto/models/Llama-3-Groq-8B-Tool-Use")
+    llm_path = "/Users/henrikynsilehto/models/Llama-3-Groq-8B-Tool-Use"
+    # The tool calls and the answers use the same model, so they share one pipeline
+    pipe = ModelRegistry.get_instance().get(('text-generation', llm_path),
+                                            lambda: pipeline("text-generation", model=llm_path))
+    toolpipe = pipe
     main_model = None
     tool_model = None
     main_tokenizer = None
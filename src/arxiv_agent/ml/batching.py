@@ -0,0 +1,35 @@
+"""
+Batching of texts for transformer models. A batch is padded to its longest text, so batching texts of similar length
+together and limiting the padded size of a batch instead of its count keeps the padding waste small and the batches
+of long texts from growing too large.
+"""
+from typing import List, Sequence
+
+# Padded tokens of a batch, small enough to keep the attention activations of 512 token texts modest on a CPU
+DEFAULT_MAX_BATCH_TOKENS = 8192
+
+
+def token_budget_batches(lengths: Sequence[int], max_tokens: int) -> List[List[int]]:
+    """
+    Group texts into batches of similar length whose padded size stays within a token budget.
+
+    Args:
+        lengths: Token count of every text
+        max_tokens: Largest padded size of a batch, i.e. its longest text times its number of texts. A text longer
+            than the budget gets a batch of its own.
+
+    Returns:
+        List[List[int]]: Indices of the texts of every batch, longest texts first
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i], reverse=True)
+    batches: List[List[int]] = []
+    batch: List[int] = []
+    for i in order:
+        # Texts come longest first, so the first text of a batch is the one it is padded to
+        if batch and max(lengths[batch[0]], 1) * (len(batch) + 1) > max_tokens:
+            batches.append(batch)
+            batch = []
+        batch.append(i)
+    if batch:
+        batches.append(batch)
+    return batches
@@ -0,0 +1,92 @@
+"""
+Chunking of article full texts for embedding. The main text is split at the section headings found by the parsers,
+and every section into overlapping windows of words, so that passages deep in a paper can be found by semantic
+search and not only its abstract. Words stand in for model tokens, a window of 200 words is roughly 250-300 tokens of
+scientific English and stays within the 512 token limit of BERT sized models.
+"""
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+from src.arxiv_agent.models.articles import Article
+from src.config.config_loader import ConfigurationLoader
+
+
+@dataclass(frozen=True)
+class Chunk:
+    """Passage of the main text of an article."""
+    arxiv_id: str
+    index: int
+    section: str
+    text: str
+
+
+class Chunker:
+    """Splits the main texts of articles into chunks by section and overlapping word windows."""
+
+    DEFAULT_WORDS = 200
+    DEFAULT_OVERLAP_WORDS = 40
+    DEFAULT_MAX_CHUNKS = 64
+    # Sections shorter than this are merged into the next chunk instead of becoming chunks of their own
+    MIN_WORDS = 20
+
+    def __init__(self, words: int = DEFAULT_WORDS, overlap_words: int = DEFAULT_OVERLAP_WORDS,
+                 max_chunks: int = DEFAULT_MAX_CHUNKS):
+        """
+        Initialise the chunker.
+
+        Args:
+            words: Number of words of a chunk
+            overlap_words: Number of words consecutive chunks of a section share
+            max_chunks: Largest number of chunks of an article, which keeps the size of the index predictable. The
+                chunks at the start of the text are kept.
+        """
+        if not 0 <= overlap_words < words:
+            raise ValueError(f"Chunk overlap ({overlap_words}) must be smaller than the chunk ({words})")
+        self.words = words
+        self.overlap_words = overlap_words
+        self.max_chunks = max_chunks
+
+    @classmethod
+    def from_config(cls) -> Optional['Chunker']:
+        """Create a chunker from the 'chunks' section of the configuration, or None if chunking is disabled."""
+        conf = ConfigurationLoader().get_config().get('chunks', {})
+        if not conf.get('enabled', False):
+            return None
+        return cls(
+            words=conf.get('words', cls.DEFAULT_WORDS),
+            overlap_words=conf.get('overlap_words', cls.DEFAULT_OVERLAP_WORDS),
+            max_chunks=conf.get('max_per_article', cls.DEFAULT_MAX_CHUNKS)
+        )
+
+    def sections(self, article: Article) -> List[Tuple[str, List[str]]]:
+        """Split the main text of an article into (heading, words) of its sections. Text before the first heading
+        has an empty heading."""
+        headings = {heading.strip() for heading in article.sections if heading.strip()}
+        sections = [('', [])]
+        for line in article.main_text.splitlines():
+            line = line.strip()
+            if line in headings:
+                sections.append((line, []))
+            elif line:
+                sections[-1][1].extend(line.split())
+        return [(heading, words) for heading, words in sections if words]
+
+    def chunk(self, article: Article) -> List[Chunk]:
+        """Split the main text of an article into chunks."""
+        chunks: List[Chunk] = []
+        step = self.words - self.overlap_words
+        carry: List[str] = []
+        carry_heading = ''
+        for heading, words in self.sections(article):
+            if carry:
+                heading, words = carry_heading, carry + words
+            if len(words) < self.MIN_WORDS:
+                carry, carry_heading = words, heading
+                continue
+            carry = []
+            for start in range(0, max(len(words) - self.overlap_words, 1), step):
+                chunks.append(Chunk(article.arxiv_id, len(chunks), heading, ' '.join(words[start:start + self.words])))
+                if len(chunks) >= self.max_chunks:
+                    return chunks
+        if carry:
+            chunks.append(Chunk(article.arxiv_id, len(chunks), carry_heading, ' '.join(carry)))
+        return chunks
@@ -0,0 +1,303 @@
+"""
+Persistent cache of text embeddings, so that re-imports, re-runs after crashes and repeated search queries do not pay
+the full model cost for texts that have been embedded before.
+
+Embeddings are keyed by the model name and the SHA-256 digest of the normalised text, and stored as float32 blobs in
+an SQLite file next to the article registry. The least recently used embeddings are evicted when the cache grows over
+its size limit.
+
+article_registry_root/
+│- embedding_cache.sqlite3
+
+Search queries are additionally cached in memory by QueryEmbeddingCache, which also treats queries differing only in
+case as the same query.
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from src.arxiv_agent.ml.embedding_model_base import EmbeddingModel
+from src.config.config_loader import ConfigurationLoader
+
+
+class EmbeddingCache:
+    """Size-bounded LRU disk cache of float32 text embeddings."""
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    FILENAME = "embedding_cache.sqlite3"
+    DEFAULT_MAX_SIZE_MB = 1024
+    EVICTION_WATERMARK = 0.9
+    # Keys per query, well under SQLite's limit of host parameters
+    QUERY_CHUNK = 500
+
+    @classmethod
+    def get_instance(cls) -> Optional['EmbeddingCache']:
+        """Get the cache shared by the process, or None if the cache is disabled in the configuration."""
+        with cls._instance_lock:
+            if cls._instance is None:
+                conf = ConfigurationLoader().get_config()
+                cache_conf = conf.get('embedding_cache', {})
+                if not cache_conf.get('enabled', False):
+                    return None
+                cls._instance = cls(
+                    Path(conf['articles']['download_location']) / cls.FILENAME,
+                    max_size_bytes=int(cache_conf.get('max_size_mb', cls.DEFAULT_MAX_SIZE_MB) * 1024 ** 2)
+                )
+            return cls._instance
+
+    def __init__(self, path: str | Path, max_size_bytes: int):
+        """
+        Open the cache, creating it if needed.
+
+        Args:
+            path: Path of the SQLite file
+            max_size_bytes: Size of the stored vectors above which least recently used embeddings are evicted
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_size_bytes = max_size_bytes
+        self.hits = 0
+        self.misses = 0
+
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    key BLOB PRIMARY KEY,
+                    vector BLOB NOT NULL,
+                    last_access REAL NOT NULL
+                ) WITHOUT ROWID""")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_access ON embeddings (last_access)")
+            # Kept up to date on every change, summing the blobs on every put would scan the whole table
+            self._size = self._conn.execute(
+                "SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()[0]
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Normalise a text for keying: Unicode NFC with runs of whitespace collapsed into single spaces."""
+        return ' '.join(unicodedata.normalize('NFC', text).split())
+
+    @classmethod
+    def key(cls, model_name: str, text: str) -> bytes:
+        """Cache key of the embedding of a text by a model."""
+        return hashlib.sha256(f"{model_name}\0{cls.normalize(text)}".encode('utf-8')).digest()
+
+    def get_many(self, model_name: str, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """Get cached embeddings of texts by a model, with None for texts that are not in the cache."""
+        return [None if embedding is None else embedding.tolist() for embedding in self.get_arrays(model_name, texts)]
+
+    def get_arrays(self, model_name: str, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Get cached embeddings of texts by a model as float32 arrays, see get_many."""
+        keys = [self.key(model_name, text) for text in texts]
+        found: Dict[bytes, bytes] = {}
+        with self._lock, self._conn:
+            for i in range(0, len(keys), self.QUERY_CHUNK):
+                chunk = keys[i:i + self.QUERY_CHUNK]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                found.update(rows)
+            if found:
+                now = time.time()
+                self._conn.executemany("UPDATE embeddings SET last_access = ? WHERE key = ?",
+                                       [(now, key) for key in found])
+            # The cache is shared by the embed workers
+            hits = sum(1 for key in keys if key in found)
+            self.hits += hits
+            self.misses += len(keys) - hits
+        return [np.frombuffer(found[key], dtype=np.float32) if key in found else None for key in keys]
+
+    def put_many(
+            self,
+            model_name: str,
+            texts: Sequence[str],
+            embeddings: Sequence[Sequence[float]] | np.ndarray
+    ) -> None:
+        """Store embeddings of texts by a model, evicting least recently used embeddings if the cache is full."""
+        now = time.time()
+        rows = [(self.key(model_name, text), np.asarray(embedding, dtype=np.float32).tobytes(), now)
+                for text, embedding in zip(texts, embeddings)]
+        with self._lock, self._conn:
+            for row in rows:
+                if self._conn.execute("INSERT OR IGNORE INTO embeddings (key, vector, last_access) VALUES (?, ?, ?)",
+                                      row).rowcount:
+                    self._size += len(row[1])
+            self._evict()
+
+    def size(self) -> int:
+        """Total size of the cached vectors in bytes."""
+        with self._lock:
+            return self._size
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def _evict(self) -> None:
+        """Evict least recently used embeddings until the cache fits its size limit. Must hold the lock."""
+        if self._size <= self.max_size_bytes:
+            return
+
+        # Evict down to a low watermark so that every following put does not have to evict
+        target = int(self.max_size_bytes * self.EVICTION_WATERMARK)
+        while self._size > target:
+            rows = self._conn.execute(
+                "SELECT key, LENGTH(vector) FROM embeddings ORDER BY last_access LIMIT 256").fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                self._conn.execute("DELETE FROM embeddings WHERE key = ?", (key,))
+                self._size -= size
+                if self._size <= target:
+                    break
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class CachedEmbeddingModel(EmbeddingModel):
+    """EmbeddingModel serving embeddings from an EmbeddingCache and computing only the missing ones."""
+
+    def __init__(self, model: EmbeddingModel, cache: EmbeddingCache, model_name: Optional[str] = None):
+        """
+        Initialise the cached model.
+
+        Args:
+            model: Model computing the embeddings that are not in the cache
+            cache: Cache of the embeddings
+            model_name: Name of the model in the cache keys. Defaults to the cache_name of the model.
+        """
+        self.model = model
+        self.cache = cache
+        self.model_name = model_name or self.cache_name(model)
+
+    @staticmethod
+    def cache_name(model: EmbeddingModel) -> str:
+        """
+        Name of the embeddings of a model in the cache keys. This is the model_name attribute of the model, which
+        names the backend and quantisation of models whose embeddings differ from the reference model (e.g.
+        ':onnx-int8'), with ':normalized' appended for models that scale their embeddings to unit length.
+        """
+        name = getattr(model, 'model_name', None) or type(model).__name__
+        if getattr(model, 'normalize', False) is True:
+            name += ':normalized'
+        return name
+
+    @classmethod
+    def wrap(cls, model: EmbeddingModel) -> EmbeddingModel:
+        """Put a model behind the cache shared by the process, or return it as is if the cache is disabled."""
+        cache = EmbeddingCache.get_instance()
+        return cls(model, cache) if cache else model
+
+    def encode(self, text: str) -> List[float]:
+        """See parent class."""
+        if not isinstance(text, str):
+            raise TypeError("encode() expects singular str input!")
+        embedding = self.cache.get_many(self.model_name, [text])[0]
+        if embedding is None:
+            embedding = self.model.encode(text)
+            self.cache.put_many(self.model_name, [text], [embedding])
+        return embedding
+
+    def encode_batch(self, texts: List[str], batch_size: int = 32) -> List[List[float]]:
+        """See parent class."""
+        return self.encode_array(texts, batch_size).tolist()
+
+    def encode_array(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        """See parent class."""
+        cached = self.cache.get_arrays(self.model_name, texts)
+        # Texts that normalise the same are only embedded once
+        missing: Dict[str, List[int]] = {}
+        for i, (text, embedding) in enumerate(zip(texts, cached)):
+            if embedding is None:
+                missing.setdefault(EmbeddingCache.normalize(text), []).append(i)
+        computed = None
+        if missing:
+            first_texts = [texts[indices[0]] for indices in missing.values()]
+            computed = self.model.encode_array(first_texts, batch_size)
+            self.cache.put_many(self.model_name, first_texts, computed)
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+
+        dimensions = computed.shape[1] if computed is not None else cached[0].shape[0]
+        embeddings = np.empty((len(texts), dimensions), dtype=np.float32)
+        for i, embedding in enumerate(cached):
+            if embedding is not None:
+                embeddings[i] = embedding
+        if computed is not None:
+            for indices, embedding in zip(missing.values(), computed):
+                embeddings[indices] = embedding
+        return embeddings
+
+
+class QueryEmbeddingCache:
+    """Bounded in-memory LRU cache of query embeddings with a time to live."""
+
+    DEFAULT_MAX_SIZE = 256
+    DEFAULT_TTL_SECONDS = 3600.0
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE, ttl_seconds: Optional[float] = DEFAULT_TTL_SECONDS):
+        """
+        Initialise the cache.
+
+        Args:
+            max_size: Number of queries kept, least recently used queries are dropped first. 0 disables the cache.
+            ttl_seconds: Seconds after which a cached embedding expires. None keeps embeddings until they are dropped.
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, Tuple[List[float], float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        """Normalise a query for keying, see EmbeddingCache.normalize. Case is ignored too."""
+        return EmbeddingCache.normalize(query).casefold()
+
+    def get_or_compute(self, query: str, compute: Callable[[str], List[float]]) -> List[float]:
+        """
+        Get the embedding of a query, computing and caching it on a miss.
+
+        Args:
+            query: Query text
+            compute: Function embedding the query, called outside the lock
+        """
+        key = self.normalize(query)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (self.ttl_seconds is None or now - entry[1] < self.ttl_seconds):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        embedding = compute(query)
+        if self.max_size > 0:
+            with self._lock:
+                self._entries[key] = (embedding, now)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return embedding
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
@@ -3,6 +3,7 @@ This module defines interface for embedding models.
 """
 from abc import ABC, abstractmethod
 from typing import List, Union
+import numpy as np
 
 
 class EmbeddingModel(ABC):
@@ -35,3 +36,18 @@ class EmbeddingModel(ABC):
             List of embedding vectors
         """
         pass
+
+    def encode_array(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        """
+        Encode a large batch of texts into an array, without building Python lists of floats.
+
+        Models should override this when they can produce arrays directly, the default converts encode_batch.
+
+        Args:
+            texts: List of text strings to encode
+            batch_size: Size of batches to process at once
+
+        Returns:
+            C-contiguous float32 array with one row per text
+        """
+        return np.asarray(self.encode_batch(texts, batch_size), dtype=np.float32)
@@ -0,0 +1,59 @@
+"""
+Implementation of EmbeddingModel embedding texts on a local embedding server, see embedding_server.
+"""
+from typing import List, Optional
+import numpy as np
+import requests
+from src.arxiv_agent.ml.embedding_model_base import EmbeddingModel
+from src.config.config_loader import ConfigurationLoader
+
+
+class EmbeddingModelClient(EmbeddingModel):
+    """Implementation of EmbeddingModel using the model of an embedding server."""
+
+    DEFAULT_URL = "http://127.0.0.1:8765"
+    DEFAULT_TIMEOUT = 60
+
+    def __init__(self, url: Optional[str] = None, timeout: Optional[float] = None):
+        """
+        Initialise the client and ask the server for its model. Arguments fall back to the 'embedding' section of
+        the configuration.
+
+        Args:
+            url: URL of the embedding server
+            timeout: Seconds to wait for a response
+
+        Raises:
+            requests.exceptions.RequestException: If the server cannot be reached
+        """
+        conf = ConfigurationLoader().get_config().get('embedding', {})
+        self.url = (url or conf.get('server_url', self.DEFAULT_URL)).rstrip('/')
+        self.timeout = timeout or conf.get('server_timeout', self.DEFAULT_TIMEOUT)
+        self._session = requests.Session()
+        response = self._session.get(f"{self.url}/health", timeout=self.timeout)
+        response.raise_for_status()
+        # Embeddings are cached by the name of the model behind the server
+        self.model_name = response.json()['model_name']
+
+    def encode(self, text: str) -> List[float]:
+        """See parent class."""
+        if not isinstance(text, str):
+            raise TypeError("encode() expects singular str input!")
+        return self.encode_array([text])[0].tolist()
+
+    def encode_batch(self, texts: List[str], batch_size: int = 32) -> List[List[float]]:
+        """See parent class."""
+        return self.encode_array(texts, batch_size).tolist()
+
+    def encode_array(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        """See parent class. The server batches the texts, batch_size is not used."""
+        response = self._session.post(f"{self.url}/embed", json={'texts': list(texts)}, timeout=self.timeout)
+        response.raise_for_status()
+        shape = tuple(int(size) for size in response.headers['X-Embedding-Shape'].split(','))
+        return np.frombuffer(response.content, dtype=np.float32).reshape(shape).copy()
+
+    def metrics(self) -> dict:
+        """Metrics of the server, see MicroBatcher.metrics."""
+        response = self._session.get(f"{self.url}/metrics", timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
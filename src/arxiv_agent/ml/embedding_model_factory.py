@@ -0,0 +1,67 @@
+"""
+Creation of the embedding model selected in the 'embedding' section of the configuration. The model modules are
+imported only when selected, so that hosts running the ONNX model do not need PyTorch and sentence-transformers. The
+'server' backend embeds on a local embedding server instead of loading a model into the process.
+
+get_embedding_model shares one instance of the model within the process through the ModelRegistry.
+"""
+import json
+import threading
+from typing import Hashable, Optional
+from src.arxiv_agent.ml.embedding_cache import CachedEmbeddingModel
+from src.arxiv_agent.ml.embedding_model_base import EmbeddingModel
+from src.arxiv_agent.ml.model_registry import ModelRegistry
+from src.config.config_loader import ConfigurationLoader
+
+BACKENDS = ('sentence_transformers', 'onnx', 'server')
+
+
+def create_embedding_model(backend: Optional[str] = None) -> EmbeddingModel:
+    """
+    Create the embedding model of a backend.
+
+    Args:
+        backend: One of BACKENDS. Defaults to the configured backend, 'sentence_transformers' if none is configured.
+
+    Raises:
+        ValueError: If the backend is unknown
+    """
+    backend = backend or ConfigurationLoader().get_config().get('embedding', {}).get('backend', 'sentence_transformers')
+    if backend == 'sentence_transformers':
+        from src.arxiv_agent.ml.embedding_model_sentence_transformer import EmbeddingSentenceTransformer
+        return EmbeddingSentenceTransformer()
+    if backend == 'onnx':
+        from src.arxiv_agent.ml.embedding_model_onnx import EmbeddingOnnx
+        return EmbeddingOnnx()
+    if backend == 'server':
+        from src.arxiv_agent.ml.embedding_model_client import EmbeddingModelClient
+        return EmbeddingModelClient()
+    raise ValueError(f"Unknown embedding backend: {backend}, expected one of {', '.join(BACKENDS)}")
+
+
+def embedding_model_key() -> Hashable:
+    """Registry key of the configured embedding model: its configuration and whether it is behind the disk cache."""
+    conf = ConfigurationLoader().get_config()
+    return ('embedding', json.dumps(conf.get('embedding', {}), sort_keys=True),
+            conf.get('embedding_cache', {}).get('enabled', False))
+
+
+def _load_embedding_model() -> EmbeddingModel:
+    return CachedEmbeddingModel.wrap(create_embedding_model())
+
+
+def get_embedding_model(key: Optional[Hashable] = None) -> EmbeddingModel:
+    """
+    Get the configured embedding model shared by the process, behind the embedding cache if it is enabled. The model
+    is loaded on first use.
+
+    Args:
+        key: Registry key of the model, see embedding_model_key. Resolving it reads the configuration, so callers
+            getting the model often resolve it once and pass it in.
+    """
+    return ModelRegistry.get_instance().get(key or embedding_model_key(), _load_embedding_model)
+
+
+def preload_embedding_model() -> threading.Thread:
+    """Load the shared embedding model in a background thread, see get_embedding_model."""
+    return ModelRegistry.get_instance().preload(embedding_model_key(), _load_embedding_model)
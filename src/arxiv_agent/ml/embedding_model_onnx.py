@@ -0,0 +1,144 @@
+"""
+Implementation of EmbeddingModel running an exported ONNX graph of the transformer with dynamically int8 quantised
+weights on the CPU with ONNX Runtime. It needs neither PyTorch nor sentence-transformers at run time, only
+onnxruntime and tokenizers.
+
+The model directory is written by scripts/export_onnx_model.py:
+
+model_dir/
+│- model_int8.onnx
+│- tokenizer.json
+│- embedding_config.json    model name, pooling mode, maximum sequence length and dimensions
+"""
+import json
+from pathlib import Path
+from typing import List, Optional
+import numpy as np
+from src.arxiv_agent.ml.batching import DEFAULT_MAX_BATCH_TOKENS, token_budget_batches
+from src.arxiv_agent.ml.embedding_model_base import EmbeddingModel
+from src.config.config_loader import ConfigurationLoader
+
+try:
+    import onnxruntime
+except ImportError:
+    onnxruntime = None
+
+try:
+    from tokenizers import Tokenizer
+except ImportError:
+    Tokenizer = None
+
+
+def pool(hidden_states: np.ndarray, attention_mask: np.ndarray, mode: str) -> np.ndarray:
+    """
+    Pool the token embeddings of a batch into one embedding per text, like the Pooling module of sentence-transformers.
+
+    Args:
+        hidden_states: Token embeddings of shape (texts, tokens, dimensions)
+        attention_mask: Mask of the real tokens of shape (texts, tokens)
+        mode: 'cls' for the embedding of the first token, 'mean' for the mean of the real tokens
+    """
+    if mode == 'cls':
+        return hidden_states[:, 0]
+    if mode == 'mean':
+        mask = attention_mask[:, :, None].astype(hidden_states.dtype)
+        return (hidden_states * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+    raise ValueError(f"Unknown pooling mode: {mode}")
+
+
+class EmbeddingOnnx(EmbeddingModel):
+    """Implementation of EmbeddingModel using a quantised ONNX export of a SentenceTransformer model."""
+
+    MODEL_FILENAME = "model_int8.onnx"
+    TOKENIZER_FILENAME = "tokenizer.json"
+    CONFIG_FILENAME = "embedding_config.json"
+    DEFAULT_PATH = "models/scincl-onnx-int8"
+
+    def __init__(
+            self,
+            model_path: Optional[str | Path] = None,
+            normalize: Optional[bool] = None,
+            max_batch_tokens: Optional[int] = None,
+            threads: Optional[int] = None
+    ):
+        """
+        Initialize the model. Arguments fall back to the 'embedding' section of the configuration.
+
+        Args:
+            model_path: Directory of the exported model
+            normalize: Whether to scale the embeddings to unit length, see EmbeddingSentenceTransformer
+            max_batch_tokens: Token budget of a batch, see token_budget_batches
+            threads: Number of threads of an inference. 0 lets ONNX Runtime use all cores.
+
+        Raises:
+            ImportError: If onnxruntime or tokenizers is not installed
+        """
+        if onnxruntime is None or Tokenizer is None:
+            raise ImportError("The ONNX embedding model requires onnxruntime and tokenizers: "
+                              "pip install onnxruntime tokenizers")
+        conf = ConfigurationLoader().get_config().get('embedding', {})
+        path = Path(model_path or conf.get('onnx_path', self.DEFAULT_PATH))
+        with open(path / self.CONFIG_FILENAME, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        # Quantised embeddings differ slightly from the reference model, so they are cached under their own name
+        self.model_name = f"{config['model_name']}:onnx-int8"
+        self.pooling = config['pooling']
+        self.max_seq_length = config['max_seq_length']
+        self.dimensions = config['dimensions']
+        self.normalize = normalize if normalize is not None else conf.get('normalize', False)
+        self.max_batch_tokens = max_batch_tokens if max_batch_tokens is not None else \
+            conf.get('max_batch_tokens', DEFAULT_MAX_BATCH_TOKENS)
+
+        self.tokenizer = Tokenizer.from_file(str(path / self.TOKENIZER_FILENAME))
+        self.tokenizer.no_padding()
+        self.tokenizer.enable_truncation(max_length=self.max_seq_length)
+        self.pad_id = config.get('pad_token_id', 0)
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads if threads is not None else conf.get('onnx_threads', 0)
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(str(path / self.MODEL_FILENAME), options,
+                                                    providers=['CPUExecutionProvider'])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+    def encode(self, text: str) -> List[float]:
+        """See parent class."""
+        if not isinstance(text, str):
+            raise TypeError("encode() expects singular str input!")
+        return self.encode_array([text])[0].tolist()
+
+    def encode_batch(self, texts: List[str], batch_size: int = 32) -> List[List[float]]:
+        """See parent class."""
+        return self.encode_array(texts, batch_size).tolist()
+
+    def encode_array(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        """See parent class. With a token budget, batch_size is not used and the texts are batched by length."""
+        encodings = self.tokenizer.encode_batch(texts)
+        token_ids = [encoding.ids for encoding in encodings]
+        if self.max_batch_tokens:
+            batches = token_budget_batches([len(ids) for ids in token_ids], self.max_batch_tokens)
+        else:
+            batches = [list(range(i, min(i + batch_size, len(texts)))) for i in range(0, len(texts), batch_size)]
+
+        embeddings = np.empty((len(texts), self.dimensions), dtype=np.float32)
+        for indices in batches:
+            embeddings[indices] = self._run([token_ids[i] for i in indices])
+        return embeddings
+
+    def _run(self, token_ids: List[List[int]]) -> np.ndarray:
+        """Embed a batch of tokenised texts, padded to the longest of them."""
+        length = max(len(ids) for ids in token_ids)
+        input_ids = np.full((len(token_ids), length), self.pad_id, dtype=np.int64)
+        attention_mask = np.zeros((len(token_ids), length), dtype=np.int64)
+        for row, ids in enumerate(token_ids):
+            input_ids[row, :len(ids)] = ids
+            attention_mask[row, :len(ids)] = 1
+        inputs = {'input_ids': input_ids, 'attention_mask': attention_mask}
+        if 'token_type_ids' in self.input_names:
+            inputs['token_type_ids'] = np.zeros_like(input_ids)
+
+        hidden_states = self.session.run(None, inputs)[0]
+        embeddings = pool(hidden_states, attention_mask, self.pooling).astype(np.float32)
+        if self.normalize:
+            embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+        return embeddings
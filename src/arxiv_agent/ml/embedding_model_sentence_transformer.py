@@ -1,19 +1,36 @@
-from typing import List
+from typing import List, Optional
 import warnings
+import numpy as np
 from sentence_transformers import SentenceTransformer
+from src.arxiv_agent.ml.batching import DEFAULT_MAX_BATCH_TOKENS, token_budget_batches
 from src.arxiv_agent.ml.embedding_model_base import EmbeddingModel
+from src.config.config_loader import ConfigurationLoader
 
 
 class EmbeddingSentenceTransformer(EmbeddingModel):
     """Implementation of EmbeddingModel using SentenceTransformers."""
 
-    def __init__(self, model_name: str = "malteos/scincl"):
+    def __init__(
+            self,
+            model_name: str = "malteos/scincl",
+            normalize: Optional[bool] = None,
+            max_batch_tokens: Optional[int] = None
+    ):
         """
         Initialize the model.
 
         Args:
             model_name: Name of the SentenceTransformer model to use
+            normalize: Whether to scale the embeddings to unit length, which makes DOT distance cosine similarity.
+                Falls back to the 'embedding' section of the configuration.
+            max_batch_tokens: Token budget of a batch, see token_budget_batches. 0 batches a fixed number of texts
+                in arrival order instead. Falls back to the 'embedding' section of the configuration.
         """
+        conf = ConfigurationLoader().get_config().get('embedding', {})
+        self.model_name = model_name
+        self.normalize = normalize if normalize is not None else conf.get('normalize', False)
+        self.max_batch_tokens = max_batch_tokens if max_batch_tokens is not None else \
+            conf.get('max_batch_tokens', DEFAULT_MAX_BATCH_TOKENS)
         self.model = SentenceTransformer(model_name)
 
     def encode(self, text: str) -> List[float]:
@@ -27,23 +44,30 @@ class EmbeddingSentenceTransformer(EmbeddingModel):
             )
             raise TypeError("encode() expects singular str input!")
 
-        text = [text]
-
-        embeddings = self.model.encode(text)
-
-        # Convert numpy arrays to lists
-        embeddings = [emb.tolist() for emb in embeddings]
-
-        return embeddings[0]
+        return self._encode([text], 1)[0].tolist()
 
     def encode_batch(self, texts: List[str], batch_size: int = 32) -> List[List[float]]:
         """See parent class."""
-        all_embeddings = []
+        return self.encode_array(texts, batch_size).tolist()
+
+    def encode_array(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        """See parent class. With a token budget, batch_size is not used and the texts are batched by length."""
+        if not self.max_batch_tokens or len(texts) <= 1:
+            return self._encode(texts, batch_size)
+
+        embeddings = np.empty((len(texts), self.model.get_sentence_embedding_dimension()), dtype=np.float32)
+        for indices in token_budget_batches(self.token_lengths(texts), self.max_batch_tokens):
+            embeddings[indices] = self._encode([texts[i] for i in indices], len(indices))
+        return embeddings
 
-        # Process in batches
-        for i in range(0, len(texts), batch_size):
-            batch = texts[i:i + batch_size]
-            embeddings = self.model.encode(batch)
-            all_embeddings.extend([emb.tolist() for emb in embeddings])
+    def token_lengths(self, texts: List[str]) -> List[int]:
+        """Number of tokens of every text as the model sees it, i.e. truncated to its maximum sequence length."""
+        input_ids = self.model.tokenizer(texts, add_special_tokens=True, truncation=True,
+                                         max_length=self.model.max_seq_length, return_attention_mask=False,
+                                         return_token_type_ids=False)['input_ids']
+        return [len(ids) for ids in input_ids]
 
-        return all_embeddings
\ No newline at end of file
+    def _encode(self, texts: List[str], batch_size: int) -> np.ndarray:
+        embeddings = self.model.encode(texts, batch_size=batch_size, convert_to_numpy=True,
+                                       normalize_embeddings=self.normalize)
+        return np.ascontiguousarray(embeddings, dtype=np.float32)
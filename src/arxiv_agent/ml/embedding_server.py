@@ -0,0 +1,259 @@
+"""
+Local embedding server. One process loads the embedding model and serves it over HTTP on localhost to the importer,
+the search script and the UI, instead of each of them loading a model of its own.
+
+Requests arriving at about the same time are gathered into micro-batches: the first request waits at most
+max_wait_ms for others, so single queries from different clients run as one model batch. The server exposes:
+
+POST /embed     {"texts": [...]} -> float32 embeddings, row by row, with their shape in the X-Embedding-Shape header
+GET  /health    model name and dimensions
+GET  /metrics   request, batch and queue statistics as JSON
+"""
+import json
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Deque, Dict, List, Optional
+import numpy as np
+from src.arxiv_agent.ml.embedding_model_base import EmbeddingModel
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Request:
+    texts: List[str]
+    future: Future = field(default_factory=Future)
+    received: float = field(default_factory=time.monotonic)
+
+
+class MicroBatcher:
+    """Gathers concurrent embedding requests into batches of the model, run by a single worker thread."""
+
+    DEFAULT_MAX_BATCH_TEXTS = 256
+    DEFAULT_MAX_WAIT_MS = 5.0
+    # Number of latest requests the latency percentiles are computed of
+    LATENCY_WINDOW = 1000
+
+    def __init__(self, model: EmbeddingModel, max_batch_texts: int = DEFAULT_MAX_BATCH_TEXTS,
+                 max_wait_ms: float = DEFAULT_MAX_WAIT_MS):
+        """
+        Initialise the batcher and start its worker.
+
+        Args:
+            model: Model embedding the batches
+            max_batch_texts: Number of texts after which a batch is closed without waiting. A single larger request
+                is still embedded as one batch.
+            max_wait_ms: Longest time the first request of a batch waits for more requests
+        """
+        self.model = model
+        self.max_batch_texts = max_batch_texts
+        self.max_wait = max_wait_ms / 1000
+        self._queue: 'queue.Queue[Optional[_Request]]' = queue.Queue()
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self._requests = 0
+        self._texts = 0
+        self._batches = 0
+        self._errors = 0
+        self._busy_seconds = 0.0
+        self._latencies: Deque[float] = deque(maxlen=self.LATENCY_WINDOW)
+        self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, texts: List[str]) -> Future:
+        """Queue texts for embedding. The future resolves to their float32 embeddings."""
+        request = _Request(list(texts))
+        if not request.texts:
+            request.future.set_result(np.empty((0, 0), dtype=np.float32))
+        else:
+            self._queue.put(request)
+        return request.future
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Embed texts, waiting for the batch they are embedded in."""
+        return self.submit(texts).result()
+
+    def _run(self) -> None:
+        while True:
+            request = self._queue.get()
+            if request is None:
+                return
+            batch = [request]
+            count = len(request.texts)
+            deadline = request.received + self.max_wait
+            while count < self.max_batch_texts:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if request is None:
+                    # Finish the gathered batch, then stop
+                    self._queue.put(None)
+                    break
+                batch.append(request)
+                count += len(request.texts)
+            self._embed(batch)
+
+    def _embed(self, batch: List[_Request]) -> None:
+        texts = [text for request in batch for text in request.texts]
+        started = time.monotonic()
+        try:
+            embeddings = self.model.encode_array(texts, batch_size=len(texts))
+        except Exception as e:
+            logger.exception(f"Embedding a batch of {len(texts)} texts failed")
+            with self._lock:
+                self._errors += len(batch)
+            for request in batch:
+                request.future.set_exception(e)
+            return
+
+        finished = time.monotonic()
+        offset = 0
+        for request in batch:
+            request.future.set_result(embeddings[offset:offset + len(request.texts)])
+            offset += len(request.texts)
+        with self._lock:
+            self._requests += len(batch)
+            self._texts += len(texts)
+            self._batches += 1
+            self._busy_seconds += finished - started
+            self._latencies.extend(finished - request.received for request in batch)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Throughput, batching and queue statistics since the start of the batcher."""
+        with self._lock:
+            latencies = np.array(self._latencies) * 1000
+            uptime = time.monotonic() - self._started
+            return {
+                'requests': self._requests,
+                'texts': self._texts,
+                'batches': self._batches,
+                'errors': self._errors,
+                'queue_depth': self._queue.qsize(),
+                'mean_batch_texts': self._texts / self._batches if self._batches else 0.0,
+                'texts_per_second': self._texts / uptime if uptime else 0.0,
+                'utilisation': self._busy_seconds / uptime if uptime else 0.0,
+                'latency_ms_p50': float(np.percentile(latencies, 50)) if len(latencies) else 0.0,
+                'latency_ms_p95': float(np.percentile(latencies, 95)) if len(latencies) else 0.0,
+            }
+
+    def close(self) -> None:
+        """Stop the worker after the queued requests have been embedded."""
+        self._queue.put(None)
+        self._worker.join()
+
+
+class EmbeddingServer:
+    """HTTP server of a MicroBatcher on localhost."""
+
+    DEFAULT_HOST = "127.0.0.1"
+    DEFAULT_PORT = 8765
+
+    def __init__(self, batcher: MicroBatcher, model_name: str, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
+        """
+        Initialise the server. Port 0 binds a free port, see the port attribute.
+
+        Args:
+            batcher: Batcher embedding the requests
+            model_name: Name of the model, given to the clients for their cache keys
+            host: Address to listen on
+            port: Port to listen on
+        """
+        self.batcher = batcher
+        self.model_name = model_name
+        self._dimensions: Optional[int] = None
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self.host, self.port = self._httpd.server_address[:2]
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def dimensions(self) -> int:
+        """Number of dimensions of the embeddings, found by embedding a probe text on first use."""
+        if self._dimensions is None:
+            self._dimensions = int(self.batcher.embed(['dimensions']).shape[1])
+        return self._dimensions
+
+    def _handler(self) -> type:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                if self.path == '/health':
+                    try:
+                        dimensions = server.dimensions
+                    except Exception as e:
+                        self._send_json({'error': str(e)}, status=500)
+                        return
+                    self._send_json({'model_name': server.model_name, 'dimensions': dimensions})
+                elif self.path == '/metrics':
+                    self._send_json(server.batcher.metrics())
+                else:
+                    self._send_json({'error': f"Unknown path {self.path}"}, status=404)
+
+            def do_POST(self):
+                if self.path != '/embed':
+                    self._send_json({'error': f"Unknown path {self.path}"}, status=404)
+                    return
+                try:
+                    body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                    texts = body['texts']
+                    if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+                        raise ValueError("texts must be a list of strings")
+                except (ValueError, KeyError, TypeError) as e:
+                    self._send_json({'error': f"Bad request: {e}"}, status=400)
+                    return
+                try:
+                    embeddings = np.ascontiguousarray(server.batcher.embed(texts), dtype=np.float32)
+                except Exception as e:
+                    self._send_json({'error': str(e)}, status=500)
+                    return
+                data = embeddings.tobytes()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/octet-stream')
+                self.send_header('X-Embedding-Shape', f"{embeddings.shape[0]},{embeddings.shape[1]}")
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_json(self, payload: Dict[str, Any], status: int = 200):
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        return Handler
+
+    def serve_forever(self) -> None:
+        logger.info(f"Serving embeddings of {self.model_name} at {self.url}")
+        self._httpd.serve_forever()
+
+    def start(self) -> threading.Thread:
+        """Serve in a background thread."""
+        thread = threading.Thread(target=self.serve_forever, name="embedding-server", daemon=True)
+        thread.start()
+        return thread
+
+    def shutdown(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        self.batcher.close()
@@ -0,0 +1,82 @@
+"""
+Process-wide registry of loaded models. Models are large and slow to load, so every part of a process asking for the
+same model with the same configuration gets the same instance, loaded once on first use. Models can also be loaded in
+a background thread ahead of their first use, e.g. while a UI starts up.
+"""
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, List
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    """Shared, lazily loaded model instances keyed by model id and configuration."""
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls) -> 'ModelRegistry':
+        """Get the registry shared by the process."""
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def __init__(self):
+        self._models: Dict[Hashable, Any] = {}
+        self._key_locks: Dict[Hashable, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, load: Callable[[], Any]) -> Any:
+        """
+        Get the model of a key, loading it on first use.
+
+        Args:
+            key: Model id and the configuration the model depends on
+            load: Function loading the model. Concurrent first uses of a key wait for a single load, while models of
+                other keys load in parallel.
+
+        Raises:
+            Exception: Whatever the load raises. A failed load is not remembered, the next use tries again.
+        """
+        with self._lock:
+            if key in self._models:
+                return self._models[key]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                if key in self._models:
+                    return self._models[key]
+            started = time.perf_counter()
+            model = load()
+            logger.info(f"Loaded model {key} in {time.perf_counter() - started:.1f} s")
+            with self._lock:
+                self._models[key] = model
+            return model
+
+    def preload(self, key: Hashable, load: Callable[[], Any]) -> threading.Thread:
+        """Load the model of a key in a background thread, see get. Failures are logged, and the first use of the
+        model loads it again."""
+        def run():
+            try:
+                self.get(key, load)
+            except Exception as e:
+                logger.warning(f"Preloading model {key} failed: {e}")
+
+        thread = threading.Thread(target=run, name=f"preload-{key}", daemon=True)
+        thread.start()
+        return thread
+
+    def loaded(self) -> List[Hashable]:
+        """Keys of the models loaded so far."""
+        with self._lock:
+            return list(self._models)
+
+    def clear(self) -> None:
+        """Drop all models, so that they are loaded again on next use."""
+        with self._lock:
+            self._models.clear()
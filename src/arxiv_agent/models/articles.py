@@ -19,9 +19,9 @@ class Article(BaseModel):
    - format: Original format of the paper (e.g. "tex", "pdf")
    - sections: List of main section headings in the paper
    - main_text: Extracted main text content
-   - figures: List of extracted figures (empty in current version)
-   - equations: List of extracted equations (empty in current version)
-   - bibliography: List of references (empty in current version)
+   - figures: List of figure captions (TeX sources only)
+   - equations: List of displayed equations (TeX sources only)
+   - bibliography: List of [key, text] references (TeX sources only)
    - processed_at: UTC timestamp of processing the paper in the app
 
    Indexes:
@@ -0,0 +1,77 @@
+"""
+Article of which only some fields have been loaded, e.g. the title and abstract of a search result. The other fields
+are loaded when they are first accessed, so that searches do not transfer and validate the main text, equations and
+bibliography of every hit.
+"""
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable
+from pydantic import TypeAdapter
+from src.arxiv_agent.models.articles import Article
+
+# Function loading fields of an article by its ArXiv id, returning the loaded fields by name
+FieldLoader = Callable[[str, Iterable[str]], Dict[str, Any]]
+
+
+@lru_cache(maxsize=None)
+def _adapter(field: str) -> TypeAdapter:
+    return TypeAdapter(Article.model_fields[field].annotation)
+
+
+class LazyArticle:
+    """Article with the fields of Article as attributes, loading the fields missing from its payload on access."""
+
+    FIELDS = tuple(Article.model_fields)
+
+    def __init__(self, payload: Dict[str, Any], loader: FieldLoader):
+        """
+        Initialise the article.
+
+        Args:
+            payload: Fields loaded so far by name, including arxiv_id, in the JSON form of Article
+            loader: Function loading the other fields. All missing fields are loaded together on first access of
+                any of them.
+        """
+        self._payload = dict(payload)
+        self._loader = loader
+        self._values: Dict[str, Any] = {}
+
+    @property
+    def loaded_fields(self) -> tuple:
+        return tuple(field for field in self.FIELDS if field in self._payload)
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called for attributes not found otherwise, i.e. the fields of the article
+        if name.startswith('_') or name not in Article.model_fields:
+            raise AttributeError(f"{type(self).__name__} has no attribute {name}")
+        if name not in self._values:
+            if name not in self._payload:
+                self.hydrate()
+            self._values[name] = _adapter(name).validate_python(self._payload.get(name))
+        return self._values[name]
+
+    def hydrate(self) -> None:
+        """Load all fields missing from the payload."""
+        missing = [field for field in self.FIELDS if field not in self._payload]
+        if missing:
+            loaded = self._loader(self._payload['arxiv_id'], missing)
+            # Optional fields may be missing from the source, they are None then
+            self._payload.update({field: loaded.get(field) for field in missing})
+
+    def to_article(self) -> Article:
+        """Load the missing fields and return the full article."""
+        self.hydrate()
+        return Article(**self._payload)
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, LazyArticle):
+            return self.arxiv_id == other.arxiv_id
+        if isinstance(other, Article):
+            return self.to_article() == other
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(self.arxiv_id)
+
+    def __repr__(self) -> str:
+        fields = ', '.join(f"{field}={self._payload[field]!r}" for field in self.loaded_fields)
+        return f"{type(self).__name__}({fields})"
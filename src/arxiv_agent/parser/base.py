@@ -1,11 +1,14 @@
 # base.py
 from abc import ABC, abstractmethod
+import io
+import os
 import requests
 import xml.etree.ElementTree as ET
-import time
 import logging
-from datetime import datetime
-from typing import List, Dict, Any
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, BinaryIO, Iterable, Iterator, Optional
+from .download_cache import DownloadCache
+from .transport import ArxivTransport
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -15,25 +18,82 @@ class ArxivBase(ABC):
     """Base class for ArXiv parsers with common functionality."""
 
     BASE_API_URL = "http://export.arxiv.org/api/query?"
-    REQUEST_DELAY = 3  # ArXiv's rate limiting guidelines
 
-    def __init__(self):
-        self.last_request_time = 0
+    # Sentinel for a cache that has not been resolved from the configuration yet
+    _UNRESOLVED = object()
 
-    def _respect_rate_limit(self):
-        """Ensure we respect ArXiv's rate limiting guidelines."""
-        current_time = time.time()
-        time_since_last_request = current_time - self.last_request_time
-        if time_since_last_request < self.REQUEST_DELAY:
-            time.sleep(self.REQUEST_DELAY - time_since_last_request)
-        self.last_request_time = time.time()
+    def __init__(self, transport: Optional[ArxivTransport] = None, cache: Optional[DownloadCache] = _UNRESOLVED):
+        """
+        Initialise the parser.
+
+        Args:
+            transport: Transport for the requests to ArXiv. Defaults to the transport shared by the whole process.
+            cache: Cache of the raw downloads. Defaults to the cache shared by the whole process, if it is enabled in
+                the configuration. None disables caching.
+        """
+        self._transport = transport
+        self._cache = cache
+
+    @property
+    def transport(self) -> ArxivTransport:
+        # Resolved on first use, parse worker processes never make requests
+        if self._transport is None:
+            self._transport = ArxivTransport.get_instance()
+        return self._transport
+
+    @property
+    def cache(self) -> Optional[DownloadCache]:
+        if self._cache is self._UNRESOLVED:
+            self._cache = DownloadCache.get_instance()
+        return self._cache
 
     def _make_request(self, url: str) -> requests.Response:
         """Make a rate-limited request."""
-        self._respect_rate_limit()
-        response = requests.get(url)
-        response.raise_for_status()
-        return response
+        return self.transport.get(url)
+
+    def _download(self, arxiv_id: str, fmt: str, url: str) -> BinaryIO:
+        """Download raw paper source from url, serving it from the download cache when possible.
+
+        Returns:
+            BinaryIO: Raw paper source, positioned at the start. The caller must close it.
+        """
+        cache = self.cache
+        if cache is not None:
+            cached = cache.open(arxiv_id, fmt)
+            if cached is not None:
+                return cached
+            if cache.offline:
+                raise ParserException(f"{fmt} of {arxiv_id} is not in the download cache and the cache is offline")
+
+        data = self.transport.download(url)
+        if cache is not None:
+            try:
+                cache.put_file(arxiv_id, fmt, data)
+            except BaseException:
+                data.close()
+                raise
+        return data
+
+    @staticmethod
+    def as_file(data: bytes | BinaryIO) -> BinaryIO:
+        """Raw paper source as a file positioned at the start."""
+        if isinstance(data, (bytes, bytearray)):
+            return io.BytesIO(data)
+        data.seek(0)
+        return data
+
+    @staticmethod
+    def file_path(data: bytes | BinaryIO) -> Optional[str]:
+        """Path of the file on disk that holds raw paper source, or None if it is held in memory."""
+        if isinstance(data, (bytes, bytearray)):
+            return None
+        path = getattr(data, 'path', None) or getattr(data, 'name', None)
+        return path if isinstance(path, str) and os.path.isfile(path) else None
+
+    RESULTS_PER_REQUEST = 1000  # ArXiv's maximum allowed results per request
+    MAX_QUERY_RESULTS = 30000  # ArXiv API does not page past this many results of a query
+    ATOM_NS = {'atom': 'http://www.w3.org/2005/Atom',
+               'opensearch': 'http://a9.com/-/spec/opensearch/1.1/'}
 
     def list_daily_papers(self, date: datetime, category: str) -> List[Dict[str, Any]]:
         """List all papers published on a specific date in a given category.
@@ -49,19 +109,46 @@ class ArxivBase(ABC):
             requests.exceptions.RequestException: If there's an error with the API request
             xml.etree.ElementTree.ParseError: If the response XML cannot be parsed
         """
-        RESULTS_PER_REQUEST = 1000  # ArXiv's maximum allowed results per request
-        date_str = date.strftime('%Y%m%d')
-        base_query = f'cat:{category} AND submittedDate:[{date_str}0000 TO {date_str}2359]'
+        day = date.replace(hour=0, minute=0, second=0, microsecond=0)
+        return list(self.list_papers([category], day, day + timedelta(days=1)))
+
+    def list_papers(self, categories: Iterable[str], start: datetime, end: datetime) -> Iterator[Dict[str, Any]]:
+        """List all papers submitted in any of the given categories within a time window.
+
+        All categories and the whole window are covered by a single paginated query, so papers cross-listed in
+        several of the categories are listed only once. A window with more papers than the API serves for a query,
+        MAX_QUERY_RESULTS, is halved until each half is under the limit.
+
+        Args:
+            categories: The ArXiv categories to search in
+            start: Start of the window (inclusive), minute precision
+            end: End of the window (exclusive), minute precision
+
+        Yields:
+            Dict[str, Any]: Paper information dictionaries in ascending submission order
 
-        start = 0
-        all_papers = []
+        Raises:
+            ParserException: If a one minute window has more papers than the API serves for a query
+            requests.exceptions.RequestException: If there's an error with the API request
+            xml.etree.ElementTree.ParseError: If the response XML cannot be parsed
+        """
+        categories = sorted(set(categories))
+        cat_query = " OR ".join(f"cat:{category}" for category in categories)
+        if len(categories) > 1:
+            cat_query = f"({cat_query})"
+        window = f"[{start.strftime('%Y%m%d%H%M')} TO {(end - timedelta(minutes=1)).strftime('%Y%m%d%H%M')}]"
+        base_query = f"{cat_query} AND submittedDate:{window}"
+        description = f"{', '.join(categories)} between {start.isoformat()} and {end.isoformat()}"
+
+        start_index = 0
+        fetched = 0
         total_results = None
 
         while True:
             query_params = {
                 'search_query': base_query,
-                'max_results': RESULTS_PER_REQUEST,
-                'start': start,
+                'max_results': self.RESULTS_PER_REQUEST,
+                'start': start_index,
                 'sortBy': 'submittedDate',
                 'sortOrder': 'ascending'
             }
@@ -70,40 +157,63 @@ class ArxivBase(ABC):
             response = self._make_request(url)
 
             root = ET.fromstring(response.content)
-            ns = {'atom': 'http://www.w3.org/2005/Atom',
-                  'opensearch': 'http://a9.com/-/spec/opensearch/1.1/'}
 
             # Get total results count from opensearch namespace
             if total_results is None:
-                total_results_elem = root.find('opensearch:totalResults', ns)
+                total_results_elem = root.find('opensearch:totalResults', self.ATOM_NS)
                 total_results = int(total_results_elem.text) if total_results_elem is not None else 0
-                logger.info(f"Total papers found for {date_str} in category {category}: {total_results}")
+                logger.info(f"Total papers found in {description}: {total_results}")
+                if total_results > self.MAX_QUERY_RESULTS:
+                    # The papers past the limit cannot be paged to, list the two halves of the window instead
+                    middle = start + timedelta(minutes=(end - start) // timedelta(minutes=1) // 2)
+                    if middle <= start:
+                        raise ParserException(f"{total_results} papers in {description}, over the "
+                                              f"{self.MAX_QUERY_RESULTS} the API serves for a query")
+                    logger.info(f"Splitting {description} at {middle.isoformat()}")
+                    yield from self.list_papers(categories, start, middle)
+                    yield from self.list_papers(categories, middle, end)
+                    return
 
             # Parse entries
-            for entry in root.findall('atom:entry', ns):
-                paper_info = {
-                    'arxiv_id': entry.find('atom:id', ns).text.split('/')[-1],
-                    'title': entry.find('atom:title', ns).text.strip(),
-                    'authors': [author.find('atom:name', ns).text for author in entry.findall('atom:author', ns)],
-                    'published': entry.find('atom:published', ns).text,
-                    'abstract': entry.find('atom:summary', ns).text.strip(),
-                    'categories': [cat.get('term') for cat in entry.findall('atom:category', ns)]
-                }
-                all_papers.append(paper_info)
-
-            # Check if we've got all results
-            if len(all_papers) >= total_results:
+            entries = root.findall('atom:entry', self.ATOM_NS)
+            for entry in entries:
+                yield self._parse_entry(entry)
+            fetched += len(entries)
+
+            # Check if we've got all results. An empty page means the API has nothing more to give.
+            if not entries or fetched >= min(total_results, self.MAX_QUERY_RESULTS):
                 break
 
-            start += RESULTS_PER_REQUEST
-            logger.info(f"Fetched {len(all_papers)} papers so far, continuing pagination...")
+            start_index += self.RESULTS_PER_REQUEST
+            logger.info(f"Fetched {fetched} papers so far, continuing pagination...")
 
-        logger.info(f"Successfully retrieved {len(all_papers)} papers")
-        return all_papers
+        logger.info(f"Successfully retrieved {fetched} papers")
+
+    def _parse_entry(self, entry: ET.Element) -> Dict[str, Any]:
+        """Parse paper information dictionary from an Atom entry of the API response."""
+        ns = self.ATOM_NS
+        return {
+            'arxiv_id': entry.find('atom:id', ns).text.split('/')[-1],
+            'title': entry.find('atom:title', ns).text.strip(),
+            'authors': [author.find('atom:name', ns).text for author in entry.findall('atom:author', ns)],
+            'published': entry.find('atom:published', ns).text,
+            'abstract': entry.find('atom:summary', ns).text.strip(),
+            'categories': [cat.get('term') for cat in entry.findall('atom:category', ns)]
+        }
 
-    @abstractmethod
     def extract_text(self, arxiv_id: str) -> Dict[str, Any]:
-        """Extract text content from paper source. Must be implemented by subclasses."""
+        """Download paper source and extract text content from it."""
+        with self.download(arxiv_id) as data:
+            return self.parse(data)
+
+    @abstractmethod
+    def download(self, arxiv_id: str) -> BinaryIO:
+        """Download raw paper source into a file. Must be implemented by subclasses."""
+        pass
+
+    @abstractmethod
+    def parse(self, data: bytes | BinaryIO) -> Dict[str, Any]:
+        """Extract text content from raw paper source. Must be implemented by subclasses."""
         pass
 
 
@@ -0,0 +1,212 @@
+# download_cache.py
+"""
+Local disk cache of the raw e-print, PDF and HTML downloads from ArXiv, so that re-parsing or re-importing papers does
+not require downloading them again under ArXiv's rate limits.
+
+Entries are keyed by arxiv_id, version and format. The bytes are stored content-addressed by their SHA-256 digest, so
+identical downloads are stored once. An SQLite index tracks the sizes and last access times, and the least recently
+used entries are evicted when the cache grows over its size limit. The cache lives next to the article registry tree:
+
+article_registry_root/
+│- raw_cache
+│   │- index.sqlite3
+│   │- ab
+│       │- abcdef0123...
+"""
+import hashlib
+import io
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import BinaryIO, Optional, Tuple
+from src.config.config_loader import ConfigurationLoader
+
+
+class DownloadCache:
+    """Size-bounded LRU disk cache of raw ArXiv downloads."""
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    DIRNAME = "raw_cache"
+    DEFAULT_MAX_SIZE_GB = 50
+    EVICTION_WATERMARK = 0.9
+    CHUNK_SIZE = 1024 * 1024
+
+    @classmethod
+    def get_instance(cls) -> Optional['DownloadCache']:
+        """Get the cache shared by the process, or None if the cache is disabled in the configuration."""
+        with cls._instance_lock:
+            if cls._instance is None:
+                conf = ConfigurationLoader().get_config()
+                cache_conf = conf.get('download_cache', {})
+                if not cache_conf.get('enabled', False):
+                    return None
+                cls._instance = cls(
+                    Path(conf['articles']['download_location']) / cls.DIRNAME,
+                    max_size_bytes=int(cache_conf.get('max_size_gb', cls.DEFAULT_MAX_SIZE_GB) * 1024 ** 3),
+                    offline=cache_conf.get('offline', False)
+                )
+            return cls._instance
+
+    def __init__(self, root: str | Path, max_size_bytes: int, offline: bool = False):
+        """
+        Open the cache, creating it if needed.
+
+        Args:
+            root: Directory of the cache
+            max_size_bytes: Size above which least recently used entries are evicted
+            offline: Whether to serve from the cache only. Parsers fail on cache misses instead of downloading.
+        """
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_size_bytes = max_size_bytes
+        self.offline = offline
+        self.hits = 0
+        self.misses = 0
+
+        self._conn = sqlite3.connect(str(self.root / "index.sqlite3"), check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    digest TEXT NOT NULL,
+                    last_access REAL NOT NULL
+                )""")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS entries_digest ON entries (digest)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS blobs (
+                    digest TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL
+                )""")
+
+    @staticmethod
+    def split_version(arxiv_id: str) -> Tuple[str, str]:
+        """Split an arxiv_id into base id and version, e.g. '2402.12345v2' -> ('2402.12345', 'v2')."""
+        base, sep, version = arxiv_id.rpartition('v')
+        if sep and base and version.isdigit():
+            return base, sep + version
+        return arxiv_id, ''
+
+    @classmethod
+    def _key(cls, arxiv_id: str, fmt: str) -> str:
+        base, version = cls.split_version(arxiv_id)
+        return f"{base}|{version}|{fmt}"
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest
+
+    def open(self, arxiv_id: str, fmt: str) -> Optional[BinaryIO]:
+        """Open cached download of a paper in a format for reading, or return None on a cache miss."""
+        key = self._key(arxiv_id, fmt)
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT digest FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self._conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+        f = None
+        if row is not None:
+            try:
+                f = open(self._blob_path(row[0]), 'rb')
+            except FileNotFoundError:
+                # Removed from outside the cache, forget the entry
+                with self._lock, self._conn:
+                    self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+        with self._lock:
+            if f is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return f
+
+    def put(self, arxiv_id: str, fmt: str, data: bytes) -> None:
+        """Store download of a paper in a format. See put_file."""
+        self.put_file(arxiv_id, fmt, io.BytesIO(data))
+
+    def put_file(self, arxiv_id: str, fmt: str, source: BinaryIO) -> None:
+        """Store download of a paper in a format, evicting least recently used entries if the cache is full.
+
+        Args:
+            arxiv_id: ArXiv identifier of the paper
+            fmt: Format of the download
+            source: File to copy from its current position. It is left positioned where it was.
+        """
+        key = self._key(arxiv_id, fmt)
+        position = source.tell()
+        # Copy to a temporary file while hashing, and move it in place atomically so that readers never see a
+        # partial blob
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix='.tmp-')
+        try:
+            digest = hashlib.sha256()
+            size = 0
+            with os.fdopen(fd, 'wb') as f:
+                while chunk := source.read(self.CHUNK_SIZE):
+                    digest.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+            digest = digest.hexdigest()
+            path = self._blob_path(digest)
+            if path.exists():
+                os.unlink(tmp_path)
+            else:
+                path.parent.mkdir(exist_ok=True)
+                os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        finally:
+            source.seek(position)
+
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR IGNORE INTO blobs (digest, size) VALUES (?, ?)", (digest, size))
+            self._conn.execute(
+                "INSERT INTO entries (key, digest, last_access) VALUES (?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET digest = excluded.digest, last_access = excluded.last_access",
+                (key, digest, time.time())
+            )
+            self._evict()
+
+    def size(self) -> int:
+        """Total size of the cached downloads in bytes."""
+        with self._lock:
+            return self._size()
+
+    def _size(self) -> int:
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+
+    def _evict(self) -> None:
+        """Evict least recently used entries until the cache fits its size limit. Must hold the lock."""
+        size = self._size()
+        if size <= self.max_size_bytes:
+            return
+
+        # Evict down to a low watermark so that every following put does not have to evict
+        target = int(self.max_size_bytes * self.EVICTION_WATERMARK)
+        while size > target:
+            rows = self._conn.execute("SELECT key, digest FROM entries ORDER BY last_access LIMIT 64").fetchall()
+            if not rows:
+                break
+            for key, digest in rows:
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                referenced = self._conn.execute(
+                    "SELECT 1 FROM entries WHERE digest = ? LIMIT 1", (digest,)
+                ).fetchone()
+                if referenced:
+                    continue
+                blob_size = self._conn.execute("SELECT size FROM blobs WHERE digest = ?", (digest,)).fetchone()[0]
+                self._conn.execute("DELETE FROM blobs WHERE digest = ?", (digest,))
+                self._blob_path(digest).unlink(missing_ok=True)
+                size -= blob_size
+                if size <= target:
+                    break
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -1,5 +1,5 @@
 # html_parser.py
-from typing import Dict, Any
+from typing import Dict, Any, BinaryIO
 from bs4 import BeautifulSoup
 from .base import ArxivBase, ParserException
 
@@ -9,13 +9,19 @@ class ArxivHTMLParser(ArxivBase):
 
     BASE_HTML_URL = "https://arxiv.org/abs/"
 
-    def extract_text(self, arxiv_id: str) -> Dict[str, Any]:
-        """Extract text content from ArXiv's HTML abstract page."""
+    def download(self, arxiv_id: str) -> BinaryIO:
+        """Download ArXiv's HTML abstract page."""
         url = f"{self.BASE_HTML_URL}{arxiv_id}"
 
         try:
-            response = self._make_request(url)
-            soup = BeautifulSoup(response.text, 'html.parser')
+            return self._download(arxiv_id, 'html', url)
+        except Exception as e:
+            raise ParserException(f"Failed to download HTML: {str(e)}")
+
+    def parse(self, data: bytes | BinaryIO) -> Dict[str, Any]:
+        """Extract text content from ArXiv's HTML abstract page."""
+        try:
+            soup = BeautifulSoup(self.as_file(data), 'html.parser')
 
             content = {
                 'format': 'html',
@@ -0,0 +1,233 @@
+# oai_harvester.py
+"""
+Incremental harvester of ArXiv metadata over OAI-PMH, an alternative to listing papers with the search API.
+
+OAI-PMH lists the records whose metadata changed between two datestamps (day precision), including new versions of
+older papers, in large pages chained with resumption tokens. Categories are selected with OAI sets, which cover whole
+archives ('cs', 'physics:hep-th', ...), so the records are filtered to the wanted categories after parsing.
+
+The day up to which records have been harvested and imported is kept as a watermark in a small JSON file next to the
+article registry, so that the next harvest can continue from where the last one ended. The importer advances it once
+the papers of a day have been imported:
+
+article_registry_root/
+│- oai_watermark.json
+"""
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional
+from urllib.parse import urlencode
+from src.config.config_loader import ConfigurationLoader
+from .transport import ArxivTransport
+
+logger = logging.getLogger(__name__)
+
+
+class HarvestError(Exception):
+    """Error response of the OAI-PMH interface."""
+
+    def __init__(self, code: str, message: str):
+        super().__init__(f"OAI-PMH error {code}: {message}")
+        self.code = code
+
+
+class ArxivOAIHarvester:
+    """Lists ArXiv papers by metadata modification date over OAI-PMH."""
+
+    DEFAULT_BASE_URL = "https://oaipmh.arxiv.org/oai"
+    METADATA_PREFIX = "arXivRaw"
+    WATERMARK_FILENAME = "oai_watermark.json"
+
+    NS = {'oai': 'http://www.openarchives.org/OAI/2.0/',
+          'raw': 'http://arxiv.org/OAI/arXivRaw/'}
+
+    # Archives that are sets of their own, the other archives are subsets of the physics set
+    TOP_LEVEL_SETS = {'cs', 'econ', 'eess', 'math', 'q-bio', 'q-fin', 'stat'}
+
+    def __init__(
+            self,
+            transport: Optional[ArxivTransport] = None,
+            base_url: Optional[str] = None,
+            watermark_path: Optional[str | Path] = None
+    ):
+        """
+        Initialise the harvester.
+
+        Args:
+            transport: Transport for the requests to ArXiv. Defaults to the transport shared by the whole process.
+            base_url: URL of the OAI-PMH interface. Falls back to the 'oai' section of the configuration.
+            watermark_path: Path of the file the watermarks are kept in. Watermarks are not persisted by default.
+        """
+        conf = ConfigurationLoader().get_config().get('oai', {})
+        self._transport = transport
+        self.base_url = base_url or conf.get('base_url', self.DEFAULT_BASE_URL)
+        self.watermark_path = Path(watermark_path) if watermark_path else None
+        self._watermark_lock = threading.Lock()
+
+    @classmethod
+    def for_registry_root(cls, root: str | Path, **kwargs) -> 'ArxivOAIHarvester':
+        """Create a harvester keeping its watermarks in the root directory of an article registry."""
+        return cls(watermark_path=Path(root) / cls.WATERMARK_FILENAME, **kwargs)
+
+    @property
+    def transport(self) -> ArxivTransport:
+        if self._transport is None:
+            self._transport = ArxivTransport.get_instance()
+        return self._transport
+
+    @classmethod
+    def set_spec(cls, category: str) -> str:
+        """OAI set covering a category, e.g. 'cs' for 'cs.LG' and 'physics:hep-th' for 'hep-th'."""
+        archive = category.split('.')[0]
+        return archive if archive in cls.TOP_LEVEL_SETS else f"physics:{archive}"
+
+    @staticmethod
+    def _watermark_key(categories: Iterable[str]) -> str:
+        return ' '.join(sorted(set(categories)))
+
+    def _read_watermarks(self) -> Dict[str, str]:
+        if self.watermark_path is None or not self.watermark_path.exists():
+            return {}
+        with open(self.watermark_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def get_watermark(self, categories: Iterable[str]) -> Optional[datetime]:
+        """Get the day up to which (inclusive) the records of the categories have been harvested, if any."""
+        with self._watermark_lock:
+            day = self._read_watermarks().get(self._watermark_key(categories))
+        if day is None:
+            return None
+        return datetime.strptime(day, '%Y-%m-%d').replace(tzinfo=timezone.utc)
+
+    def set_watermark(self, categories: Iterable[str], day: datetime) -> None:
+        """Record that the records of the categories have been harvested up to a day (inclusive).
+        The watermark never moves backwards."""
+        if self.watermark_path is None:
+            return
+        key = self._watermark_key(categories)
+        day_key = day.strftime('%Y-%m-%d')
+        with self._watermark_lock:
+            watermarks = self._read_watermarks()
+            if watermarks.get(key, '') >= day_key:
+                return
+            watermarks[key] = day_key
+            self.watermark_path.parent.mkdir(parents=True, exist_ok=True)
+            # Write and rename, so that an interrupted write does not lose the watermarks
+            fd, tmp_path = tempfile.mkstemp(dir=self.watermark_path.parent, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(watermarks, f, indent=2)
+            os.replace(tmp_path, self.watermark_path)
+
+    def list_papers(self, categories: Iterable[str], start: datetime, end: datetime) -> Iterator[Dict[str, Any]]:
+        """List all papers of the given categories whose metadata changed within a window of days. The watermark is
+        not advanced, the importer does that once the papers of a day have been imported, see set_watermark.
+
+        Args:
+            categories: The ArXiv categories to list
+            start: First day of the window (inclusive)
+            end: Day at which the window ends (exclusive)
+
+        Yields:
+            Dict[str, Any]: Paper information dictionaries in the format of ArxivBase.list_papers, with the datestamp
+                of the last change of the record in 'updated'
+
+        Raises:
+            HarvestError: If the OAI-PMH interface responds with an error
+            requests.exceptions.RequestException: If there's an error with the request
+            xml.etree.ElementTree.ParseError: If the response XML cannot be parsed
+        """
+        categories = sorted(set(categories))
+        until = end - timedelta(days=1)
+        for set_spec in sorted({self.set_spec(category) for category in categories}):
+            yield from self.harvest(set_spec, start, until, categories)
+
+    def harvest(
+            self,
+            set_spec: Optional[str],
+            start: Optional[datetime] = None,
+            until: Optional[datetime] = None,
+            categories: Optional[Iterable[str]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Harvest the records of an OAI set that changed between two days, following resumption tokens.
+
+        Args:
+            set_spec: OAI set to harvest, or None for all records
+            start: First day (inclusive), from the beginning of time by default
+            until: Last day (inclusive), up to the latest records by default
+            categories: Categories of which a paper must have at least one. All papers of the set by default.
+
+        Yields:
+            Dict[str, Any]: Paper information dictionaries, see list_papers
+        """
+        wanted = set(categories) if categories else None
+        params = {'verb': 'ListRecords', 'metadataPrefix': self.METADATA_PREFIX}
+        if start:
+            params['from'] = start.strftime('%Y-%m-%d')
+        if until:
+            params['until'] = until.strftime('%Y-%m-%d')
+        if set_spec:
+            params['set'] = set_spec
+        description = f"set {set_spec or 'all'} from {params.get('from', 'the start')} until " \
+                      f"{params.get('until', 'now')}"
+
+        pages = 0
+        harvested = 0
+        while True:
+            root = ET.fromstring(self.transport.get(f"{self.base_url}?{urlencode(params)}").content)
+            error = root.find('oai:error', self.NS)
+            if error is not None:
+                if error.get('code') == 'noRecordsMatch':
+                    break
+                raise HarvestError(error.get('code'), (error.text or '').strip())
+
+            list_records = root.find('oai:ListRecords', self.NS)
+            if list_records is None:
+                break
+            for record in list_records.findall('oai:record', self.NS):
+                paper = self._parse_record(record)
+                if paper is None or (wanted and wanted.isdisjoint(paper['categories'])):
+                    continue
+                harvested += 1
+                yield paper
+            pages += 1
+
+            # An empty resumption token marks the last page
+            token = list_records.find('oai:resumptionToken', self.NS)
+            if token is None or not (token.text or '').strip():
+                break
+            params = {'verb': 'ListRecords', 'resumptionToken': token.text.strip()}
+            logger.info(f"Harvested {harvested} papers of {description} in {pages} pages so far, "
+                        f"continuing at cursor {token.get('cursor')} of {token.get('completeListSize')}...")
+
+        logger.info(f"Harvested {harvested} papers of {description}")
+
+    def _parse_record(self, record: ET.Element) -> Optional[Dict[str, Any]]:
+        """Parse paper information dictionary from an arXivRaw record, or None for a deleted record."""
+        header = record.find('oai:header', self.NS)
+        raw = record.find('oai:metadata/raw:arXivRaw', self.NS)
+        if header.get('status') == 'deleted' or raw is None:
+            return None
+
+        def text(tag: str) -> str:
+            return ' '.join((raw.findtext(f'raw:{tag}', '', self.NS)).split())
+
+        versions = raw.findall('raw:version', self.NS)
+        published = parsedate_to_datetime(versions[0].findtext('raw:date', '', self.NS))
+        authors = [author for author in re.split(r',\s*|\s+and\s+', text('authors')) if author]
+        return {
+            'arxiv_id': text('id') + versions[-1].get('version'),
+            'title': text('title'),
+            'authors': authors,
+            'published': published.isoformat(timespec='seconds').replace('+00:00', 'Z'),
+            'abstract': text('abstract'),
+            'categories': text('categories').split(),
+            'updated': header.findtext('oai:datestamp', '', self.NS),
+        }
@@ -0,0 +1,250 @@
+# parse_executor.py
+"""
+Process pool for the CPU-bound parsing of downloaded paper sources. pdfminer and the TeX cleanup hold the GIL, so
+parsing in threads does not use more than one core. The executor runs ArxivParser.parse in worker processes instead.
+
+Downloads spooled to disk and cached downloads are handed to the workers by path, so large sources are not copied
+through the pipe. Long PDFs are split into page ranges that are extracted by several workers in parallel.
+
+Every worker process serves one task at a time, so a task that runs over its timeout is stopped by killing its worker
+without affecting the tasks running in the other workers. The address space of the workers can be limited so
+that a pathological document fails with MemoryError instead of exhausting the host.
+"""
+import logging
+import multiprocessing
+import os
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, BinaryIO, Callable, Dict, Optional, Tuple
+from src.config.config_loader import ConfigurationLoader
+from .base import ArxivBase, ParserException
+from .pdf_parser import ArxivPDFParser
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+
+def _address_space_size() -> int:
+    """Current address space size of this process in bytes, or 0 if it cannot be determined."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[0]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return 0
+
+
+def _worker_main(conn, memory_limit_mb: Optional[int], parser_factory: Optional[Callable[[], Any]] = None) -> None:
+    """Entry point of a worker process. Runs tasks received from conn until None is received.
+
+    A task is a tuple (operation, format, data, path, arguments) where the raw paper source is either data or the file
+    at path. The operations are 'parse' (ArxivParser.parse), 'pdf_page_count' and 'pdf_pages' (the text of the page
+    range given by the arguments, see ArxivPDFParser.extract_pages). The parser is created by parser_factory, an
+    ArxivParser by default.
+    """
+    if memory_limit_mb and resource is not None:
+        # The limit is on top of what the worker inherited from the process it was forked from
+        limit = _address_space_size() + memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    if parser_factory is None:
+        from .parser import ArxivParser
+        parser_factory = ArxivParser
+    parser = parser_factory()
+    operations = {
+        'parse': parser.parse,
+        'pdf_page_count': lambda fmt, source: parser.pdf_parser.page_count(source),
+        'pdf_pages': lambda fmt, source, start, end: parser.pdf_parser.extract_pages(source, start, end),
+    }
+
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+
+        operation, fmt, data, path, args = task
+        try:
+            if path is not None:
+                with open(path, 'rb') as f:
+                    result = ('ok', operations[operation](fmt, f, *args))
+            else:
+                result = ('ok', operations[operation](fmt, data, *args))
+        except MemoryError:
+            result = ('error', f"Parsing {fmt} exceeded the memory limit of {memory_limit_mb} MB")
+        except Exception as e:
+            result = ('error', str(e))
+        del task, data
+        conn.send(result)
+
+
+class _Worker:
+    """A worker process and the parent's end of the pipe to it."""
+
+    def __init__(self, context, memory_limit_mb: Optional[int], parser_factory: Optional[Callable[[], Any]] = None):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, memory_limit_mb, parser_factory),
+                                       daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.tasks = 0
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout=1)
+        self.kill()
+
+    def kill(self) -> None:
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class ParseExecutor:
+    """Executes ArxivParser.parse in a pool of worker processes.
+
+    The executor is meant to be shared by the threads that need parsing done, e.g. the parse stage of the import
+    pipeline. Each call to parse() blocks the calling thread until a worker has finished the task.
+    """
+
+    DEFAULT_TASK_TIMEOUT = 300
+    DEFAULT_MAX_TASKS_PER_WORKER = 200
+    DEFAULT_PDF_PAGES_PER_TASK = 8
+
+    def __init__(
+            self,
+            processes: Optional[int] = None,
+            task_timeout: Optional[float] = None,
+            memory_limit_mb: Optional[int] = None,
+            max_tasks_per_worker: Optional[int] = None,
+            pdf_pages_per_task: Optional[int] = None,
+            parser_factory: Optional[Callable[[], Any]] = None
+    ):
+        """
+        Initialise the executor. Worker processes are started on first use.
+
+        Args:
+            processes: Number of worker processes. Defaults to the number of CPUs.
+            task_timeout: Seconds after which a task is aborted by killing its worker
+            memory_limit_mb: Megabytes of address space a worker may allocate on top of its initial footprint. No
+                limit by default.
+            max_tasks_per_worker: Number of tasks after which a worker is replaced to release leaked memory
+            pdf_pages_per_task: Number of pages above which a PDF is split into page ranges extracted in parallel.
+                0 disables splitting.
+            parser_factory: Picklable function creating the parser in every worker process. Defaults to ArxivParser.
+        """
+        conf = ConfigurationLoader().get_config().get('importer', {}).get('parse_executor', {})
+        self.processes = processes or conf.get('processes') or os.cpu_count() or 1
+        self.task_timeout = task_timeout or conf.get('task_timeout', self.DEFAULT_TASK_TIMEOUT)
+        self.memory_limit_mb = memory_limit_mb or conf.get('memory_limit_mb')
+        self.max_tasks_per_worker = (max_tasks_per_worker or
+                                     conf.get('max_tasks_per_worker', self.DEFAULT_MAX_TASKS_PER_WORKER))
+        self.pdf_pages_per_task = (pdf_pages_per_task if pdf_pages_per_task is not None else
+                                   conf.get('pdf_pages_per_task', self.DEFAULT_PDF_PAGES_PER_TASK))
+        self.parser_factory = parser_factory
+
+        # Workers are forked from a server process that has the parsers imported already. The default start method
+        # would import the main module of the program anew in every worker.
+        if 'forkserver' in multiprocessing.get_all_start_methods():
+            self._context = multiprocessing.get_context('forkserver')
+            self._context.set_forkserver_preload(['__main__', 'src.arxiv_agent.parser.parser'])
+        else:
+            self._context = multiprocessing.get_context('spawn')
+
+        # Idle slots hold either a started worker or None for a worker to be started on demand
+        self._idle: queue.Queue = queue.Queue()
+        for _ in range(self.processes):
+            self._idle.put(None)
+        # Waits for the page ranges of split PDFs. The threads only wait, the work is done by the worker processes.
+        self._splitter = ThreadPoolExecutor(max_workers=self.processes, thread_name_prefix='pdf-pages')
+        self._pdf_parser = ArxivPDFParser()
+        self._closed = False
+
+    def parse(self, fmt: str, data: bytes | BinaryIO) -> Dict[str, Any]:
+        """Extract text content from raw paper source in a worker process. See ArxivParser.parse.
+
+        A PDF longer than pdf_pages_per_task pages is extracted in page ranges by several workers, and the text of
+        the ranges is merged in page order.
+
+        Raises:
+            ParserException: If parsing fails, times out, or the worker dies
+        """
+        if self._closed:
+            raise RuntimeError("ParseExecutor is closed")
+
+        path = ArxivBase.file_path(data)
+        if path is None and not isinstance(data, (bytes, bytearray)):
+            # Held in memory, small enough to send by value
+            data = ArxivBase.as_file(data).read()
+        data = None if path else data
+
+        if fmt != 'pdf' or not self.pdf_pages_per_task or self.processes < 2:
+            return self._run(('parse', fmt, data, path, ()))
+
+        page_count = self._run(('pdf_page_count', fmt, data, path, ()))
+        max_pages = self._pdf_parser.max_pages
+        if max_pages:
+            page_count = min(page_count, max_pages)
+        ranges = ArxivPDFParser.page_ranges(page_count, self.pdf_pages_per_task)
+        if len(ranges) < 2:
+            return self._run(('parse', fmt, data, path, ()))
+        tasks = [('pdf_pages', fmt, data, path, (pages.start, pages.stop)) for pages in ranges]
+        return ArxivPDFParser.build_content(''.join(self._splitter.map(self._run, tasks)))
+
+    def _run(self, task: Tuple) -> Any:
+        """Run a task in an idle worker, starting a worker if needed, and return its result."""
+        operation, fmt = task[:2]
+        worker = self._idle.get()
+        try:
+            if worker is None:
+                worker = _Worker(self._context, self.memory_limit_mb, self.parser_factory)
+
+            try:
+                worker.conn.send(task)
+                if not worker.conn.poll(self.task_timeout):
+                    worker.kill()
+                    worker = None
+                    raise ParserException(f"Parsing {fmt} timed out after {self.task_timeout} seconds")
+                status, payload = worker.conn.recv()
+            except (EOFError, OSError) as e:
+                # The pipe closes just before the process exits
+                worker.process.join(timeout=1)
+                exitcode = worker.process.exitcode
+                worker.kill()
+                worker = None
+                raise ParserException(f"Parse worker died while parsing {fmt} (exit code {exitcode}): {str(e)}")
+
+            worker.tasks += 1
+            if worker.tasks >= self.max_tasks_per_worker:
+                worker.stop()
+                worker = None
+
+            if status != 'ok':
+                raise ParserException(payload)
+            return payload
+        finally:
+            self._idle.put(worker)
+
+    def close(self) -> None:
+        """Stop all worker processes. Waits for running tasks to finish."""
+        self._closed = True
+        self._splitter.shutdown()
+        for _ in range(self.processes):
+            worker = self._idle.get()
+            if worker is not None:
+                worker.stop()
+
+    def __enter__(self) -> 'ParseExecutor':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
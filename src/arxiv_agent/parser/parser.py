@@ -1,61 +1,196 @@
 # parser.py
 import os
 import json
+import threading
 import traceback
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, BinaryIO, Iterable, Iterator, List, Optional, Sequence, Tuple
 import logging
 from .base import ArxivBase, ParserException
 from .tex_parser import ArxivTexParser
 from .pdf_parser import ArxivPDFParser
 from .html_parser import ArxivHTMLParser
+from .download_cache import DownloadCache
+from .parse_executor import ParseExecutor
+from .transport import ArxivTransport
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class RoutingStats:
+    """Counters of the format routing.
+
+    Attributes:
+        downloads: Downloads made per source
+        parsed: Successful parses per format
+        failed: Failed parses per format
+        fallbacks: Downloads made because the routed source did not produce text
+        pdf_from_eprint: PDFs served by the e-print endpoint, each saving a separate PDF download
+    """
+    downloads: Dict[str, int] = field(default_factory=dict)
+    parsed: Dict[str, int] = field(default_factory=dict)
+    failed: Dict[str, int] = field(default_factory=dict)
+    fallbacks: int = 0
+    pdf_from_eprint: int = 0
+
+
 class ArxivParser:
-    """Main interface for ArXiv paper parsing."""
+    """Main interface for ArXiv paper parsing.
 
-    def __init__(self):
-        self.tex_parser = ArxivTexParser()
-        self.pdf_parser = ArxivPDFParser()
-        self.html_parser = ArxivHTMLParser()
+    Papers are downloaded from one of the sources in SOURCES. The e-print endpoint serves the TeX sources of a paper,
+    or the PDF if the paper was submitted as PDF only, so the format is detected from the downloaded bytes and every
+    paper is normally downloaded once. The separate PDF and HTML sources are only used as fallbacks, or directly when
+    a fallback source was remembered to be the one that works for a paper.
+    """
 
-    def extract_paper_text(self, arxiv_id: str) -> Dict[str, Any]:
+    FORMATS = ('tex', 'pdf', 'html')
+    SOURCES = ('eprint', 'pdf', 'html')
+
+    def __init__(self, parse_executor: Optional[ParseExecutor] = None, transport: Optional[ArxivTransport] = None):
         """
-        Try to extract paper text using parsers in order: TeX -> PDF -> HTML.
+        Initialise the parsers.
+
+        Args:
+            parse_executor: Process pool to run the parsing in. Parsing runs in the calling thread by default.
+            transport: Transport shared by the parsers. Defaults to the transport shared by the whole process.
+        """
+        self.parse_executor = parse_executor
+        self.tex_parser = ArxivTexParser(transport)
+        self.pdf_parser = ArxivPDFParser(transport)
+        self.html_parser = ArxivHTMLParser(transport)
+        self.parsers = {
+            'tex': self.tex_parser,
+            'pdf': self.pdf_parser,
+            'html': self.html_parser,
+        }
+        self._known_sources: Dict[str, str] = {}
+        self._stats = RoutingStats()
+        self._stats_lock = threading.Lock()
+
+    @staticmethod
+    def _base_id(arxiv_id: str) -> str:
+        return DownloadCache.split_version(arxiv_id)[0]
+
+    @staticmethod
+    def detect_format(data: bytes | BinaryIO) -> str:
+        """Detect the format of downloaded paper source from its leading bytes."""
+        if isinstance(data, (bytes, bytearray)):
+            head = data[:1024]
+        else:
+            data.seek(0)
+            head = data.read(1024)
+            data.seek(0)
+        head = head.lstrip()
+        if head.startswith(b'%PDF'):
+            return 'pdf'
+        if head[:1] == b'<' and b'<html' in head.lower():
+            return 'html'
+        # Gzipped or plain tar archives, gzipped or plain single TeX files
+        return 'tex'
+
+    def remember_source(self, arxiv_id: str, source: str) -> None:
+        """Remember the source that produced text for a paper, so that later downloads of it go there directly."""
+        if source not in self.SOURCES:
+            raise ValueError(f"Unknown source: {source}")
+        self._known_sources[self._base_id(arxiv_id)] = source
+
+    def route(self, arxiv_id: str) -> List[str]:
+        """Sources to download a paper from, in the order to try them."""
+        known = self._known_sources.get(self._base_id(arxiv_id))
+        if known:
+            return [known] + [source for source in self.SOURCES if source != known]
+        return list(self.SOURCES)
+
+    def _count(self, counter: str, key: Optional[str] = None) -> None:
+        with self._stats_lock:
+            if key is None:
+                setattr(self._stats, counter, getattr(self._stats, counter) + 1)
+            else:
+                counts = getattr(self._stats, counter)
+                counts[key] = counts.get(key, 0) + 1
+
+    @property
+    def stats(self) -> RoutingStats:
+        """Snapshot of the routing counters."""
+        with self._stats_lock:
+            return RoutingStats(downloads=dict(self._stats.downloads), parsed=dict(self._stats.parsed),
+                                failed=dict(self._stats.failed), fallbacks=self._stats.fallbacks,
+                                pdf_from_eprint=self._stats.pdf_from_eprint)
+
+    def download(self, arxiv_id: str, fmt: str) -> BinaryIO:
+        """Download raw paper source in the given format. The caller must close the returned file."""
+        return self.parsers[fmt].download(arxiv_id)
+
+    def fetch(self, arxiv_id: str, source: str) -> Tuple[str, BinaryIO]:
+        """Download raw paper source from a source and detect its format.
+
+        Returns:
+            Tuple[str, BinaryIO]: Format of the source and the source itself. The caller must close the file.
+        """
+        self._count('downloads', source)
+        if source == 'eprint':
+            data = self.tex_parser.download(arxiv_id)
+            fmt = self.detect_format(data)
+            if fmt == 'pdf':
+                self._count('pdf_from_eprint')
+            return fmt, data
+        return source, self.download(arxiv_id, source)
+
+    def parse(self, fmt: str, data: bytes | BinaryIO) -> Dict[str, Any]:
+        """Extract text content from raw paper source in the given format."""
+        try:
+            if self.parse_executor is not None:
+                result = self.parse_executor.parse(fmt, data)
+            else:
+                result = self.parsers[fmt].parse(data)
+        except ParserException:
+            self._count('failed', fmt)
+            raise
+        self._count('parsed' if result['success'] else 'failed', fmt)
+        return result
+
+    def extract_paper_text(
+            self,
+            arxiv_id: str,
+            sources: Optional[Sequence[str]] = None,
+            tried_formats: Iterable[str] = ()
+    ) -> Dict[str, Any]:
+        """
+        Try to extract paper text from the sources in routing order, by default e-print -> PDF -> HTML.
         Returns the first successful result.
+
+        Args:
+            arxiv_id: ArXiv identifier of the paper
+            sources: Sources to try, in order. Defaults to the routing order of the paper.
+            tried_formats: Formats that have failed already. A source is skipped if it would only produce one of them.
         """
         result = None
         errors = []
+        tried_formats = set(tried_formats)
+        fallback = bool(tried_formats)
 
-        # Try TeX parser first
-        try:
-            result = self.tex_parser.extract_text(arxiv_id)
-            if result['success']:
-                logger.info(f"Successfully extracted TeX for {arxiv_id}")
-                return result
-        except ParserException as e:
-            errors.append(f"TeX parsing failed: {str(e)}")
-
-        # Try PDF parser next
-        try:
-            result = self.pdf_parser.extract_text(arxiv_id)
-            if result['success']:
-                logger.info(f"Successfully extracted PDF for {arxiv_id}")
-                return result
-        except ParserException as e:
-            errors.append(f"PDF parsing failed: {str(e)}")
-
-        # Finally, try HTML
-        try:
-            result = self.html_parser.extract_text(arxiv_id)
-            if result['success']:
-                logger.info(f"Successfully extracted HTML for {arxiv_id}")
-                return result
-        except ParserException as e:
-            errors.append(f"HTML parsing failed: {str(e)}")
+        for source in sources if sources is not None else self.route(arxiv_id):
+            if source != 'eprint' and source in tried_formats:
+                continue
+            try:
+                if fallback:
+                    self._count('fallbacks')
+                fallback = True
+                fmt, data = self.fetch(arxiv_id, source)
+                with data:
+                    if fmt in tried_formats:
+                        continue
+                    tried_formats.add(fmt)
+                    result = self.parse(fmt, data)
+                if result['success']:
+                    logger.info(f"Successfully extracted {fmt.upper()} for {arxiv_id}")
+                    self.remember_source(arxiv_id, source)
+                    return result
+            except ParserException as e:
+                errors.append(f"{source.upper()} parsing failed: {str(e)}")
 
         # If all parsers fail, raise exception with all errors
         if not result or not result['success']:
@@ -67,6 +202,29 @@ class ArxivParser:
         """Get list of papers published on a specific date."""
         return self.tex_parser.list_daily_papers(date, category)
 
+    def list_papers(self, categories: Iterable[str], start: datetime, end: datetime) -> Iterator[Dict[str, Any]]:
+        """Iterate over papers published in any of the categories between start and end. See ArxivBase.list_papers."""
+        return self.tex_parser.list_papers(categories, start, end)
+
+    @staticmethod
+    def build_paper_data(paper: Dict[str, Any], content: Dict[str, Any]) -> Dict[str, Any]:
+        """Merge API metadata with extracted content into article.json data."""
+        paper_data = {**paper, **content}
+
+        # Store processed_at
+        paper_data['processed_at'] = datetime.now(timezone.utc).isoformat(timespec='seconds').replace('+00:00', 'Z')
+        if isinstance(paper_data['published'], datetime):
+            paper_data['published'] = paper_data['published'].isoformat(timespec='seconds').replace('+00:00', 'Z')
+        return paper_data
+
+    @staticmethod
+    def write_paper_data(paper_data: Dict[str, Any], output_dir: str) -> str:
+        """Write article.json data into output_dir. Returns the path of the written file."""
+        output_path = os.path.join(output_dir, "article.json")
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(paper_data, f, ensure_ascii=False, indent=2)
+        return output_path
+
     def save_papers(self, papers: list, output_dir: str) -> None:
         """Save extracted paper content to JSON files."""
         for paper in papers:
@@ -74,20 +232,9 @@ class ArxivParser:
                 # Extract text using available parsers
                 content = self.extract_paper_text(paper['arxiv_id'])
 
-                # Merge API metadata with extracted content
-                paper_data = {**paper, **content}
-
-                # Store processed_at
-                paper_data['processed_at'] = datetime.now(timezone.utc).isoformat(timespec='seconds').replace('+00:00', 'Z')
-                paper_data['published'] = paper_data['published'].isoformat(timespec='seconds').replace('+00:00', 'Z')
-
-                filename = "article.json"
-                output_path = os.path.join(output_dir, filename)
-
                 # Save as JSON
-                with open(output_path, 'w', encoding='utf-8') as f:
-                    json.dump(paper_data, f, ensure_ascii=False, indent=2)
-                logger.info(f"Successfully saved: {filename}")
+                self.write_paper_data(self.build_paper_data(paper, content), output_dir)
+                logger.info(f"Successfully saved: article.json")
 
             except Exception as e:
                 traceback.print_exc()
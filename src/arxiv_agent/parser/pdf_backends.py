@@ -0,0 +1,207 @@
+# pdf_backends.py
+"""
+Text extraction backends for PDF papers. pdfminer is always available. PyMuPDF and pypdf only read the text layer of
+the PDF without pdfminer's layout analysis, which makes them considerably faster. The 'auto' setting picks the first
+installed backend of AUTO_ORDER, or of the 'auto_order' of the 'pdf' section of the configuration, and logs its choice.
+
+All backends extract a range of pages, so that long documents can be extracted in parts in parallel and the parts
+merged in page order.
+"""
+import io
+import logging
+import threading
+from abc import ABC, abstractmethod
+from typing import BinaryIO, Dict, Optional, Sequence, Type
+from pdfminer.high_level import extract_text_to_fp
+from pdfminer.layout import LAParams
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdfparser import PDFParser
+from pdfminer.pdftypes import resolve1
+
+try:
+    import pymupdf
+except ImportError:
+    try:
+        import fitz as pymupdf  # Older PyMuPDF releases
+    except ImportError:
+        pymupdf = None
+
+try:
+    import pypdf
+except ImportError:
+    pypdf = None
+
+logger = logging.getLogger(__name__)
+
+
+class PDFBackend(ABC):
+    """Extracts the text of PDF documents."""
+
+    name: str = None
+
+    @classmethod
+    def available(cls) -> bool:
+        """Whether the library of the backend is installed."""
+        return True
+
+    @abstractmethod
+    def page_count(self, f: BinaryIO, path: Optional[str] = None) -> int:
+        """
+        Count the pages of a PDF document.
+
+        Args:
+            f: The document, positioned at the start
+            path: Path of the document on disk, if it has one. Lets backends open the file themselves.
+        """
+        pass
+
+    @abstractmethod
+    def extract(self, f: BinaryIO, path: Optional[str] = None, start: int = 0, end: Optional[int] = None) -> str:
+        """
+        Extract the text of a range of pages of a PDF document.
+
+        Args:
+            f: The document, positioned at the start
+            path: Path of the document on disk, if it has one. Lets backends open the file themselves.
+            start: Index of the first page to extract, starting from 0
+            end: Index of the page after the last page to extract. Defaults to the end of the document.
+        """
+        pass
+
+
+class PdfminerBackend(PDFBackend):
+    """Extracts text with pdfminer's layout analysis."""
+
+    name = 'pdfminer'
+
+    def __init__(self):
+        self.laparams = LAParams(
+            line_margin=0.5,
+            word_margin=0.1,
+            char_margin=2.0,
+            boxes_flow=0.5,
+            detect_vertical=True
+        )
+
+    def page_count(self, f: BinaryIO, path: Optional[str] = None) -> int:
+        """See parent class."""
+        document = PDFDocument(PDFParser(f))
+        pages = resolve1(document.catalog.get('Pages'))
+        count = resolve1(pages.get('Count')) if isinstance(pages, dict) else None
+        if isinstance(count, int):
+            return count
+        # Malformed page tree, count the pages one by one
+        f.seek(0)
+        return sum(1 for _ in PDFPage.get_pages(f))
+
+    def extract(self, f: BinaryIO, path: Optional[str] = None, start: int = 0, end: Optional[int] = None) -> str:
+        """See parent class."""
+        page_numbers = set(range(start, end)) if end is not None else None
+        if page_numbers is None and start:
+            page_numbers = set(range(start, self.page_count(f)))
+            f.seek(0)
+        # pdfminer reads the objects it needs from the file, so the PDF is not read into memory as a whole
+        output_string = io.StringIO()
+        extract_text_to_fp(f, output_string, laparams=self.laparams, page_numbers=page_numbers)
+        return output_string.getvalue()
+
+
+class PyMuPDFBackend(PDFBackend):
+    """Extracts the text layer with PyMuPDF."""
+
+    name = 'pymupdf'
+
+    @classmethod
+    def available(cls) -> bool:
+        """See parent class."""
+        return pymupdf is not None
+
+    @staticmethod
+    def _open(f: BinaryIO, path: Optional[str]):
+        if path is not None:
+            return pymupdf.open(path, filetype='pdf')
+        return pymupdf.open(stream=f.read(), filetype='pdf')
+
+    def page_count(self, f: BinaryIO, path: Optional[str] = None) -> int:
+        """See parent class."""
+        with self._open(f, path) as document:
+            return document.page_count
+
+    def extract(self, f: BinaryIO, path: Optional[str] = None, start: int = 0, end: Optional[int] = None) -> str:
+        """See parent class."""
+        with self._open(f, path) as document:
+            end = document.page_count if end is None else min(end, document.page_count)
+            return ''.join(document[i].get_text() + '\f' for i in range(start, end))
+
+
+class PypdfBackend(PDFBackend):
+    """Extracts the text layer with pypdf."""
+
+    name = 'pypdf'
+
+    @classmethod
+    def available(cls) -> bool:
+        """See parent class."""
+        return pypdf is not None
+
+    def page_count(self, f: BinaryIO, path: Optional[str] = None) -> int:
+        """See parent class."""
+        return len(pypdf.PdfReader(f).pages)
+
+    def extract(self, f: BinaryIO, path: Optional[str] = None, start: int = 0, end: Optional[int] = None) -> str:
+        """See parent class."""
+        pages = pypdf.PdfReader(f).pages
+        end = len(pages) if end is None else min(end, len(pages))
+        return ''.join((pages[i].extract_text() or '') + '\f' for i in range(start, end))
+
+
+BACKENDS: Dict[str, Type[PDFBackend]] = {
+    PyMuPDFBackend.name: PyMuPDFBackend,
+    PypdfBackend.name: PypdfBackend,
+    PdfminerBackend.name: PdfminerBackend,
+}
+# Backends in the order of preference of the 'auto' setting
+AUTO_ORDER = (PyMuPDFBackend.name, PypdfBackend.name, PdfminerBackend.name)
+
+# Choices of the 'auto' setting logged so far, every parser and parse worker resolves its own backend
+_logged_choices = set()
+_logged_choices_lock = threading.Lock()
+
+
+def get_pdf_backend(name: str = 'auto', auto_order: Optional[Sequence[str]] = None) -> PDFBackend:
+    """
+    Get a PDF backend by name.
+
+    Args:
+        name: One of BACKENDS, or 'auto' for the first installed backend of auto_order
+        auto_order: Backends to choose from for 'auto', in the order of preference. Defaults to AUTO_ORDER.
+
+    Raises:
+        ValueError: If the backend is unknown or its library is not installed, or no backend of auto_order is
+            installed
+    """
+    if name != 'auto':
+        return _create(name)
+
+    auto_order = tuple(auto_order or AUTO_ORDER)
+    for backend_name in auto_order:
+        if backend_name not in BACKENDS:
+            raise ValueError(f"Unknown PDF backend: {backend_name}")
+    chosen = next((backend_name for backend_name in auto_order if BACKENDS[backend_name].available()), None)
+    if chosen is None:
+        raise ValueError(f"None of the PDF backends {', '.join(auto_order)} is installed")
+    with _logged_choices_lock:
+        log = (auto_order, chosen) not in _logged_choices
+        _logged_choices.add((auto_order, chosen))
+    if log:
+        logger.info(f"Extracting PDF text with {chosen}, the first installed of {', '.join(auto_order)}")
+    return BACKENDS[chosen]()
+
+
+def _create(name: str) -> PDFBackend:
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown PDF backend: {name}")
+    if not BACKENDS[name].available():
+        raise ValueError(f"PDF backend {name} is not installed")
+    return BACKENDS[name]()
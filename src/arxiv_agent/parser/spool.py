@@ -0,0 +1,67 @@
+# spool.py
+"""
+Spool file for streamed downloads. Small downloads stay in memory, larger ones are moved to a temporary file on disk as
+soon as they grow over the in-memory limit, so the memory held per download is bounded regardless of its size.
+"""
+import io
+import tempfile
+from typing import Optional
+
+
+class SpoolFile:
+    """Binary file buffered in memory up to max_memory bytes and in a named temporary file on disk above that.
+
+    Unlike tempfile.SpooledTemporaryFile the file on disk has a path, so a spooled download can be handed to a parse
+    worker process by name instead of by value. The temporary file is deleted when the spool file is closed.
+    """
+
+    def __init__(self, max_memory: int, dir: Optional[str] = None):
+        """
+        Initialise an empty spool file.
+
+        Args:
+            max_memory: Size in bytes above which the content is moved to disk
+            dir: Directory of the temporary file. Defaults to the system temporary directory.
+        """
+        self.max_memory = max_memory
+        self.dir = dir
+        self._file = io.BytesIO()
+        self._rolled = False
+
+    @property
+    def path(self) -> Optional[str]:
+        """Path of the file on disk, or None while the content is held in memory."""
+        return self._file.name if self._rolled else None
+
+    def write(self, data: bytes) -> int:
+        written = self._file.write(data)
+        if not self._rolled and self._file.tell() > self.max_memory:
+            self.rollover()
+        return written
+
+    def rollover(self) -> None:
+        """Move the content to disk."""
+        if self._rolled:
+            return
+        position = self._file.tell()
+        disk_file = tempfile.NamedTemporaryFile(dir=self.dir, prefix='arxiv-', suffix='.spool')
+        try:
+            disk_file.write(self._file.getbuffer())
+            disk_file.seek(position)
+        except BaseException:
+            # E.g. a full disk, the partial file is deleted on close
+            disk_file.close()
+            raise
+        self._file.close()
+        self._file = disk_file
+        self._rolled = True
+
+    def __getattr__(self, name):
+        # read, seek, tell, close etc. of the underlying file
+        return getattr(self._file, name)
+
+    def __enter__(self) -> 'SpoolFile':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self._file.close()
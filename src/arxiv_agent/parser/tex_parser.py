@@ -1,97 +1,83 @@
 # tex_parser.py
-import re
-import io
+import gzip
+import posixpath
 import tarfile
-from typing import Dict, Any
+from typing import Dict, Any, BinaryIO, Optional, Tuple
 from .base import ArxivBase, ParserException
+from .tex_to_text import tex_to_text
 
 
 class ArxivTexParser(ArxivBase):
     """Parser for TeX source files from ArXiv."""
 
     BASE_TEX_URL = "https://arxiv.org/e-print/"
+    DOCUMENTCLASS_SEARCH_CHARS = 64 * 1024
+    SOURCE_EXTENSIONS = ('.tex', '.bbl')
+    MAX_SOURCE_FILE_BYTES = 16 * 1024 * 1024  # Larger .tex files are generated tables or data, not text
+    SINGLE_FILE_NAME = 'main.tex'
 
-    def extract_text(self, arxiv_id: str) -> Dict[str, Any]:
-        """Download and extract text content from TeX source files."""
+    def download(self, arxiv_id: str) -> BinaryIO:
+        """Download e-print of the paper. Usually a TeX source archive, but PDF-only submissions are served as PDF."""
         url = f"{self.BASE_TEX_URL}{arxiv_id}"
 
         try:
-            response = self._make_request(url)
-            tar = tarfile.open(fileobj=io.BytesIO(response.content), mode="r:*")
-
-            content = {
-                'format': 'tex',
-                'sections': [],
-                'figures': [],
-                'equations': [],
-                'bibliography': [],
-                'main_text': '',
-                'success': False
-            }
-
-            # Find main tex file
-            main_tex = None
-            for member in tar.getmembers():
-                if member.name.endswith('.tex'):
-                    f = tar.extractfile(member)
-                    if f:
-                        tex_content = f.read().decode('utf-8', errors='ignore')
-                        if '\\documentclass' in tex_content:
-                            main_tex = tex_content
-                            break
+            return self._download(arxiv_id, 'eprint', url)
+        except Exception as e:
+            raise ParserException(f"Failed to download TeX: {str(e)}")
 
-            if not main_tex:
+    def parse(self, data: bytes | BinaryIO) -> Dict[str, Any]:
+        """Extract text content from TeX source archive."""
+        try:
+            main_name, files = self._read_sources(data)
+            if main_name is None:
                 raise ParserException("No main TeX file found")
 
-            # Extract sections
-            content['sections'] = re.findall(
-                r'\\(?:section|subsection|subsubsection)\{([^}]+)\}',
-                main_tex
-            )
-
-            # Extract figures
-            content['figures'] = re.findall(
-                r'\\caption\{([^}]+)\}',
-                main_tex
-            )
-
-            # Extract equations
-            content['equations'] = re.findall(
-                r'\\begin\{equation\*?\}(.*?)\\end\{equation\*?\}',
-                main_tex,
-                re.DOTALL
-            )
-
-            # Extract bibliography
-            content['bibliography'] = re.findall(
-                r'\\bibitem(?:\[[^\]]*\])?\{([^}]+)\}(.*?)(?=\\bibitem|\n\n|$)',
-                main_tex,
-                re.DOTALL
-            )
-
-            # Clean and extract main text
-            content['main_text'] = self._clean_tex(main_tex)
+            content = {'format': 'tex'}
+            content.update(tex_to_text(files[main_name], files, main_name))
             content['success'] = True
-
-            tar.close()
             return content
 
         except Exception as e:
             raise ParserException(f"Failed to parse TeX: {str(e)}")
 
-    def _clean_tex(self, text: str) -> str:
-        """Clean TeX commands and formatting from text."""
-        # Remove comments
-        text = re.sub(r'%.*$', '', text, flags=re.MULTILINE)
+    @classmethod
+    def _read_sources(cls, data: bytes | BinaryIO) -> Tuple[Optional[str], Dict[str, str]]:
+        """Read the TeX and .bbl files of an e-print.
 
-        # Remove common LaTeX commands
-        text = re.sub(r'\\[a-zA-Z]+(?:\[.*?\])?(?:\{.*?\})?', '', text)
-
-        # Remove math environments
-        text = re.sub(r'\\begin\{equation\*?\}.*?\\end\{equation\*?\}', '', text, flags=re.DOTALL)
-        text = re.sub(r'\$\$.*?\$\$', '', text, flags=re.DOTALL)
-        text = re.sub(r'\$.*?\$', '', text)
-
-        # Clean up whitespace
-        text = re.sub(r'\s+', ' ', text)
-        return text.strip()
\ No newline at end of file
+        Returns:
+            Tuple[Optional[str], Dict[str, str]]: Path of the main TeX file, i.e. the one with \\documentclass, or
+                None if there is none, and the sources of the files by their path in the archive
+        """
+        f = cls.as_file(data)
+        try:
+            tar = tarfile.open(fileobj=f, mode="r:*")
+        except tarfile.ReadError:
+            # Single file submissions are served as gzipped or plain TeX instead of an archive
+            f.seek(0)
+            gzipped = f.read(2) == b'\x1f\x8b'
+            f.seek(0)
+            source = gzip.GzipFile(fileobj=f) if gzipped else f
+            tex_content = source.read().decode('utf-8', errors='ignore')
+            main_name = cls.SINGLE_FILE_NAME if '\\documentclass' in tex_content else None
+            return main_name, {cls.SINGLE_FILE_NAME: tex_content}
+
+        # Members are read one at a time, in one pass over the archive. The data of other members, e.g. figures and
+        # datasets, is skipped over without being read into memory.
+        main_name = None
+        files = {}
+        with tar:
+            for member in tar:
+                if (not member.isfile() or not member.name.endswith(cls.SOURCE_EXTENSIONS)
+                        or member.size > cls.MAX_SOURCE_FILE_BYTES):
+                    continue
+                member_file = tar.extractfile(member)
+                if member_file is None:
+                    continue
+                with member_file:
+                    name = posixpath.normpath(member.name)
+                    files[name] = member_file.read().decode('utf-8', errors='ignore')
+                # \documentclass is in the preamble, the head of the file is enough to tell
+                if (main_name is None and name.endswith('.tex')
+                        and '\\documentclass' in files[name][:cls.DOCUMENTCLASS_SEARCH_CHARS]):
+                    main_name = name
+        return main_name, files
@@ -0,0 +1,376 @@
+# tex_to_text.py
+"""
+Single pass TeX to text conversion. The source is split into tokens (text runs, control sequences, braces, comments,
+math, and environments whose content is not text) by one compiled regular expression, and a walker over the tokens
+produces the main text together with section titles, figure captions, equations and bibliography entries. Files
+pulled in with \\input, \\include and \\bibliography (the .bbl file) are spliced into the token stream where they are
+referenced.
+
+The conversion is not a TeX interpreter. Macros defined by the paper are not expanded, the arguments of unknown
+commands are kept as text, and the arguments of commands that never carry text (\\cite, \\label, \\includegraphics
+etc.) are dropped.
+"""
+import posixpath
+import re
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+SECTION_COMMANDS = {'section', 'subsection', 'subsubsection'}
+INPUT_COMMANDS = {'input', 'include', 'subfile'}
+MATH_ENVIRONMENTS = {'equation', 'equation*', 'align', 'align*', 'alignat', 'alignat*', 'gather', 'gather*',
+                     'multline', 'multline*', 'eqnarray', 'eqnarray*', 'displaymath', 'flalign', 'flalign*'}
+SKIPPED_ENVIRONMENTS = {'comment', 'verbatim', 'verbatim*', 'lstlisting', 'minted', 'tikzpicture', 'picture'}
+# Number of arguments of environments that are not text, e.g. the column specification of a tabular
+ENVIRONMENT_ARGUMENTS = {'tabular': 1, 'tabular*': 2, 'tabularx': 2, 'array': 1, 'minipage': 1, 'wrapfigure': 2,
+                         'multicols': 1, 'thebibliography': 1}
+# Number of arguments of commands that are not text
+DROPPED_ARGUMENTS = {
+    'label': 1, 'ref': 1, 'eqref': 1, 'pageref': 1, 'autoref': 1, 'cref': 1, 'Cref': 1, 'nameref': 1,
+    'cite': 1, 'citep': 1, 'citet': 1, 'citealp': 1, 'citeauthor': 1, 'citeyear': 1, 'nocite': 1,
+    'includegraphics': 1, 'usepackage': 1, 'documentclass': 1, 'bibliographystyle': 1, 'url': 1, 'href': 1,
+    'vspace': 1, 'vspace*': 1, 'hspace': 1, 'hspace*': 1, 'pagestyle': 1, 'thispagestyle': 1, 'hypersetup': 1,
+    'color': 1, 'textcolor': 1, 'setcounter': 2, 'setlength': 2, 'addtolength': 2, 'fontsize': 2,
+    'newcommand': 2, 'renewcommand': 2, 'providecommand': 2, 'newcommand*': 2, 'renewcommand*': 2,
+    'newenvironment': 3, 'renewenvironment': 3, 'newtheorem': 2, 'definecolor': 3, 'DeclareMathOperator': 2,
+}
+SYMBOLS = {
+    '\\\\': '\n', '\\ ': ' ', '\\,': ' ', '\\;': ' ', '\\:': ' ', '\\!': '', '\\/': '', '\\-': '',
+    '\\&': '&', '\\%': '%', '\\$': '$', '\\#': '#', '\\_': '_', '\\{': '{', '\\}': '}',
+    '\\par': '\n\n', '\\item': '\n', '\\newline': '\n', '\\ldots': '...', '\\dots': '...',
+    '\\LaTeX': 'LaTeX', '\\TeX': 'TeX', '\\textbackslash': '\\',
+}
+MAX_INPUT_DEPTH = 16
+
+_WHOLE_ENVIRONMENTS = '|'.join(re.escape(name) for name in sorted(MATH_ENVIRONMENTS | SKIPPED_ENVIRONMENTS))
+_WHOLE_COMMANDS = '|'.join(re.escape(name) for name, arguments in DROPPED_ARGUMENTS.items() if arguments == 1)
+# Math, environments whose content is not text, and commands whose argument is dropped are matched as a whole, so
+# they do not have to be walked token by token. Every character of the source is part of some token. Of math and
+# whole environments only the opener is matched, their closer is looked up with str.find, since a lazy match up to
+# the closer is retried from every later opener when the closer is missing.
+_TOKEN_PATTERN = rf"""
+    [^\\{{}}%$~\[\]]+
+  | %[^\n]*
+  | \\(?:{_WHOLE_COMMANDS})(?:\[[^\[\]{{}}]*\])?\{{[^{{}}]*\}}
+  | (?P<opener>\\begin\{{(?P<environment>{_WHOLE_ENVIRONMENTS})\}}|\$\$|\\\[|\\\()
+  | \\(?:begin|end)\{{[^{{}}]*\}}
+  | \$[^$\\]*(?:\\.[^$\\]*)*\$
+  | \\(?:[A-Za-z@]+\*?|.)
+  | [{{}}~\[\]$]
+"""
+_TOKEN = re.compile(_TOKEN_PATTERN, re.VERBOSE | re.DOTALL)
+# The tokens of an opener without its closer
+_UNCLOSED_TOKEN = re.compile(_TOKEN_PATTERN.replace('(?P<opener>', '(?!)(?P<opener>'), re.VERBOSE | re.DOTALL)
+_CLOSERS = {'$$': '$$', '\\[': '\\]', '\\(': '\\)'}
+_SPECIAL = frozenset('\\{}%$~[]')
+
+_PARAGRAPH_BREAK = re.compile(r'\n[ \t\r]*\n')
+
+
+def tokenize(source: str) -> List[str]:
+    """Split TeX source into tokens. The tokens concatenate back into the source."""
+    tokens = []
+    # Closers not found after some opener, so not after any later one either
+    missing = set()
+    position = 0
+    while position < len(source):
+        match = _TOKEN.match(source, position)
+        if match is None:
+            # A backslash at the very end
+            end = position + 1
+        elif match.group('opener') is not None:
+            closer = _CLOSERS.get(match.group('opener')) or f"\\end{{{match.group('environment')}}}"
+            end = -1 if closer in missing else source.find(closer, match.end())
+            if end >= 0:
+                end += len(closer)
+            else:
+                missing.add(closer)
+                end = _UNCLOSED_TOKEN.match(source, position).end()
+        else:
+            end = match.end()
+        tokens.append(source[position:end])
+        position = end
+    return tokens
+
+
+class _Walker:
+    """Walks the tokens of a document once, collecting the text and the structure of the document."""
+
+    def __init__(self, files: Dict[str, str], main_name: str):
+        self.files = files
+        self.base_dir = posixpath.dirname(main_name)
+        self.main_stem = posixpath.splitext(main_name)[0]
+        self.included = {main_name}
+
+        self.out: List[str] = []
+        self.sections: List[str] = []
+        self.figures: List[str] = []
+        self.equations: List[str] = []
+        self.bibliography: List[List[str]] = []
+
+        self._streams: List[Iterator[str]] = []
+        self._pushed: List[str] = []
+        self._depth = 0
+        # (kind, brace depth, start index in out) of the arguments whose text is captured
+        self._captures: List[Tuple[str, int, int]] = []
+        # (key, start index in out) of the bibliography entry being read
+        self._bibitem: Optional[Tuple[str, int]] = None
+        self._in_document = True
+
+    def resolve(self, name: str, extensions: Tuple[str, ...] = ('', '.tex')) -> Optional[str]:
+        """Find a file of the source tree by the name it is referenced with."""
+        name = name.strip().strip('"')
+        for extension in extensions:
+            for path in (posixpath.join(self.base_dir, name + extension), name + extension):
+                path = posixpath.normpath(path)
+                if path in self.files and path not in self.included:
+                    self.included.add(path)
+                    return self.files[path]
+        return None
+
+    # Token stream
+
+    def _next(self) -> Optional[str]:
+        if self._pushed:
+            return self._pushed.pop()
+        while self._streams:
+            token = next(self._streams[-1], None)
+            if token is not None:
+                return token
+            self._streams.pop()
+        return None
+
+    def _include(self, source: Optional[str]) -> None:
+        if source is not None and len(self._streams) < MAX_INPUT_DEPTH:
+            if self._pushed:
+                # The rest of a token the file name was read from comes after the file
+                self._streams.append(iter(self._pushed[::-1]))
+                self._pushed = []
+            self._streams.append(iter(tokenize(source)))
+
+    def _peek_significant(self) -> Optional[str]:
+        """Next token that is not whitespace or a comment. Leaves the token in the stream."""
+        while (token := self._next()) is not None:
+            if token[0] == '%' or token.isspace():
+                continue
+            if token[0] not in _SPECIAL:
+                token = token.lstrip()
+            self._pushed.append(token)
+            return token
+        return None
+
+    def _read_group(self) -> str:
+        """Read the next argument: a brace group, or a single token if there are no braces. Returns its raw text."""
+        token = self._peek_significant()
+        if token is None:
+            return ''
+        self._next()
+        if token[0] not in _SPECIAL:
+            # An unbraced argument is a single character, or a word for \input
+            word = re.split(r'\s', token, maxsplit=1)[0]
+            if len(token) > len(word):
+                self._pushed.append(token[len(word):])
+            return word
+        if token != '{':
+            return token
+        parts = []
+        depth = 1
+        while (token := self._next()) is not None:
+            if token == '{':
+                depth += 1
+            elif token == '}':
+                depth -= 1
+                if depth == 0:
+                    break
+            parts.append(token)
+        return ''.join(parts)
+
+    def _skip_optional(self) -> None:
+        """Skip an optional [...] argument if one follows."""
+        if self._peek_significant() != '[':
+            return
+        self._next()
+        depth = 1
+        while (token := self._next()) is not None:
+            if token == '[':
+                depth += 1
+            elif token == ']':
+                depth -= 1
+                if depth == 0:
+                    return
+
+    # Output
+
+    def _emit(self, text: str) -> None:
+        if self._in_document:
+            self.out.append(text)
+
+    def _captured(self, start: int) -> str:
+        return ' '.join(''.join(self.out[start:]).split())
+
+    def _start_capture(self, kind: str) -> None:
+        """Capture the text of the brace group that follows."""
+        if self._peek_significant() != '{':
+            return
+        self._next()
+        self._depth += 1
+        self._captures.append((kind, self._depth, len(self.out)))
+
+    def _end_capture(self) -> None:
+        kind, _, start = self._captures.pop()
+        text = self._captured(start)
+        if kind == 'section':
+            self.sections.append(text)
+            self._emit('\n\n')
+        elif kind == 'caption':
+            self.figures.append(text)
+            self._emit(' ')
+
+    def _end_bibitem(self) -> None:
+        if self._bibitem is not None:
+            key, start = self._bibitem
+            self.bibliography.append([key, self._captured(start)])
+            # References are not part of the main text
+            del self.out[start:]
+            self._bibitem = None
+
+    def _equation(self, equation: str) -> None:
+        self.equations.append(equation.strip())
+        self._emit('\n')
+
+    # Walking
+
+    def walk(self, source: str) -> None:
+        self._in_document = '\\begin{document}' not in source
+        self._include(source)
+        out = self.out
+        while (token := self._next()) is not None:
+            first = token[0]
+            if first not in _SPECIAL:
+                if self._in_document:
+                    out.append(token)
+            elif first == '\\':
+                if not self._command(token):
+                    break
+            elif first == '{':
+                self._depth += 1
+            elif first == '}':
+                if self._captures and self._captures[-1][1] == self._depth:
+                    self._end_capture()
+                self._depth = max(0, self._depth - 1)
+            elif first == '$':
+                if token.startswith('$$') and len(token) >= 4:
+                    self._equation(token[2:-2])
+                else:
+                    # Inline math is left out of the text
+                    self._emit(' ')
+            elif first == '~':
+                self._emit(' ')
+            elif first != '%':
+                self._emit(token)
+        self._end_bibitem()
+        while self._captures:
+            self._end_capture()
+
+    def _command(self, token: str) -> bool:
+        """Handle a control sequence, or an environment or math matched as a whole. Returns False at the end of the
+        document."""
+        if token in SYMBOLS:
+            self._emit(SYMBOLS[token])
+            return True
+        if token[-1] == '}':
+            # Environment delimiter, or a whole environment or command
+            if token.startswith('\\begin{'):
+                name = token[7:token.index('}')]
+                if token.endswith(f'\\end{{{name}}}'):
+                    if name in MATH_ENVIRONMENTS:
+                        self._equation(token[len(name) + 8:-len(name) - 6])
+                else:
+                    self._begin(name)
+                return True
+            if token.startswith('\\end{'):
+                return self._end(token[5:-1])
+            # Command whose argument is dropped
+            return True
+        if len(token) > 2 and token[1] in '[(':
+            if token[1] == '[':
+                self._equation(token[2:-2])
+            else:
+                self._emit(' ')
+            return True
+
+        name = token[1:]
+        if name == 'begin':
+            self._begin(self._read_group())
+        elif name == 'end':
+            return self._end(self._read_group())
+        elif name.rstrip('*') in SECTION_COMMANDS:
+            self._skip_optional()
+            self._emit('\n\n')
+            self._start_capture('section')
+        elif name == 'caption':
+            self._skip_optional()
+            self._start_capture('caption')
+        elif name in INPUT_COMMANDS:
+            self._include(self.resolve(self._read_group()))
+        elif name == 'bibliography':
+            names = [n for n in self._read_group().split(',') if n.strip()]
+            for bbl_name in [self.main_stem] + names:
+                source = self.resolve(bbl_name, ('.bbl',))
+                if source is not None:
+                    self._include(source)
+                    break
+        elif name == 'bibitem':
+            self._end_bibitem()
+            self._skip_optional()
+            self._bibitem = (self._read_group().strip(), len(self.out))
+        elif name in DROPPED_ARGUMENTS:
+            for _ in range(DROPPED_ARGUMENTS[name]):
+                self._skip_optional()
+                self._read_group()
+        return True
+
+    def _begin(self, environment: str) -> None:
+        environment = environment.strip()
+        if environment == 'document':
+            self._in_document = True
+            return
+        self._skip_optional()
+        for _ in range(ENVIRONMENT_ARGUMENTS.get(environment, 0)):
+            self._read_group()
+        self._emit('\n\n')
+
+    def _end(self, environment: str) -> bool:
+        environment = environment.strip()
+        if environment == 'document':
+            return False
+        if environment == 'thebibliography':
+            self._end_bibitem()
+        self._emit('\n\n')
+        return True
+
+
+def tex_to_text(source: str, files: Optional[Dict[str, str]] = None, main_name: str = 'main.tex') -> Dict[str, Any]:
+    """
+    Convert a TeX document to text in a single pass over its tokens.
+
+    Args:
+        source: Source of the main file of the document
+        files: Sources of the other files of the document by their path relative to the root of the source tree,
+            for resolving \\input, \\include and \\bibliography
+        main_name: Path of the main file relative to the root of the source tree
+
+    Returns:
+        Dict[str, Any]: main_text, and the lists sections, figures (captions), equations and bibliography
+            ([key, text] pairs)
+    """
+    walker = _Walker(files or {}, posixpath.normpath(main_name))
+    walker.walk(source)
+
+    text = ''.join(walker.out)
+    paragraphs = (' '.join(paragraph.split()) for paragraph in _PARAGRAPH_BREAK.split(text))
+    return {
+        'sections': walker.sections,
+        'figures': walker.figures,
+        'equations': walker.equations,
+        'bibliography': walker.bibliography,
+        'main_text': '\n\n'.join(paragraph for paragraph in paragraphs if paragraph),
+    }
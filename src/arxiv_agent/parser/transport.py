@@ -0,0 +1,307 @@
+# transport.py
+"""
+Shared HTTP transport for all requests to ArXiv. The transport keeps one pooled requests.Session for keep-alive
+connections and one token bucket rate limiter for the whole process, so that all parsers and pipeline workers together
+stay within ArXiv's rate limits, but an idle period is not wasted by spacing every request the full delay apart.
+
+Throttling responses (429/503) pause the limiter for every user of the transport, honouring the Retry-After header
+when present and backing off exponentially otherwise.
+
+Paper sources are streamed into spool files instead of being read into memory as a whole, and downloads over the
+configured size limit are aborted.
+"""
+import logging
+import threading
+import time
+from dataclasses import dataclass, asdict
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Optional, Tuple, TypeVar
+import requests
+from requests.adapters import HTTPAdapter
+from src.config.config_loader import ConfigurationLoader
+from .spool import SpoolFile
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+class TokenBucket:
+    """Thread-safe token bucket rate limiter."""
+
+    def __init__(
+            self,
+            rate: float,
+            capacity: float = 1.0,
+            clock: Callable[[], float] = time.monotonic,
+            sleep: Callable[[float], None] = time.sleep
+    ):
+        """
+        Initialise the bucket full.
+
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum number of tokens, i.e. the largest burst of requests
+            clock: Monotonic clock in seconds
+            sleep: Function sleeping for a number of seconds
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = capacity
+        self._updated = clock()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        if now > self._updated:
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+    def acquire(self) -> float:
+        """Take a token, sleeping until one is available. Returns the number of seconds slept."""
+        slept = 0.0
+        while True:
+            with self._lock:
+                now = self._clock()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                else:
+                    self._refill(now)
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return slept
+                    wait = (1 - self._tokens) / self.rate
+            self._sleep(wait)
+            slept += wait
+
+    def pause(self, seconds: float) -> None:
+        """Hand out no tokens for the given number of seconds, and start with an empty bucket after that."""
+        with self._lock:
+            until = self._clock() + seconds
+            if until > self._paused_until:
+                self._paused_until = until
+                self._tokens = 0.0
+                self._updated = until
+
+
+@dataclass
+class TransportStats:
+    """Counters of the transport."""
+    requests: int = 0
+    retries: int = 0
+    throttled: int = 0
+    bytes: int = 0
+    sleep_seconds: float = 0.0
+    transfer_seconds: float = 0.0
+
+
+class DownloadTooLargeError(requests.exceptions.RequestException):
+    """Response body exceeds the download size limit."""
+    pass
+
+
+class ArxivTransport:
+    """Rate-limited, connection-pooled HTTP transport shared by all ArXiv parsers of the process."""
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    DEFAULT_REQUEST_DELAY = 3  # ArXiv's rate limiting guidelines
+    DEFAULT_MAX_RETRIES = 5
+    DEFAULT_BACKOFF = 10.0
+    DEFAULT_TIMEOUT = 60
+    DEFAULT_POOL_SIZE = 4
+    DEFAULT_MAX_DOWNLOAD_MB = 1024
+    DEFAULT_SPOOL_MEMORY_MB = 4
+    CHUNK_SIZE = 64 * 1024
+    RETRY_STATUSES = (429, 503)
+
+    @classmethod
+    def get_instance(cls) -> 'ArxivTransport':
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def __init__(
+            self,
+            requests_per_second: Optional[float] = None,
+            burst: Optional[int] = None,
+            max_retries: Optional[int] = None,
+            backoff: Optional[float] = None,
+            timeout: Optional[float] = None,
+            pool_size: Optional[int] = None,
+            max_download_mb: Optional[float] = None,
+            spool_memory_mb: Optional[float] = None,
+            spool_dir: Optional[str] = None
+    ):
+        """
+        Initialise the transport. Arguments fall back to the 'transport' section of the configuration.
+
+        Args:
+            requests_per_second: Sustained request rate. Defaults to one request per DEFAULT_REQUEST_DELAY seconds.
+            burst: Number of requests that may be made back to back after an idle period
+            max_retries: Retries of a request that was throttled or failed to connect
+            backoff: Seconds to back off after the first throttling response without Retry-After. Doubles with every
+                consecutive throttling response.
+            timeout: Timeout of connecting and of reading the response in seconds
+            pool_size: Number of keep-alive connections per host
+            max_download_mb: Size limit of downloads in megabytes
+            spool_memory_mb: Size in megabytes up to which a download is held in memory before it is spooled to disk
+            spool_dir: Directory of the spool files. Defaults to the system temporary directory.
+        """
+        conf = ConfigurationLoader().get_config().get('transport', {})
+        rate = requests_per_second or conf.get('requests_per_second', 1 / self.DEFAULT_REQUEST_DELAY)
+        self.limiter = TokenBucket(rate, burst or conf.get('burst', 1))
+        self.max_retries = max_retries if max_retries is not None else conf.get('max_retries',
+                                                                                 self.DEFAULT_MAX_RETRIES)
+        self.backoff = backoff or conf.get('backoff', self.DEFAULT_BACKOFF)
+        self.timeout = timeout or conf.get('timeout', self.DEFAULT_TIMEOUT)
+        pool_size = pool_size or conf.get('pool_size', self.DEFAULT_POOL_SIZE)
+        self.max_download_bytes = int((max_download_mb or conf.get('max_download_mb', self.DEFAULT_MAX_DOWNLOAD_MB))
+                                      * 1024 * 1024)
+        self.spool_memory_bytes = int((spool_memory_mb or conf.get('spool_memory_mb', self.DEFAULT_SPOOL_MEMORY_MB))
+                                      * 1024 * 1024)
+        self.spool_dir = spool_dir or conf.get('spool_dir')
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._stats = TransportStats()
+        self._stats_lock = threading.Lock()
+        # Shared by the threads of the transport, a throttled request doubles the backoff of the next one
+        self._consecutive_throttles = 0
+        self._throttles_lock = threading.Lock()
+
+    def _count(self, **increments) -> None:
+        with self._stats_lock:
+            for key, value in increments.items():
+                setattr(self._stats, key, getattr(self._stats, key) + value)
+
+    def _retry_after(self, response: requests.Response) -> Optional[float]:
+        """Seconds to wait according to the Retry-After header of the response, if it has one."""
+        value = response.headers.get('Retry-After')
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+        except (TypeError, ValueError):
+            return None
+
+    def get(self, url: str) -> requests.Response:
+        """Make a rate-limited GET request, retrying throttled requests and connection failures.
+
+        Raises:
+            requests.exceptions.RequestException: If the request fails after all retries or with a non-retryable
+                status
+        """
+        return self._request(url, lambda response: (response, len(response.content)))
+
+    def download(self, url: str) -> SpoolFile:
+        """Stream the response body of a rate-limited GET request into a spool file. See get.
+
+        Returns:
+            SpoolFile: Response body, positioned at the start. The caller must close it.
+
+        Raises:
+            DownloadTooLargeError: If the response body exceeds the download size limit
+            requests.exceptions.RequestException: If the request fails after all retries or with a non-retryable
+                status
+        """
+        return self._request(url, self._spool)
+
+    def _spool(self, response: requests.Response) -> Tuple[Optional[SpoolFile], int]:
+        """Read response body into a spool file. Returns the spool file and the number of bytes read."""
+        if not response.ok:
+            # Error responses are raised by _request
+            return None, len(response.content)
+
+        length = response.headers.get('Content-Length', '')
+        if length.isdigit() and int(length) > self.max_download_bytes:
+            response.close()
+            raise DownloadTooLargeError(f"{response.url} is {int(length)} bytes, over the download size limit of "
+                                        f"{self.max_download_bytes} bytes")
+
+        spool = SpoolFile(self.spool_memory_bytes, self.spool_dir)
+        size = 0
+        try:
+            for chunk in response.iter_content(self.CHUNK_SIZE):
+                size += len(chunk)
+                if size > self.max_download_bytes:
+                    raise DownloadTooLargeError(f"{response.url} is over the download size limit of "
+                                                f"{self.max_download_bytes} bytes")
+                spool.write(chunk)
+        except BaseException:
+            spool.close()
+            raise
+        finally:
+            response.close()
+        spool.seek(0)
+        return spool, size
+
+    def _request(self, url: str, read: Callable[[requests.Response], Tuple[T, int]]) -> T:
+        """Make a rate-limited GET request, retrying throttled requests and connection failures.
+
+        Args:
+            url: URL to request
+            read: Function reading the body of a non-throttled response. Returns the result of the request and the
+                number of bytes read.
+        """
+        attempt = 0
+        while True:
+            slept = self.limiter.acquire()
+            started = time.monotonic()
+            try:
+                response = self.session.get(url, timeout=self.timeout, stream=True)
+                throttled = response.status_code in self.RETRY_STATUSES
+                if throttled:
+                    response.close()
+                    result, size = None, 0
+                else:
+                    result, size = read(response)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                    requests.exceptions.ChunkedEncodingError) as e:
+                self._count(requests=1, sleep_seconds=slept, transfer_seconds=time.monotonic() - started)
+                if attempt >= self.max_retries:
+                    raise
+                delay = self.backoff * (2 ** attempt)
+                logger.warning(f"Request to {url} failed ({str(e)}), retrying in {delay:.1f} seconds")
+            else:
+                self._count(requests=1, bytes=size, sleep_seconds=slept,
+                            transfer_seconds=time.monotonic() - started)
+                if not throttled:
+                    with self._throttles_lock:
+                        self._consecutive_throttles = 0
+                    response.raise_for_status()
+                    return result
+
+                self._count(throttled=1)
+                if attempt >= self.max_retries:
+                    response.raise_for_status()
+                delay = self._retry_after(response)
+                with self._throttles_lock:
+                    if delay is None:
+                        delay = self.backoff * (2 ** self._consecutive_throttles)
+                    self._consecutive_throttles += 1
+                logger.warning(f"ArXiv responded {response.status_code} to {url}, pausing requests for "
+                               f"{delay:.1f} seconds")
+
+            # Back off for every user of the transport, not only for this request
+            self.limiter.pause(delay)
+            self._count(retries=1)
+            attempt += 1
+
+    @property
+    def stats(self) -> TransportStats:
+        """Snapshot of the transport counters."""
+        with self._stats_lock:
+            return TransportStats(**asdict(self._stats))
@@ -0,0 +1,134 @@
+"""
+Storage and index settings of the Qdrant collections, read from the 'collection_settings' part of the 'database'
+section of the configuration:
+
+collection_settings:
+  hnsw:
+    m: 16                     # Edges per node of the HNSW graph, more is more accurate and larger
+    ef_construct: 100         # Candidates considered when building the graph
+    ef: 128                   # Candidates considered when searching, more is more accurate and slower
+    on_disk: false            # Keep the graph on disk instead of in RAM
+  quantization:
+    type: none                # none, scalar (int8, 4x smaller) or binary (32x smaller, for large models)
+    always_ram: true          # Keep the quantised vectors in RAM when the full vectors are on disk
+    rescore: true             # Re-rank the quantised candidates by the full vectors
+    oversampling: 2.0         # Candidates fetched per result for rescoring
+  on_disk_vectors: false      # Keep the full vectors on disk (memory mapped) instead of in RAM
+  on_disk_payload: false      # Keep the payloads on disk instead of in RAM
+  optimizers:
+    indexing_threshold: 20000       # Kilobytes of vectors in a segment above which it gets an HNSW index
+    bulk_indexing_threshold: 0      # Threshold during bulk loads, 0 defers indexing until the load is done
+    memmap_threshold: null          # Kilobytes of vectors in a segment above which it is memory mapped
+    default_segment_number: 0       # Segments of the collection, 0 lets Qdrant choose by the number of CPUs
+
+The settings apply when a collection is created, and the search time settings to every search. Settings of an
+existing collection can be changed with DatabaseClientQdrant.update_collection_settings.
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Union
+from qdrant_client import models
+
+
+@dataclass(frozen=True)
+class CollectionSettings:
+    """HNSW, quantisation, storage and optimiser settings of a collection."""
+    hnsw_m: int = 16
+    hnsw_ef_construct: int = 100
+    hnsw_ef: Optional[int] = None
+    hnsw_on_disk: bool = False
+    quantization: str = 'none'
+    quantization_always_ram: bool = True
+    quantization_rescore: bool = True
+    quantization_oversampling: Optional[float] = None
+    on_disk_vectors: bool = False
+    on_disk_payload: bool = False
+    indexing_threshold: int = 20000
+    bulk_indexing_threshold: int = 0
+    memmap_threshold: Optional[int] = None
+    default_segment_number: Optional[int] = None
+    distance: models.Distance = field(default=models.Distance.DOT)
+
+    QUANTIZATIONS = ('none', 'scalar', 'binary')
+
+    def __post_init__(self):
+        if self.quantization not in self.QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization: {self.quantization}, expected one of "
+                             f"{', '.join(self.QUANTIZATIONS)}")
+
+    @classmethod
+    def from_config(cls, conf: Dict[str, Any]) -> 'CollectionSettings':
+        """Create the settings from the 'collection_settings' part of the database configuration, see the module."""
+        hnsw = conf.get('hnsw', {})
+        quantization = conf.get('quantization', {})
+        optimizers = conf.get('optimizers', {})
+        return cls(
+            hnsw_m=hnsw.get('m', cls.hnsw_m),
+            hnsw_ef_construct=hnsw.get('ef_construct', cls.hnsw_ef_construct),
+            hnsw_ef=hnsw.get('ef'),
+            hnsw_on_disk=hnsw.get('on_disk', False),
+            quantization=quantization.get('type', 'none') or 'none',
+            quantization_always_ram=quantization.get('always_ram', True),
+            quantization_rescore=quantization.get('rescore', True),
+            quantization_oversampling=quantization.get('oversampling'),
+            on_disk_vectors=conf.get('on_disk_vectors', False),
+            on_disk_payload=conf.get('on_disk_payload', False),
+            indexing_threshold=optimizers.get('indexing_threshold', cls.indexing_threshold),
+            bulk_indexing_threshold=optimizers.get('bulk_indexing_threshold', 0),
+            memmap_threshold=optimizers.get('memmap_threshold'),
+            default_segment_number=optimizers.get('default_segment_number'),
+        )
+
+    def hnsw_config(self) -> models.HnswConfigDiff:
+        return models.HnswConfigDiff(m=self.hnsw_m, ef_construct=self.hnsw_ef_construct, on_disk=self.hnsw_on_disk)
+
+    def quantization_config(self) -> Optional[models.QuantizationConfig]:
+        if self.quantization == 'scalar':
+            return models.ScalarQuantization(scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8, quantile=0.99, always_ram=self.quantization_always_ram))
+        if self.quantization == 'binary':
+            return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(
+                always_ram=self.quantization_always_ram))
+        return None
+
+    def quantization_config_diff(self) -> Union[models.QuantizationConfigDiff, models.Disabled]:
+        """Quantisation settings of a collection update. An update without quantisation keeps the current one, so
+        'none' disables it explicitly."""
+        return self.quantization_config() or models.Disabled.DISABLED
+
+    def vectors_config_diff(self) -> Dict[str, models.VectorParamsDiff]:
+        """Vector storage settings of a collection update, of the unnamed vector of the collection."""
+        return {'': models.VectorParamsDiff(on_disk=self.on_disk_vectors)}
+
+    def collection_params_diff(self) -> models.CollectionParamsDiff:
+        """Payload storage settings of a collection update."""
+        return models.CollectionParamsDiff(on_disk_payload=self.on_disk_payload)
+
+    def optimizers_config(self, bulk: bool = False) -> models.OptimizersConfigDiff:
+        """Optimiser settings, with indexing deferred for bulk loads if asked to. The threshold is always set, so that
+        the settings after a bulk load restore indexing."""
+        return models.OptimizersConfigDiff(
+            indexing_threshold=self.bulk_indexing_threshold if bulk else self.indexing_threshold,
+            memmap_threshold=self.memmap_threshold,
+            default_segment_number=self.default_segment_number,
+        )
+
+    def create_collection_kwargs(self, dimensions: int) -> Dict[str, Any]:
+        """Arguments of QdrantClient.create_collection for a collection of vectors of some dimensions."""
+        return {
+            'vectors_config': models.VectorParams(size=dimensions, distance=self.distance,
+                                                  on_disk=self.on_disk_vectors),
+            'hnsw_config': self.hnsw_config(),
+            'quantization_config': self.quantization_config(),
+            'optimizers_config': self.optimizers_config(),
+            'on_disk_payload': self.on_disk_payload,
+        }
+
+    def search_params(self) -> Optional[models.SearchParams]:
+        """Search time parameters, or None for the defaults of Qdrant."""
+        quantization = None
+        if self.quantization != 'none':
+            quantization = models.QuantizationSearchParams(rescore=self.quantization_rescore,
+                                                           oversampling=self.quantization_oversampling)
+        if self.hnsw_ef is None and quantization is None:
+            return None
+        return models.SearchParams(hnsw_ef=self.hnsw_ef, quantization=quantization)
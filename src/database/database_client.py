@@ -4,15 +4,21 @@ Module for abstract baseclass database/vector store functionalities.
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Optional, Sequence, Tuple, Union
+import numpy as np
+from src.arxiv_agent.ml.chunking import Chunk
 from src.arxiv_agent.models.articles import Article
+from src.arxiv_agent.models.lazy_article import LazyArticle
 
 
 @dataclass(frozen=True)
 class SearchResult:
     """Search result and magic method implementations for list result ordering funtionality."""
-    article: Article
+    # Article with the fields of the search projection loaded, the other fields load on access
+    article: Union[Article, LazyArticle]
     score: float
+    # Matching passages of the article, best first, for full text searches
+    passages: Tuple[str, ...] = ()
 
     def __lt__(self, other: 'SearchResult') -> bool:
         return self.score > other.score
@@ -35,29 +41,78 @@ class DatabaseClient(ABC):
         pass
 
     @abstractmethod
-    def insert(self, article: Article, embedding: List[float]) -> None:
-        """Insert an article with its embedding."""
+    def insert(self, article: Article, embedding: List[float] | np.ndarray, wait: bool = True) -> None:
+        """Insert an article with its embedding.
+
+        Args:
+            article: Article or a sequence of articles to insert.
+            embedding: Embedding or a sequence of embeddings matching the articles, or a float32 array with one row
+                per article.
+            wait: Whether to wait until the insert has been applied. When False, call wait_for_pending_updates()
+                before relying on the inserted data.
+        """
+        pass
+
+    @abstractmethod
+    def insert_chunks(self, chunks: Sequence[Chunk], embeddings: List[List[float]] | np.ndarray,
+                      wait: bool = True, arxiv_ids: Optional[Sequence[str]] = None) -> None:
+        """Insert chunks of article main texts with their embeddings, replacing the earlier chunks of the articles.
+
+        Args:
+            chunks: Chunks to insert, all chunks of every article they belong to.
+            embeddings: Embeddings matching the chunks, or a float32 array with one row per chunk.
+            wait: Whether to wait until the insert has been applied, see insert.
+            arxiv_ids: Articles whose chunks are replaced, including articles without any chunks now, whose earlier
+                chunks are deleted. Defaults to the articles of the chunks.
+        """
         pass
 
     @abstractmethod
-    def vector_search(self, query_vector: List[float], limit: int = 3) -> List[SearchResult]:
+    def wait_for_pending_updates(self) -> None:
+        """Block until all inserts made with wait=False have been applied."""
+        pass
+
+    @abstractmethod
+    def vector_search(self, query_vector: List[float] | np.ndarray, limit: int = 3,
+                      fields: Optional[Sequence[str]] = None) -> List[SearchResult]:
         """Vector search of articles on basis of a vector.
 
         Args:
-            query_vector: A vector, presumably created by embedding a source query.
+            query_vector: A vector, presumably created by embedding a source query. A list or a float32 array.
             limit: How many results to return.
+            fields: Article fields to fetch with the results, a compact default set if not given. The other fields
+                are loaded when accessed.
 
         Returns: A list of search results.
         """
         pass
 
     @abstractmethod
-    def text_search(self, query: str, limit: int = 3) -> List[SearchResult]:
+    def chunk_search(self, query_vector: List[float] | np.ndarray, limit: int = 3,
+                     chunks_per_article: Optional[int] = None,
+                     fields: Optional[Sequence[str]] = None) -> List[SearchResult]:
+        """Vector search of articles on basis of the chunks of their main texts.
+
+        Args:
+            query_vector: A vector, presumably created by embedding a source query.
+            limit: How many articles to return.
+            chunks_per_article: How many matching chunks of an article to return as its passages.
+            fields: Article fields to fetch with the results, see vector_search.
+
+        Returns: A list of search results scored by their best matching chunk.
+        """
+        pass
+
+    @abstractmethod
+    def text_search(self, query: str, limit: int = 3, full_text: bool = False,
+                    fields: Optional[Sequence[str]] = None) -> List[SearchResult]:
         """Vector search of articles on basis of a query.
 
         Args:
             query (str): A query to be used in the search.
             limit (int): How many results to return.
+            full_text (bool): Whether to search the main texts of the articles instead of their abstracts.
+            fields (Sequence[str]): Article fields to fetch with the results, see vector_search.
 
         Returns: List of search results.
         """
@@ -69,8 +124,20 @@ class DatabaseClient(ABC):
         pass
 
     @abstractmethod
-    def scroll(self, limit: int = 10) -> List[Article]:
-        """Scroll through articles."""
+    def get_many(self, arxiv_ids: Sequence[str], fields: Optional[Sequence[str]] = None) -> List[Optional[LazyArticle]]:
+        """Retrieve articles by their arxiv_ids.
+
+        Args:
+            arxiv_ids: Ids of the articles. An id without a version matches any version of the article.
+            fields: Article fields to fetch, see vector_search.
+
+        Returns: The articles in the order of the ids, with None for ids that are not in the database.
+        """
+        pass
+
+    @abstractmethod
+    def scroll(self, limit: int = 10, fields: Optional[Sequence[str]] = None) -> List[LazyArticle]:
+        """Scroll through articles, fetching the given fields (see vector_search)."""
         pass
 
     @abstractmethod
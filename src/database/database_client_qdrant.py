@@ -1,22 +1,45 @@
 """
 Qdrant implementation for the database/vector store.
 """
+import contextlib
 import datetime
+import json
+import re
+import threading
 import uuid
+import numpy as np
 from qdrant_client import QdrantClient, models
 from qdrant_client.http.exceptions import UnexpectedResponse
-from qdrant_client.http.models import Distance, VectorParams, PayloadSchemaType, PointStruct, OrderBy, Direction
+from qdrant_client.http.models import PayloadSchemaType, OrderBy, Direction
+from src.arxiv_agent.ml.chunking import Chunk
+from src.article_registry import ArticleRegistry
 from src.arxiv_agent.models.articles import Article
+from src.arxiv_agent.models.lazy_article import LazyArticle
+from src.database.collection_settings import CollectionSettings
 from src.database.database_client import DatabaseClient, SearchResult
 from src.config.config_loader import ConfigurationLoader
-from src.arxiv_agent.ml.embedding_model_sentence_transformer import EmbeddingSentenceTransformer as EmbeddingModel
-from typing import List, Union, Sequence
+from src.arxiv_agent.ml.embedding_cache import QueryEmbeddingCache
+from src.arxiv_agent.ml.embedding_model_base import EmbeddingModel
+from src.arxiv_agent.ml.embedding_model_factory import embedding_model_key, get_embedding_model
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union, Sequence
 
 
 class DatabaseClientQdrant(DatabaseClient):
     _instance = None
     _client: QdrantClient = None
 
+    # Chunk point ids are the point id of the article times the stride plus the chunk index
+    CHUNK_ID_STRIDE = 1000
+    DEFAULT_CHUNKS_PER_ARTICLE = 3
+    # Payload fields of search and scroll results by default, the other fields are loaded on access
+    DEFAULT_FIELDS = ('arxiv_id', 'title', 'authors', 'published', 'abstract', 'categories')
+    # Ids per request of get_many
+    GET_MANY_CHUNK = 1000
+    # Versions of an id without a version looked for by the keyword index of arxiv_id
+    MAX_VERSIONS = 30
+    # Datetime payload field of articles set on every write, see Reindexer
+    WRITE_TIME_FIELD = 'upserted_at'
+
     @classmethod
     def get_instance(cls):
         if cls._instance is None:
@@ -28,32 +51,197 @@ class DatabaseClientQdrant(DatabaseClient):
             conf = ConfigurationLoader().get_config()
             self.conf = conf
             self._client = QdrantClient(url=conf['database']['url'])
+            # Latest unconfirmed upsert per collection
+            self._pending_points: Dict[str, models.Batch] = {}
+            self._pending_lock = threading.Lock()
+            self.collection_settings = CollectionSettings.from_config(conf['database'].get('collection_settings', {}))
             self._ensure_collection()
-            self._embedding_model = EmbeddingModel()
+            chunks_conf = conf.get('chunks', {})
+            self.chunk_collection = chunks_conf.get('collection') or f"{conf['database']['collection']}-chunks"
+            self.chunks_per_article = chunks_conf.get('search_per_article', self.DEFAULT_CHUNKS_PER_ARTICLE)
+            self._chunk_collection_checked = False
+            self.default_fields = tuple(conf['database'].get('search_fields', self.DEFAULT_FIELDS))
+            self._article_registry: Optional[ArticleRegistry] = None
+            query_cache_conf = conf['database'].get('query_cache', {})
+            self.query_cache = QueryEmbeddingCache(
+                max_size=query_cache_conf.get('max_size', QueryEmbeddingCache.DEFAULT_MAX_SIZE),
+                ttl_seconds=query_cache_conf.get('ttl_seconds', QueryEmbeddingCache.DEFAULT_TTL_SECONDS)
+            )
+            # Resolved once, resolving it reads the configuration
+            self.embedding_model_key = embedding_model_key()
+
+    @property
+    def embedding_model(self) -> EmbeddingModel:
+        """Embedding model of the text searches, shared with the rest of the process and loaded on first use."""
+        return get_embedding_model(self.embedding_model_key)
 
     def _ensure_collection(self):
-        if not self._client.collection_exists(self.conf['database']['collection']):
+        if not self.collection_exists(self.conf['database']['collection']):
             print("Creating collection and indexes ...")
+            self._create_versioned(self.conf['database']['collection'], self.conf['database']['embedding_dimensions'],
+                                   self.create_collection)
+            return
 
-            self._client.create_collection(
-                collection_name=self.conf['database']['collection'],
-                vectors_config=VectorParams(
-                    size=self.conf['database']['embedding_dimensions'],
-                    distance=Distance.DOT
-                )
+        # Collections created before exact id lookups have a full text index on arxiv_id, which tokenises the ids
+        collection = self.resolve_collection(self.conf['database']['collection'])
+        schema = self._client.get_collection(collection).payload_schema.get('arxiv_id')
+        if schema is not None and schema.data_type == PayloadSchemaType.TEXT:
+            print("Replacing the full text index of arxiv_id with a keyword index ...")
+            self._client.delete_payload_index(collection_name=collection, field_name='arxiv_id')
+            self._client.create_payload_index(collection_name=collection, field_name='arxiv_id',
+                                              field_schema=PayloadSchemaType.KEYWORD)
+
+    def _create_versioned(self, name: str, dimensions: int, create_collection) -> None:
+        """Create the first version of a collection, <name>-v0, and address it by an alias of the name, so that a
+        reindex can switch the name to a new version atomically."""
+        create_collection(f"{name}-v0", dimensions)
+        self.switch_alias(name, f"{name}-v0")
+
+    def collection_exists(self, name: str) -> bool:
+        """Whether a collection or an alias of a collection exists by a name."""
+        return self._client.collection_exists(name) or name in self.get_aliases()
+
+    def get_aliases(self) -> Dict[str, str]:
+        """Collections of the aliases of the database by alias name."""
+        return {alias.alias_name: alias.collection_name for alias in self._client.get_aliases().aliases}
+
+    def resolve_collection(self, name: str) -> str:
+        """Name of the collection behind a name, which is a collection or an alias of one."""
+        return self.get_aliases().get(name, name)
+
+    def list_collections(self) -> List[str]:
+        """Names of the collections of the database, without the aliases."""
+        return [collection.name for collection in self._client.get_collections().collections]
+
+    def switch_alias(self, alias: str, collection: str) -> None:
+        """Point an alias at a collection. Moving an existing alias is atomic, searches by the alias never fail."""
+        operations: List[Any] = [
+            models.CreateAliasOperation(create_alias=models.CreateAlias(collection_name=collection, alias_name=alias))
+        ]
+        if alias in self.get_aliases():
+            operations.insert(0, models.DeleteAliasOperation(delete_alias=models.DeleteAlias(alias_name=alias)))
+        self._client.update_collection_aliases(change_aliases_operations=operations)
+
+    def count_points(self, name: str) -> int:
+        """Exact number of points of a collection."""
+        return self._client.count(collection_name=name, exact=True).count
+
+    def scroll_points(
+            self,
+            name: str,
+            limit: int,
+            offset: Optional[Any] = None,
+            scroll_filter: Optional[models.Filter] = None
+    ) -> Tuple[List[models.Record], Optional[Any]]:
+        """Scroll a page of points of a collection with their payloads and without their vectors, and return the
+        points and the offset of the next page, None after the last page."""
+        return self._client.scroll(collection_name=name, scroll_filter=scroll_filter, limit=limit, offset=offset,
+                                   with_payload=True, with_vectors=False)
+
+    def retrieve_points(self, name: str, ids: Sequence[Any], fields: Sequence[str]) -> List[models.Record]:
+        """Retrieve points of a collection by their ids with some payload fields and without their vectors. Missing
+        points are left out."""
+        if not ids:
+            return []
+        return self._client.retrieve(collection_name=name, ids=list(ids), with_payload=list(fields),
+                                     with_vectors=False)
+
+    def upsert_points(
+            self,
+            name: str,
+            ids: Sequence[Any],
+            vectors: Union[Sequence[List[float]], np.ndarray],
+            payloads: Sequence[Dict[str, Any]]
+    ) -> None:
+        """Write points into a collection as they are, waiting until they are applied."""
+        self._client.upsert(
+            collection_name=name,
+            wait=True,
+            points=models.Batch(ids=list(ids), vectors=np.asarray(vectors, dtype=np.float32).tolist(),
+                                payloads=list(payloads))
+        )
+
+    def defer_indexing(self, name: str, defer: bool = True) -> None:
+        """Apply the optimiser settings of bulk loads to a collection, or restore the configured ones."""
+        self._client.update_collection(collection_name=self.resolve_collection(name),
+                                       optimizers_config=self.collection_settings.optimizers_config(bulk=defer))
+
+    def collection_status(self, name: str) -> models.CollectionStatus:
+        """Status of a collection, green once its points are indexed."""
+        return self._client.get_collection(self.resolve_collection(name)).status
+
+    def create_collection(self, name: str, dimensions: int) -> None:
+        """Create an article collection with its payload indexes and the configured collection settings."""
+        self._client.create_collection(collection_name=name,
+                                       **self.collection_settings.create_collection_kwargs(dimensions))
+
+        # Create payload indexes
+        for field, schema_type in [
+            ("arxiv_id", PayloadSchemaType.KEYWORD),
+            ("published", PayloadSchemaType.DATETIME),
+            ("processed_at", PayloadSchemaType.DATETIME),
+            (self.WRITE_TIME_FIELD, PayloadSchemaType.DATETIME)
+        ]:
+            self._client.create_payload_index(
+                collection_name=name,
+                field_name=field,
+                field_schema=schema_type,
             )
 
-            # Create payload indexes
-            for field, schema_type in [
-                ("arxiv_id", PayloadSchemaType.TEXT),
-                ("published", PayloadSchemaType.DATETIME),
-                ("processed_at", PayloadSchemaType.DATETIME)
-            ]:
-                self._client.create_payload_index(
-                    collection_name=self.conf['database']['collection'],
-                    field_name=field,
-                    field_schema=schema_type,
-                )
+    def _ensure_chunk_collection(self):
+        if self._chunk_collection_checked:
+            return
+        if not self.collection_exists(self.chunk_collection):
+            print("Creating chunk collection and indexes ...")
+            self._create_versioned(self.chunk_collection, self.conf['database']['embedding_dimensions'],
+                                   self.create_chunk_collection)
+        self._chunk_collection_checked = True
+
+    def create_chunk_collection(self, name: str, dimensions: int) -> None:
+        """Create a chunk collection with its payload indexes and the configured collection settings."""
+        self._client.create_collection(collection_name=name,
+                                       **self.collection_settings.create_collection_kwargs(dimensions))
+
+        # Chunks are grouped by their article in searches and deleted by it on re-imports
+        for field, schema_type in [
+            ("arxiv_id", PayloadSchemaType.KEYWORD),
+            ("parent_id", PayloadSchemaType.INTEGER),
+            ("chunk_index", PayloadSchemaType.INTEGER)
+        ]:
+            self._client.create_payload_index(
+                collection_name=name,
+                field_name=field,
+                field_schema=schema_type,
+            )
+
+    def update_collection_settings(self, name: Optional[str] = None, bulk: bool = False) -> None:
+        """
+        Apply the configured HNSW, quantisation, storage and optimiser settings to an existing collection. Qdrant
+        rebuilds the indexes and moves the vectors and payloads in the background, searches keep working meanwhile.
+
+        Args:
+            name: Name of the collection, the article collection by default
+            bulk: Whether to apply the optimiser settings of bulk loads, see bulk_load
+        """
+        self._client.update_collection(
+            collection_name=self.resolve_collection(name or self.conf['database']['collection']),
+            optimizers_config=self.collection_settings.optimizers_config(bulk=bulk),
+            hnsw_config=self.collection_settings.hnsw_config(),
+            quantization_config=self.collection_settings.quantization_config_diff(),
+            vectors_config=self.collection_settings.vectors_config_diff(),
+            collection_params=self.collection_settings.collection_params_diff(),
+        )
+
+    @contextlib.contextmanager
+    def bulk_load(self, name: Optional[str] = None) -> Iterator[None]:
+        """Defer HNSW indexing of a collection while loading many points into it, and index it in one go
+        afterwards. Indexing while loading rebuilds the graph of growing segments over and over."""
+        collection = name or self.conf['database']['collection']
+        self.defer_indexing(collection)
+        try:
+            yield
+        finally:
+            self.defer_indexing(collection, defer=False)
 
     @staticmethod
     def _generate_point_id(arxiv_id: str) -> int:
@@ -71,7 +259,8 @@ class DatabaseClientQdrant(DatabaseClient):
     def insert(
             self,
             articles: Union[Article, Sequence[Article]],
-            embeddings: Union[List[float], Sequence[List[float]]]
+            embeddings: Union[List[float], Sequence[List[float]], np.ndarray],
+            wait: bool = True
     ) -> None:
         """See parent class."""
         # Convert single inputs to lists
@@ -86,59 +275,275 @@ class DatabaseClientQdrant(DatabaseClient):
         if not articles:
             return
 
-        points = [
-            PointStruct(
-                id=self._generate_point_id(article.arxiv_id),
-                vector=embedding,
-                payload=article.model_dump(mode='json')
+        # The REST API takes JSON lists, so the vectors are only converted here, in one go for the whole batch
+        written_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        points = models.Batch(
+            ids=[self._generate_point_id(article.arxiv_id) for article in articles],
+            vectors=np.asarray(embeddings, dtype=np.float32).tolist(),
+            payloads=[{**article.model_dump(mode='json'), self.WRITE_TIME_FIELD: written_at} for article in articles]
+        )
+
+        self._upsert(self.conf['database']['collection'], points, wait)
+
+    def insert_chunks(
+            self,
+            chunks: Sequence[Chunk],
+            embeddings: Union[Sequence[List[float]], np.ndarray],
+            wait: bool = True,
+            arxiv_ids: Optional[Sequence[str]] = None
+    ) -> None:
+        """See parent class."""
+        if len(chunks) != len(embeddings):
+            raise ValueError(
+                f"Number of chunks ({len(chunks)}) must match number of embeddings ({len(embeddings)})")
+        if arxiv_ids is None:
+            arxiv_ids = [chunk.arxiv_id for chunk in chunks]
+        if not chunks and not arxiv_ids:
+            return
+        self._ensure_chunk_collection()
+
+        ids = []
+        # Number of current chunks per article, every earlier chunk of an article without chunks now is stale
+        counts: Dict[int, int] = {self._generate_point_id(arxiv_id): 0 for arxiv_id in arxiv_ids}
+        for chunk in chunks:
+            if chunk.index >= self.CHUNK_ID_STRIDE:
+                raise ValueError(f"Chunk index {chunk.index} of {chunk.arxiv_id} is over {self.CHUNK_ID_STRIDE - 1}")
+            parent_id = self._generate_point_id(chunk.arxiv_id)
+            ids.append((parent_id * self.CHUNK_ID_STRIDE + chunk.index) % (2 ** 63))
+            counts[parent_id] = max(counts.get(parent_id, 0), chunk.index + 1)
+        if chunks:
+            points = models.Batch(
+                ids=ids,
+                vectors=np.asarray(embeddings, dtype=np.float32).tolist(),
+                payloads=[{'arxiv_id': chunk.arxiv_id, 'parent_id': self._generate_point_id(chunk.arxiv_id),
+                           'chunk_index': chunk.index, 'section': chunk.section, 'text': chunk.text}
+                          for chunk in chunks]
             )
-            for article, embedding in zip(articles, embeddings)
-        ]
+            self._upsert(self.chunk_collection, points, wait)
 
-        self._client.upsert(
-            collection_name=self.conf['database']['collection'],
-            wait=True,
-            points=points
+        # Chunks of an earlier version of an article beyond the current chunks are stale
+        self._client.delete(
+            collection_name=self.chunk_collection,
+            points_selector=models.FilterSelector(filter=models.Filter(should=[
+                models.Filter(must=[
+                    models.FieldCondition(key='parent_id', match=models.MatchValue(value=parent_id)),
+                    models.FieldCondition(key='chunk_index', range=models.Range(gte=count)),
+                ])
+                for parent_id, count in counts.items()
+            ])),
+            wait=wait
         )
 
-    def vector_search(self, query_vector: List[float], limit: int = 10) -> List[SearchResult]:
+    def _upsert(self, collection: str, points: models.Batch, wait: bool) -> None:
+        self._client.upsert(collection_name=collection, wait=wait, points=points)
+        if not wait:
+            with self._pending_lock:
+                self._pending_points[collection] = points
+
+    def wait_for_pending_updates(self) -> None:
+        """See parent class.
+
+        Qdrant applies the updates of a collection in order, so repeating the latest unconfirmed upsert with wait=True
+        returns once every upsert before it has been applied too. Upserts are idempotent, so repeating one is safe.
+        """
+        with self._pending_lock:
+            pending, self._pending_points = self._pending_points, {}
+        for collection, points in pending.items():
+            self._client.upsert(collection_name=collection, wait=True, points=points)
+
+    def vector_search(
+            self,
+            query_vector: Union[List[float], np.ndarray],
+            limit: int = 10,
+            fields: Optional[Sequence[str]] = None
+    ) -> List[SearchResult]:
         """See parent class."""
+        if isinstance(query_vector, np.ndarray):
+            query_vector = query_vector.astype(np.float32, copy=False).tolist()
         results = self._client.query_points(
             collection_name=self.conf['database']['collection'],
             query=query_vector,
             limit=limit,
-            with_payload=True
+            search_params=self.collection_settings.search_params(),
+            with_payload=self._payload_selector(fields)
         ).points
 
-        return [SearchResult(article=Article(**hit.payload), score=hit.score) for hit in results]
+        return [SearchResult(article=self._lazy_article(hit.payload), score=hit.score) for hit in results]
 
-    def text_search(self, query: str, limit: int = 3) -> List[SearchResult]:
-        embedding = self._embedding_model.encode(query)
-        return self.vector_search(query_vector=embedding, limit=limit)
+    def chunk_search(
+            self,
+            query_vector: Union[List[float], np.ndarray],
+            limit: int = 3,
+            chunks_per_article: Optional[int] = None,
+            fields: Optional[Sequence[str]] = None
+    ) -> List[SearchResult]:
+        """See parent class."""
+        if isinstance(query_vector, np.ndarray):
+            query_vector = query_vector.astype(np.float32, copy=False).tolist()
+        self._ensure_chunk_collection()
+        groups = self._client.query_points_groups(
+            collection_name=self.chunk_collection,
+            group_by='parent_id',
+            query=query_vector,
+            limit=limit,
+            group_size=chunks_per_article or self.chunks_per_article,
+            search_params=self.collection_settings.search_params(),
+            with_payload=['text'],
+            with_lookup=models.WithLookup(collection=self.conf['database']['collection'],
+                                          with_payload=self._payload_selector(fields), with_vectors=False)
+        ).groups
+
+        # Groups are ordered by their best chunk, and the hits of a group by score
+        return [
+            SearchResult(article=self._lazy_article(group.lookup.payload), score=group.hits[0].score,
+                         passages=tuple(hit.payload['text'] for hit in group.hits))
+            for group in groups if group.lookup is not None
+        ]
 
-    def get_by_id(self, arxiv_id: str) -> Article:
+    def text_search(
+            self,
+            query: str,
+            limit: int = 3,
+            full_text: bool = False,
+            fields: Optional[Sequence[str]] = None
+    ) -> List[SearchResult]:
         """See parent class."""
-        results = self._client.scroll(
-            collection_name=self.conf['database']['collection'],
-            scroll_filter=models.Filter(
-                must=[models.FieldCondition(key='arxiv_id', match=models.MatchValue(value=arxiv_id))]
-            ),
-            limit=1,
-            with_payload=True
-        )[0]
+        # Repeated queries, e.g. by the agent within a conversation, are not encoded again
+        # The model is only looked up on a miss
+        embedding = self.query_cache.get_or_compute(query, lambda text: self.embedding_model.encode(text))
+        if full_text:
+            return self.chunk_search(query_vector=embedding, limit=limit, fields=fields)
+        return self.vector_search(query_vector=embedding, limit=limit, fields=fields)
+
+    def get_by_id(self, arxiv_id: str) -> Optional[Article]:
+        """See parent class."""
+        article = self.get_many([arxiv_id], fields=LazyArticle.FIELDS)[0]
+        return article.to_article() if article else None
+
+    def get_many(self, arxiv_ids: Sequence[str], fields: Optional[Sequence[str]] = None) -> List[Optional[LazyArticle]]:
+        """See parent class.
+
+        The articles are retrieved by their point ids, computed from the ArXiv ids. Ids that do not map to a point id,
+        or whose point holds another article, are looked up by the keyword index of arxiv_id instead, an id without a
+        version by its versions up to MAX_VERSIONS. The latest stored version is returned for it.
+        """
+        selector = self._payload_selector(fields)
+        found: Dict[str, Dict[str, Any]] = {}
+        point_ids: Dict[int, List[str]] = {}
+        unresolved = []
+        for arxiv_id in dict.fromkeys(arxiv_ids):
+            try:
+                point_ids.setdefault(self._generate_point_id(arxiv_id), []).append(arxiv_id)
+            except ValueError:
+                unresolved.append(arxiv_id)
 
-        return Article(**results[0].payload) if results else None
+        ids = list(point_ids)
+        for i in range(0, len(ids), self.GET_MANY_CHUNK):
+            points = self._client.retrieve(
+                collection_name=self.conf['database']['collection'],
+                ids=ids[i:i + self.GET_MANY_CHUNK],
+                with_payload=selector,
+                with_vectors=False
+            )
+            for point in points:
+                for arxiv_id in point_ids.pop(point.id):
+                    if self._same_article(arxiv_id, point.payload['arxiv_id']):
+                        found[arxiv_id] = point.payload
+                    else:
+                        unresolved.append(arxiv_id)
 
-    def scroll(self, limit: int = 10) -> List[Article]:
+        # Requested ids by the stored ids they match
+        candidates: Dict[str, List[str]] = {}
+        for arxiv_id in unresolved:
+            for stored_id in self._stored_ids(arxiv_id):
+                candidates.setdefault(stored_id, []).append(arxiv_id)
+        stored_ids = list(candidates)
+        for i in range(0, len(stored_ids), self.GET_MANY_CHUNK):
+            chunk = stored_ids[i:i + self.GET_MANY_CHUNK]
+            points = self._client.scroll(
+                collection_name=self.conf['database']['collection'],
+                scroll_filter=models.Filter(
+                    must=[models.FieldCondition(key='arxiv_id', match=models.MatchAny(any=chunk))]
+                ),
+                limit=len(chunk),
+                with_payload=selector,
+                with_vectors=False
+            )[0]
+            for point in points:
+                stored_id = point.payload['arxiv_id']
+                for arxiv_id in candidates[stored_id]:
+                    if arxiv_id not in found or self._version(stored_id) > self._version(found[arxiv_id]['arxiv_id']):
+                        found[arxiv_id] = point.payload
+
+        return [self._lazy_article(found[arxiv_id]) if arxiv_id in found else None for arxiv_id in arxiv_ids]
+
+    @classmethod
+    def _stored_ids(cls, arxiv_id: str) -> List[str]:
+        """Stored ids an id matches, see _same_article: itself, and its versions if it has no version."""
+        if re.fullmatch(r'.*v\d+', arxiv_id):
+            return [arxiv_id]
+        return [arxiv_id, *(f"{arxiv_id}v{version}" for version in range(1, cls.MAX_VERSIONS + 1))]
+
+    @staticmethod
+    def _version(arxiv_id: str) -> int:
+        """Version number of an id, 0 for an id without a version."""
+        match = re.search(r'v(\d+)$', arxiv_id)
+        return int(match.group(1)) if match else 0
+
+    @staticmethod
+    def _same_article(requested_id: str, stored_id: str) -> bool:
+        """Whether a stored article is the requested one. An id without a version matches every version."""
+        return requested_id == stored_id or (
+            re.fullmatch(r'.*v\d+', requested_id) is None and re.sub(r'v\d+$', '', stored_id) == requested_id)
+
+    def scroll(self, limit: int = 10, fields: Optional[Sequence[str]] = None) -> List[LazyArticle]:
         """See parent class."""
         results = self._client.scroll(
             collection_name=self.conf['database']['collection'],
             limit=limit,
-            with_payload=True,
+            with_payload=self._payload_selector(fields),
             with_vectors=False,
         )[0]
 
-        return [Article(**point.payload) for point in results]
+        return [self._lazy_article(point.payload) for point in results]
+
+    def _payload_selector(self, fields: Optional[Sequence[str]]) -> List[str]:
+        """Payload fields to fetch for a projection, the default fields if none is given. The id is always fetched."""
+        fields = self.default_fields if fields is None else fields
+        unknown = set(fields) - set(LazyArticle.FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown article fields: {', '.join(sorted(unknown))}")
+        return ['arxiv_id', *(field for field in fields if field != 'arxiv_id')]
+
+    def _lazy_article(self, payload: Dict[str, Any]) -> LazyArticle:
+        return LazyArticle(payload, self._load_fields)
+
+    @property
+    def article_registry(self) -> ArticleRegistry:
+        if self._article_registry is None:
+            self._article_registry = ArticleRegistry(self.conf['articles']['download_location'])
+        return self._article_registry
+
+    def _load_fields(self, arxiv_id: str, fields: Iterable[str]) -> Dict[str, Any]:
+        """Load fields of an article, from its article.json in the article registry if it has one, and otherwise
+        from its payload."""
+        fields = list(fields)
+        paths = self.article_registry.get_paths(arxiv_id)
+        if paths and paths['article'].exists():
+            with open(paths['article'], 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if all(field in data for field in fields if Article.model_fields[field].is_required()):
+                return {field: data.get(field) for field in fields}
+
+        points = self._client.retrieve(
+            collection_name=self.conf['database']['collection'],
+            ids=[self._generate_point_id(arxiv_id)],
+            with_payload=fields,
+            with_vectors=False
+        )
+        if not points:
+            raise KeyError(f"Article {arxiv_id} not found")
+        return points[0].payload
 
     def get_latest_import_date(self) -> datetime.datetime:
         """Get last import date. This should be defined in the parent class."""
@@ -146,12 +551,12 @@ class DatabaseClientQdrant(DatabaseClient):
             result = self._client.scroll(
                 collection_name=self.conf['database']['collection'],
                 limit=1,
-                with_payload=True,
+                with_payload=['published'],
                 order_by=OrderBy(key='published', direction=Direction.DESC)
             )
 
-            if result:
-                date = Article(**result[0][0].payload).published
+            if result[0]:
+                date = datetime.datetime.fromisoformat(result[0][0].payload['published'])
                 date = datetime.datetime(year=date.year, month=date.month, day=date.day)
                 return date.replace(tzinfo=datetime.timezone.utc)
             else:
@@ -162,12 +567,16 @@ class DatabaseClientQdrant(DatabaseClient):
             else:
                 raise e
 
-    def delete_collection(self) -> None:
-        """Delete the current collection if it exists. This should be in the parent class. FIXME"""
-        if self._client.collection_exists(self.conf['database']['collection']):
+    def delete_collection(self, name: Optional[str] = None) -> None:
+        """Delete a collection if it exists, the current article collection by default. This should be in the parent
+        class. FIXME"""
+        name = name or self.conf['database']['collection']
+        # The configured name is an alias of the current version of the collection
+        collection = self.resolve_collection(name)
+        if self._client.collection_exists(collection):
             self._client.delete_collection(
-                collection_name=self.conf['database']['collection']
+                collection_name=collection
             )
-            print(f"Collection {self.conf['database']['collection']} deleted.")
+            print(f"Collection {name} deleted.")
         else:
-            print(f"Collection {self.conf['database']['collection']} does not exist.")
+            print(f"Collection {name} does not exist.")
@@ -0,0 +1,278 @@
+"""
+Re-embedding of a Qdrant collection into a new version of it, without downtime of searches.
+
+The points of the live collection are scrolled out page by page (payload only), their stored texts are embedded with
+the current embedding model, and the points are written with the same ids and payloads into a versioned collection
+(<name>-v1, <name>-v2, ...). When every point has been copied, the configured collection name is switched to the new
+version with a Qdrant alias. Searches and imports keep using the old collection until the switch.
+
+Collections are created as <name>-v0 behind an alias of their name, see DatabaseClientQdrant, so the switch is a single
+atomic alias update. A plain collection by the name, created before that, can only be replaced: Qdrant has no renames,
+and an alias cannot take the name of a collection that still exists.
+
+The progress is kept in a small JSON file, so that an interrupted reindex continues from the last copied page:
+
+article_registry_root/
+│- reindex_<name>.json
+"""
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from qdrant_client import models
+from src.arxiv_agent.ml.embedding_model_base import EmbeddingModel
+from src.database.database_client_qdrant import DatabaseClientQdrant
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ReindexStats:
+    """Outcome of a reindex."""
+    source: str
+    target: str
+    points: int
+    seconds: float
+
+
+class Reindexer:
+    """Copies a collection into a new version of it with re-embedded vectors and switches an alias to the copy."""
+
+    DEFAULT_BATCH_SIZE = 512
+    # Seconds between progress reports
+    REPORT_INTERVAL = 30.0
+    # Seconds between checks whether the new version has been indexed
+    INDEX_POLL_INTERVAL = 5.0
+    # Seconds before a catch-up that its writes are looked for from, for writers whose clock is behind and for writes
+    # stamped before the last catch-up but applied after it
+    CATCH_UP_MARGIN = 60.0
+
+    def __init__(
+            self,
+            db_client: DatabaseClientQdrant,
+            model: EmbeddingModel,
+            state_dir: str | Path,
+            batch_size: int = DEFAULT_BATCH_SIZE
+    ):
+        """
+        Initialise the reindexer.
+
+        Args:
+            db_client: Client of the database of the collections
+            model: Model embedding the texts into the new version
+            state_dir: Directory of the progress files
+            batch_size: Number of points scrolled, embedded and written together
+        """
+        self.db_client = db_client
+        self.model = model
+        self.state_dir = Path(state_dir)
+        self.batch_size = batch_size
+        self._ready_targets = set()
+
+    def reindex_articles(self, delete_old: bool = False, replace_collection: bool = False) -> ReindexStats:
+        """Reindex the article collection, embedding the abstracts like the importer does. Articles written while
+        the reindex runs are copied over before the switch."""
+        return self.reindex(self.db_client.conf['database']['collection'], 'abstract',
+                            self.db_client.create_collection, updated_field=self.db_client.WRITE_TIME_FIELD,
+                            delete_old=delete_old, replace_collection=replace_collection)
+
+    def reindex_chunks(self, delete_old: bool = False, replace_collection: bool = False) -> ReindexStats:
+        """Reindex the chunk collection. Imports should be paused while it runs, chunks have no write time to catch
+        up with."""
+        return self.reindex(self.db_client.chunk_collection, 'text', self.db_client.create_chunk_collection,
+                            delete_old=delete_old, replace_collection=replace_collection)
+
+    def reindex(
+            self,
+            name: str,
+            text_field: str,
+            create_collection,
+            updated_field: Optional[str] = None,
+            delete_old: bool = False,
+            replace_collection: bool = False
+    ) -> ReindexStats:
+        """
+        Copy the collection of a name into a new version with re-embedded vectors and switch the name to it.
+
+        Args:
+            name: Name of the collection, a collection or an alias of one
+            text_field: Payload field holding the text that is embedded
+            create_collection: Function creating a collection with its payload indexes from a name and dimensions
+            updated_field: Datetime payload field set to the time of every write. Points written after the reindex
+                started are copied again before the switch. Without it, writes to the collection must be paused.
+            delete_old: Whether to delete the old collection after the switch. It is kept for rollback by default.
+            replace_collection: Whether to reindex a plain collection by the name, which is deleted right before the
+                alias takes its name. Searches fail for the moment in between, the collection is not kept, and
+                writes between the last catch-up and the switch are lost, so imports should be paused.
+
+        Raises:
+            ValueError: If the name is a plain collection and replace_collection is not set
+        """
+        started = time.monotonic()
+        state = self._read_state(name)
+        if state is None:
+            source = self.db_client.resolve_collection(name)
+            self._check_replace(name, source, replace_collection)
+            state = {
+                'source': source,
+                'target': self._next_version(name),
+                'offset': None,
+                'copied': 0,
+                'started_at': datetime.now(timezone.utc).isoformat(),
+            }
+            self._write_state(name, state)
+            logger.info(f"Reindexing {name} from {state['source']} into {state['target']}")
+        else:
+            self._check_replace(name, state['source'], replace_collection)
+            logger.info(f"Resuming reindex of {name} from {state['source']} into {state['target']} after "
+                        f"{state['copied']} points")
+        source, target = state['source'], state['target']
+
+        total = self.db_client.count_points(source)
+        last_report = time.monotonic()
+        copied_now = 0
+        while state.get('done') is not True:
+            points, next_offset = self.db_client.scroll_points(source, self.batch_size, offset=state['offset'])
+            self._copy(points, text_field, target, create_collection)
+            state['copied'] += len(points)
+            copied_now += len(points)
+            state['offset'] = next_offset
+            state['done'] = next_offset is None
+            self._write_state(name, state)
+
+            if time.monotonic() - last_report >= self.REPORT_INTERVAL or state['done']:
+                last_report = time.monotonic()
+                rate = copied_now / (last_report - started)
+                remaining = max(total - state['copied'], 0)
+                eta = f"{remaining / rate / 60:.0f} min" if rate else "unknown"
+                logger.info(f"Reindexed {state['copied']}/{total} points of {name} "
+                            f"({100 * state['copied'] / max(total, 1):.1f} %), {rate:.0f} points/s, ETA {eta}")
+
+        if target not in self._ready_targets and not self.db_client.collection_exists(target):
+            # An empty collection gets an empty new version, with the dimensions of the model
+            self._ensure_target(target, create_collection, self.model.encode_array(['dimensions']).shape[1])
+        caught_up = 0
+        if updated_field:
+            # Most writes during the copy are caught up with while indexing is still deferred
+            checked_at = datetime.now(timezone.utc)
+            caught_up += self._catch_up(source, target, text_field, create_collection, updated_field,
+                                        datetime.fromisoformat(state['started_at']))
+        self._index(target)
+        if updated_field:
+            # The writes during the indexing, right before the switch
+            switched_at = datetime.now(timezone.utc)
+            caught_up += self._catch_up(source, target, text_field, create_collection, updated_field, checked_at)
+        self._switch(name, source, target)
+        if updated_field and source != name:
+            # The writes between the last catch-up and the switch went into the source. Points written into the
+            # target since the switch are newer and are kept, see _catch_up.
+            caught_up += self._catch_up(source, target, text_field, create_collection, updated_field, switched_at)
+        if delete_old and source != name and self.db_client.collection_exists(source):
+            self.db_client.delete_collection(source)
+            logger.info(f"Deleted {source}")
+        self._state_path(name).unlink(missing_ok=True)
+        return ReindexStats(source=source, target=target, points=state['copied'] + caught_up,
+                            seconds=time.monotonic() - started)
+
+    def _copy(self, points: List[models.Record], text_field: str, target: str, create_collection) -> None:
+        """Embed the texts of scrolled points and write them into the target collection."""
+        if not points:
+            return
+        embeddings = self.model.encode_array([point.payload.get(text_field) or '' for point in points],
+                                             batch_size=len(points))
+        self._ensure_target(target, create_collection, embeddings.shape[1])
+        self.db_client.upsert_points(target, [point.id for point in points], embeddings,
+                                     [point.payload for point in points])
+
+    def _ensure_target(self, target: str, create_collection, dimensions: int) -> None:
+        if target not in self._ready_targets:
+            if not self.db_client.collection_exists(target):
+                create_collection(target, dimensions)
+                # Indexed in one go when all points are in, see _index
+                self.db_client.defer_indexing(target)
+            self._ready_targets.add(target)
+
+    def _index(self, target: str) -> None:
+        """Restore the indexing of the target collection deferred for the copy, and wait until it is indexed, so
+        that searches are not slower after the switch."""
+        self.db_client.defer_indexing(target, defer=False)
+        logger.info(f"Indexing {target} ...")
+        while self.db_client.collection_status(target) != models.CollectionStatus.GREEN:
+            time.sleep(self.INDEX_POLL_INTERVAL)
+
+    def _catch_up(self, source: str, target: str, text_field: str, create_collection, updated_field: str,
+                  since: datetime) -> int:
+        """Copy the points written into the source collection after a time again, and return their number. Points
+        whose copy in the target collection was written as late or later are left alone."""
+        scroll_filter = models.Filter(must=[
+            models.FieldCondition(key=updated_field,
+                                  range=models.DatetimeRange(gte=since - timedelta(seconds=self.CATCH_UP_MARGIN)))
+        ])
+        offset = None
+        caught_up = 0
+        while True:
+            points, offset = self.db_client.scroll_points(source, self.batch_size, offset=offset,
+                                                          scroll_filter=scroll_filter)
+            copied = {point.id: point.payload.get(updated_field)
+                      for point in self.db_client.retrieve_points(target, [point.id for point in points],
+                                                                  [updated_field])}
+            points = [point for point in points
+                      if self._newer(point.payload.get(updated_field), copied.get(point.id))]
+            self._copy(points, text_field, target, create_collection)
+            caught_up += len(points)
+            if offset is None:
+                break
+        if caught_up:
+            logger.info(f"Copied {caught_up} points written into {source} during the reindex again")
+        return caught_up
+
+    @staticmethod
+    def _newer(written_at: Optional[str], copied_at: Optional[str]) -> bool:
+        """Whether a point written at a time is newer than its copy written at another, if it has one."""
+        return copied_at is None or datetime.fromisoformat(written_at) > datetime.fromisoformat(copied_at)
+
+    @staticmethod
+    def _check_replace(name: str, source: str, replace_collection: bool) -> None:
+        if source == name and not replace_collection:
+            raise ValueError(f"{name} is a plain collection, not an alias, so the reindex can only replace it. Pass "
+                             f"replace_collection to delete it right before the switch, searches fail meanwhile.")
+
+    def _switch(self, name: str, source: str, target: str) -> None:
+        """Point the name at the target collection."""
+        if source == name:
+            # Only reached with replace_collection, see _check_replace. Writes after the last catch-up are lost.
+            logger.warning(f"Deleting the plain collection {name} for the alias of {target}")
+            self.db_client.delete_collection(source)
+        self.db_client.switch_alias(name, target)
+        logger.info(f"Switched {name} to {target}")
+
+    def _next_version(self, name: str) -> str:
+        """Name of the next version of a collection, <name>-v<N> after the highest existing version."""
+        pattern = re.compile(rf"^{re.escape(name)}-v(\d+)$")
+        versions = [int(match.group(1)) for collection in self.db_client.list_collections()
+                    if (match := pattern.match(collection))]
+        return f"{name}-v{max(versions, default=0) + 1}"
+
+    def _state_path(self, name: str) -> Path:
+        return self.state_dir / f"reindex_{name}.json"
+
+    def _read_state(self, name: str) -> Optional[Dict[str, Any]]:
+        path = self._state_path(name)
+        if not path.exists():
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _write_state(self, name: str, state: Dict[str, Any]) -> None:
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        # Write and rename, so that an interrupted write does not lose the progress
+        fd, tmp_path = tempfile.mkstemp(dir=self.state_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, self._state_path(name))
@@ -0,0 +1,185 @@
+"""
+Durable journal of the article imports. The journal is a SQLite file next to the article registry that records the
+progress of every article through the import stages
+
+listed -> fetched -> parsed -> embedded -> upserted
+
+together with the failures of the last attempt, the source the article was parsed from, and the days whose import
+has been completed. A rerun of the importer uses the journal to skip finished articles, to resume parsed articles from
+their article.json, to download articles directly from the source that worked for them before, and to start the
+"since last import" mode from the first day that was not completed.
+
+Papers imported from a metadata snapshot with their abstracts only are recorded as metadata_only. The importer of the
+ArXiv API imports them again with their full text, but they do not keep the days of a snapshot import incomplete.
+"""
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+
+class ImportJournal:
+    """SQLite backed journal of article import progress."""
+
+    LISTED = 'listed'
+    FETCHED = 'fetched'
+    PARSED = 'parsed'
+    EMBEDDED = 'embedded'
+    UPSERTED = 'upserted'
+    METADATA_ONLY = 'metadata_only'
+    STATES = (LISTED, FETCHED, PARSED, EMBEDDED, UPSERTED, METADATA_ONLY)
+
+    FILENAME = "import_journal.sqlite3"
+
+    def __init__(self, path: str | Path):
+        """
+        Open the journal, creating it if needed.
+
+        Args:
+            path: Path of the SQLite file
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # The connection is shared by the pipeline worker threads and serialised with the lock
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS articles (
+                    arxiv_id TEXT PRIMARY KEY,
+                    day TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    source TEXT,
+                    updated_at TEXT NOT NULL
+                )""")
+            columns = [row[1] for row in self._conn.execute("PRAGMA table_info(articles)")]
+            if 'source' not in columns:
+                self._conn.execute("ALTER TABLE articles ADD COLUMN source TEXT")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS articles_day ON articles (day)")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS days (
+                    day TEXT PRIMARY KEY,
+                    completed_at TEXT
+                )""")
+
+    @classmethod
+    def for_registry_root(cls, root: str | Path) -> 'ImportJournal':
+        """Open the journal stored in the root directory of an article registry."""
+        return cls(Path(root) / cls.FILENAME)
+
+    @staticmethod
+    def _day_key(day: datetime) -> str:
+        return day.strftime('%Y-%m-%d')
+
+    @staticmethod
+    def _now() -> str:
+        return datetime.now(timezone.utc).isoformat(timespec='seconds').replace('+00:00', 'Z')
+
+    def get(self, arxiv_id: str) -> Optional[Dict]:
+        """Get the journal entry of an article as a dict with keys state, day, attempts, error and source."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state, day, attempts, error, source FROM articles WHERE arxiv_id = ?", (arxiv_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {'state': row[0], 'day': row[1], 'attempts': row[2], 'error': row[3], 'source': row[4]}
+
+    def get_state(self, arxiv_id: str) -> Optional[str]:
+        """Get the import state of an article, or None if the article is not in the journal."""
+        entry = self.get(arxiv_id)
+        return entry['state'] if entry else None
+
+    def mark(
+            self,
+            arxiv_ids: str | Iterable[str],
+            state: str,
+            day: Optional[datetime] = None,
+            source: Optional[str] = None
+    ) -> None:
+        """Record that articles have reached a state. Clears the error of the previous attempt.
+
+        Args:
+            arxiv_ids: ArXiv identifier or identifiers of the articles
+            state: One of STATES
+            day: Listing day of the articles. Required when an article is not in the journal yet.
+            source: Source the articles were parsed from, see ArxivParser.SOURCES
+        """
+        if state not in self.STATES:
+            raise ValueError(f"Unknown import state: {state}")
+        if isinstance(arxiv_ids, str):
+            arxiv_ids = [arxiv_ids]
+        now = self._now()
+        day_key = self._day_key(day) if day else None
+        with self._lock, self._conn:
+            for arxiv_id in arxiv_ids:
+                updated = self._conn.execute(
+                    "UPDATE articles SET state = ?, error = NULL, updated_at = ?, day = COALESCE(?, day), "
+                    "source = COALESCE(?, source) WHERE arxiv_id = ?",
+                    (state, now, day_key, source, arxiv_id)
+                ).rowcount
+                if not updated:
+                    if day_key is None:
+                        raise ValueError(f"Listing day is required for an article not in the journal: {arxiv_id}")
+                    self._conn.execute(
+                        "INSERT INTO articles (arxiv_id, day, state, source, updated_at) VALUES (?, ?, ?, ?, ?)",
+                        (arxiv_id, day_key, state, source, now)
+                    )
+
+    def mark_failed(self, arxiv_ids: str | Iterable[str], error: str) -> None:
+        """Record a failed attempt for articles. Their state stays at the last state reached."""
+        if isinstance(arxiv_ids, str):
+            arxiv_ids = [arxiv_ids]
+        now = self._now()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE articles SET attempts = attempts + 1, error = ?, updated_at = ? WHERE arxiv_id = ?",
+                [(error, now, arxiv_id) for arxiv_id in arxiv_ids]
+            )
+
+    def start_day(self, day: datetime) -> None:
+        """Record that the import of a day has started."""
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR IGNORE INTO days (day) VALUES (?)", (self._day_key(day),))
+
+    def complete_day(self, day: datetime) -> None:
+        """Record that the import of a day has been completed."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO days (day, completed_at) VALUES (?, ?) "
+                "ON CONFLICT (day) DO UPDATE SET completed_at = excluded.completed_at",
+                (self._day_key(day), self._now())
+            )
+
+    def unfinished(self, day: datetime, max_attempts: Optional[int] = None) -> List[str]:
+        """List articles of a day that have not been upserted, neither with their full text nor with their metadata
+        only.
+
+        Args:
+            day: Listing day
+            max_attempts: When given, articles that have failed this many times already are left out
+        """
+        query = "SELECT arxiv_id FROM articles WHERE day = ? AND state NOT IN (?, ?)"
+        params = [self._day_key(day), self.UPSERTED, self.METADATA_ONLY]
+        if max_attempts is not None:
+            query += " AND attempts < ?"
+            params.append(max_attempts)
+        with self._lock:
+            return [row[0] for row in self._conn.execute(query, params)]
+
+    def get_first_incomplete_day(self) -> Optional[datetime]:
+        """Get the first day whose import was started but not completed, or None if there is no such day."""
+        with self._lock:
+            row = self._conn.execute("SELECT MIN(day) FROM days WHERE completed_at IS NULL").fetchone()
+        if row[0] is None:
+            return None
+        return datetime.strptime(row[0], '%Y-%m-%d').replace(tzinfo=timezone.utc)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,557 @@
+"""
+Staged concurrent import pipeline. Articles flow through bounded queues between the stages
+
+listing -> download -> parse -> embed -> upsert
+
+and every stage runs its own pool of worker threads, so network transfers, parsing and embedding overlap instead of
+running one article at a time. The progress of every article is recorded in the ImportJournal, so that a rerun skips
+the articles already imported and resumes parsed articles from their article.json. Parsed articles are embedded and
+upserted in batches which are flushed when full or after a maximum wait. Worker counts, queue sizes and batching are
+configurable via the 'importer' section of the configuration.
+
+When chunking is enabled (see Chunker), a chunk stage between embed and upsert splits the main texts of the articles
+into chunks and embeds them, and the chunks are upserted together with their articles.
+
+Papers of a metadata snapshot (see SnapshotReader) can be imported with their abstracts as their content through the
+embed and upsert stages only. They are journaled as metadata only, so that a later import from the ArXiv API replaces
+them with their full text.
+"""
+import json
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, BinaryIO, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from src.article_registry import ArticleRegistry
+from src.arxiv_agent.ml.chunking import Chunk, Chunker
+from src.arxiv_agent.ml.embedding_model_base import EmbeddingModel
+from src.arxiv_agent.models.articles import Article
+from src.arxiv_agent.parser.base import ParserException
+from src.arxiv_agent.parser.parser import ArxivParser
+from src.config.config_loader import ConfigurationLoader
+from src.database.database_client import DatabaseClient
+from src.importer.journal import ImportJournal
+from src.importer.snapshot import SnapshotReader
+
+logger = logging.getLogger(__name__)
+
+# Sentinel telling a stage worker that its upstream has finished
+_DONE = object()
+
+
+@dataclass
+class ImportItem:
+    """Work item travelling through the pipeline stages."""
+    paper: Dict[str, Any]
+    day: Optional[datetime] = None
+    source: Optional[str] = None
+    fmt: Optional[str] = None
+    data: Optional[BinaryIO] = None
+    article: Optional[Article] = None
+    embedding: Optional[np.ndarray] = None
+    chunks: Optional[List[Chunk]] = None
+    chunk_embeddings: Optional[np.ndarray] = None
+    # Imported from a metadata snapshot, with the abstract as its content
+    metadata_only: bool = False
+
+    @property
+    def arxiv_id(self) -> str:
+        return self.paper['arxiv_id']
+
+
+@dataclass
+class StageStats:
+    """Counters of a single pipeline stage."""
+    processed: int = 0
+    failed: int = 0
+    busy_seconds: float = 0.0
+
+
+class _Stage:
+    """A pool of worker threads consuming an inbox queue and feeding the inbox of the downstream stage."""
+
+    def __init__(self, name: str, func: Callable[[Any], Iterable[Any]], workers: int, inbox: queue.Queue,
+                 on_error: Optional[Callable[[Any, Exception], None]] = None):
+        self.name = name
+        self.func = func
+        self.on_error = on_error
+        self.workers = max(1, workers)
+        self.inbox = inbox
+        self.downstream: Optional['_Stage'] = None
+        self.stats = StageStats()
+        self._lock = threading.Lock()
+        self._running = 0
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> None:
+        self._running = self.workers
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"import-{self.name}-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def join(self) -> None:
+        for thread in self._threads:
+            thread.join()
+
+    def _run(self) -> None:
+        while True:
+            item = self.inbox.get()
+            if item is _DONE:
+                break
+            self._process(item)
+        self._finish()
+
+    def _process(self, item: Any) -> None:
+        started = time.monotonic()
+        # Seconds spent waiting for room downstream, which is not time the stage is busy
+        blocked = 0.0
+        try:
+            # Every output is passed on as soon as it is produced, so that a listing window or a harvest overlaps
+            # with the downloads, and outputs passed on before a failure are not lost
+            for output in self.func(item):
+                if self.downstream:
+                    put_started = time.monotonic()
+                    self.downstream.inbox.put(output)
+                    blocked += time.monotonic() - put_started
+            failed = False
+        except Exception as e:
+            failed = True
+            logger.error(f"Stage {self.name} failed for {_describe(item)}: {str(e)}")
+            if self.on_error:
+                try:
+                    self.on_error(item, e)
+                except Exception as hook_error:
+                    logger.error(f"Recording failure of {_describe(item)} failed: {str(hook_error)}")
+        elapsed = time.monotonic() - started - blocked
+
+        with self._lock:
+            self.stats.busy_seconds += elapsed
+            count = len(item) if isinstance(item, list) else 1
+            if failed:
+                self.stats.failed += count
+            else:
+                self.stats.processed += count
+
+    def _finish(self) -> None:
+        # The last worker out signals every downstream worker to stop
+        with self._lock:
+            self._running -= 1
+            last = self._running == 0
+        if last and self.downstream:
+            for _ in range(self.downstream.workers):
+                self.downstream.inbox.put(_DONE)
+
+
+class _BatchingStage(_Stage):
+    """Stage that collects items into batches and flushes them by count or by time."""
+
+    def __init__(self, name: str, func: Callable[[List[Any]], Iterable[Any]], workers: int, inbox: queue.Queue,
+                 batch_size: int, max_wait: float, on_error: Optional[Callable[[Any, Exception], None]] = None):
+        super().__init__(name, func, workers, inbox, on_error)
+        self.batch_size = max(1, batch_size)
+        self.max_wait = max_wait
+
+    def _run(self) -> None:
+        batch = []
+        deadline = None
+        while True:
+            try:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                item = self.inbox.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is not None and item is not _DONE:
+                if not batch:
+                    deadline = time.monotonic() + self.max_wait
+                batch.append(item)
+
+            if batch and (item is None or item is _DONE or len(batch) >= self.batch_size):
+                self._process(batch)
+                batch = []
+                deadline = None
+
+            if item is _DONE:
+                break
+        self._finish()
+
+
+def _describe(item: Any) -> str:
+    if isinstance(item, ImportItem):
+        return item.arxiv_id
+    if isinstance(item, list):
+        return ", ".join(_describe(i) for i in item)
+    return str(item)
+
+
+class ImportPipeline:
+    """Pipelined importer of ArXiv articles into the article registry and the database."""
+
+    STAGES = ('listing', 'download', 'parse', 'embed', 'upsert')
+    CHUNK_STAGES = ('listing', 'download', 'parse', 'embed', 'chunk', 'upsert')
+    DEFAULT_WORKERS = {'listing': 1, 'download': 2, 'parse': 2, 'embed': 1, 'chunk': 1, 'upsert': 1}
+    DEFAULT_QUEUE_SIZE = 64
+    DEFAULT_BATCH_SIZE = 64
+    DEFAULT_BATCH_MAX_WAIT = 5.0
+    DEFAULT_MAX_ATTEMPTS = 3
+    DEFAULT_LISTING_WINDOW_DAYS = 7
+
+    # Sentinel for a chunker that has not been resolved from the configuration yet
+    _UNRESOLVED = object()
+
+    def __init__(
+            self,
+            parser: Optional[ArxivParser] = None,
+            article_registry: Optional[ArticleRegistry] = None,
+            model: Optional[EmbeddingModel] = None,
+            db_client: Optional[DatabaseClient] = None,
+            journal: Optional[ImportJournal] = None,
+            workers: Optional[Dict[str, int]] = None,
+            queue_size: Optional[int] = None,
+            batch_size: Optional[int] = None,
+            batch_max_wait: Optional[float] = None,
+            upsert_wait: Optional[bool] = None,
+            lister: Optional[Any] = None,
+            chunker: Optional[Chunker] = _UNRESOLVED
+    ):
+        """
+        Initialise the pipeline.
+
+        Args:
+            parser: Parser used for listing, downloading and parsing articles
+            article_registry: Registry the article.json files are written into
+            model: Embedding model for the article abstracts. Defaults to the embedding model shared by the process.
+            db_client: Database client the articles are upserted into
+            journal: Journal of the import progress. Defaults to the journal in the article registry root.
+            workers: Worker count per stage. Falls back to configuration and then to DEFAULT_WORKERS.
+            queue_size: Maximum number of items waiting between two stages
+            batch_size: Number of articles embedded and upserted together
+            batch_max_wait: Seconds after which a partial batch is flushed
+            upsert_wait: Whether every upsert waits for Qdrant to apply it. When False, upserts are only acknowledged
+                and the pipeline waits for all of them once at the end of the run. The articles are journaled as
+                upserted only after that wait.
+            lister: Source of the paper listings with the list_papers method of ArxivParser, e.g. an
+                ArxivOAIHarvester. Defaults to the parser. The watermark of a lister with a set_watermark method is
+                advanced when the days are completed.
+            chunker: Chunker of the main texts, or None to embed the abstracts only. Defaults to the chunker of the
+                configuration.
+        """
+        conf = ConfigurationLoader().get_config().get('importer', {})
+        self.parser = parser or ArxivParser()
+        self.lister = lister or self.parser
+        self.chunker = Chunker.from_config() if chunker is self._UNRESOLVED else chunker
+        self.article_registry = article_registry or ArticleRegistry()
+        if model is None:
+            from src.arxiv_agent.ml.embedding_model_factory import get_embedding_model
+            model = get_embedding_model()
+        self.model = model
+        if db_client is None:
+            from src.database.database_client_qdrant import DatabaseClientQdrant
+            db_client = DatabaseClientQdrant.get_instance()
+        self.db_client = db_client
+        self.journal = journal or ImportJournal.for_registry_root(self.article_registry.root)
+        self.max_attempts = conf.get('max_attempts', self.DEFAULT_MAX_ATTEMPTS)
+        self.listing_window_days = conf.get('listing_window_days', self.DEFAULT_LISTING_WINDOW_DAYS)
+        self.workers = {**self.DEFAULT_WORKERS, **conf.get('workers', {}), **(workers or {})}
+        self.queue_size = queue_size if queue_size is not None else conf.get('queue_size', self.DEFAULT_QUEUE_SIZE)
+        self.batch_size = batch_size if batch_size is not None else conf.get('batch_size', self.DEFAULT_BATCH_SIZE)
+        # 0 flushes every batch right away
+        self.batch_max_wait = batch_max_wait if batch_max_wait is not None else \
+            conf.get('batch_max_wait', self.DEFAULT_BATCH_MAX_WAIT)
+        self.upsert_wait = upsert_wait if upsert_wait is not None else conf.get('upsert_wait', True)
+        self._seen_ids = set()
+        self._seen_lock = threading.Lock()
+        self._failed_days = set()
+        # Articles upserted without waiting with their journal states and days, journaled once Qdrant has applied
+        # their writes
+        self._unapplied: List[Tuple[str, str, Optional[datetime]]] = []
+        self._unapplied_lock = threading.Lock()
+
+    def run(self, start: datetime, end: datetime) -> Dict[str, StageStats]:
+        """
+        Import all articles of the configured categories published between start (inclusive) and end (exclusive).
+
+        Args:
+            start: First day to import
+            end: Day at which to stop the import
+
+        Returns:
+            Dict[str, StageStats]: Counters of every stage
+        """
+        days = self._days(start, end)
+        # Every listing task covers all categories within a window of days
+        tasks = [(day, min(day + timedelta(days=self.listing_window_days), end))
+                 for day in days[::self.listing_window_days]]
+        self._failed_days = set()
+
+        stages = self._build_stages(self.CHUNK_STAGES if self.chunker else self.STAGES)
+        for task in tasks:
+            stages[0].inbox.put(task)
+        for _ in range(stages[0].workers):
+            stages[0].inbox.put(_DONE)
+
+        for stage in stages:
+            stage.start()
+        for stage in stages:
+            stage.join()
+
+        self._wait_for_upserts()
+
+        # A harvester continues after its watermark, which is advanced over the days completed without a gap only
+        set_watermark = getattr(self.lister, 'set_watermark', None)
+        categories = ConfigurationLoader().get_config()['articles']['categories']
+        gap = False
+        for day in days:
+            if day in self._failed_days:
+                gap = True
+                continue
+            unfinished = self.journal.unfinished(day, max_attempts=self.max_attempts)
+            if unfinished:
+                gap = True
+                logger.warning(f"{len(unfinished)} articles of {day.date()} were not imported and will be retried")
+            else:
+                self.journal.complete_day(day)
+                if set_watermark and not gap:
+                    set_watermark(categories, day)
+
+        return {stage.name: stage.stats for stage in stages}
+
+    def run_snapshot(self, reader: SnapshotReader) -> Dict[str, StageStats]:
+        """
+        Import the papers of a metadata snapshot with their abstracts as their content. The papers are read lazily
+        and only go through the embed and upsert stages, nothing is downloaded and no article.json is written.
+        Papers that have been imported already, from a snapshot or with their full text, are skipped. The imported
+        papers are journaled as ImportJournal.METADATA_ONLY once per upserted batch, the run method imports them again
+        with their full text. Papers that failed are not journaled and are imported again by the next run_snapshot.
+
+        Args:
+            reader: Reader of the snapshot, filtering the papers to import
+
+        Returns:
+            Dict[str, StageStats]: Counters of the embed and upsert stages
+        """
+        stages = self._build_stages(('embed', 'upsert'))
+        for stage in stages:
+            stage.start()
+        skipped = 0
+        try:
+            for paper in reader:
+                if self.journal.get_state(paper['arxiv_id']) in (ImportJournal.UPSERTED, ImportJournal.METADATA_ONLY):
+                    skipped += 1
+                    continue
+                day = datetime.fromisoformat(paper['published']).replace(hour=0, minute=0, second=0, microsecond=0)
+                paper_data = self.parser.build_paper_data(paper, reader.to_content(paper))
+                # Blocks while the embed stage is behind, so the snapshot is read no faster than it is imported
+                stages[0].inbox.put(ImportItem(paper=paper, day=day, article=Article(**paper_data), metadata_only=True))
+        finally:
+            for _ in range(stages[0].workers):
+                stages[0].inbox.put(_DONE)
+            for stage in stages:
+                stage.join()
+
+        self._wait_for_upserts()
+        logger.info(f"Skipped {skipped} papers of the snapshot that were imported already")
+        return {stage.name: stage.stats for stage in stages}
+
+    def _wait_for_upserts(self) -> None:
+        """Wait until Qdrant has applied the upserts that did not wait, and journal their articles as upserted."""
+        if self.upsert_wait:
+            return
+        self.db_client.wait_for_pending_updates()
+        with self._unapplied_lock:
+            unapplied, self._unapplied = self._unapplied, []
+        self._mark_imported(unapplied)
+
+    def _mark_imported(self, imported: Iterable[Tuple[str, str, Optional[datetime]]]) -> None:
+        """Journal imported articles with their states and days, see _imported_state, in one call per state and day."""
+        grouped: Dict[Tuple[str, Optional[datetime]], List[str]] = {}
+        for arxiv_id, state, day in imported:
+            grouped.setdefault((state, day), []).append(arxiv_id)
+        for (state, day), arxiv_ids in grouped.items():
+            self.journal.mark(arxiv_ids, state, day)
+
+    @staticmethod
+    def _imported_state(item: ImportItem) -> str:
+        return ImportJournal.METADATA_ONLY if item.metadata_only else ImportJournal.UPSERTED
+
+    def _build_stages(self, names: Sequence[str]) -> List[_Stage]:
+        """Create connected stages, see STAGES."""
+        funcs = {
+            'listing': self._list,
+            'download': self._download,
+            'parse': self._parse,
+            'embed': self._embed,
+            'chunk': self._chunk,
+            'upsert': self._upsert,
+        }
+        stages = []
+        for name in names:
+            # The listing inbox only holds the listing windows and is filled up front
+            inbox = queue.Queue() if name == 'listing' else queue.Queue(maxsize=self.queue_size)
+            if name == 'embed':
+                stages.append(_BatchingStage(name, funcs[name], self.workers[name], inbox,
+                                             self.batch_size, self.batch_max_wait, self._record_failure))
+            else:
+                stages.append(_Stage(name, funcs[name], self.workers[name], inbox, self._record_failure))
+        for upstream, downstream in zip(stages, stages[1:]):
+            upstream.downstream = downstream
+        return stages
+
+    def _record_failure(self, item: Any, error: Exception) -> None:
+        if isinstance(item, tuple):
+            # A failed listing task leaves its days incomplete
+            self._failed_days.update(self._days(*item))
+            return
+        items = item if isinstance(item, list) else [item]
+        self.journal.mark_failed([i.arxiv_id for i in items], str(error))
+
+    @staticmethod
+    def _days(start: datetime, end: datetime) -> List[datetime]:
+        days = []
+        day = start
+        while day < end:
+            days.append(day)
+            day = day + timedelta(days=1)
+        return days
+
+    @staticmethod
+    def _listing_day(paper: Dict[str, Any]) -> datetime:
+        """Day a paper was listed for: its last change for listings by change date (OAI-PMH), its submission
+        otherwise."""
+        if paper.get('updated'):
+            return datetime.strptime(paper['updated'][:10], '%Y-%m-%d').replace(tzinfo=timezone.utc)
+        return datetime.fromisoformat(paper['published']).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    def _list(self, task: Tuple[datetime, datetime]) -> Iterable[ImportItem]:
+        start, end = task
+        categories = ConfigurationLoader().get_config()['articles']['categories']
+        logger.info(f"Listing {', '.join(categories)} papers for {start.date()} - {end.date()} ...")
+        for day in self._days(start, end):
+            self.journal.start_day(day)
+        for paper in self.lister.list_papers(categories, start, end):
+            day = self._listing_day(paper)
+            # Pages of a listing can overlap when the results shift during pagination
+            with self._seen_lock:
+                if paper['arxiv_id'] in self._seen_ids:
+                    continue
+                self._seen_ids.add(paper['arxiv_id'])
+
+            item = ImportItem(paper=paper, day=day)
+            entry = self.journal.get(item.arxiv_id)
+            if entry and entry['source']:
+                self.parser.remember_source(item.arxiv_id, entry['source'])
+            if entry is None or entry['state'] == ImportJournal.METADATA_ONLY:
+                # Papers imported from a snapshot are imported again with their full text
+                self.journal.mark(item.arxiv_id, ImportJournal.LISTED, day)
+            elif entry['state'] == ImportJournal.UPSERTED:
+                continue
+            elif entry['attempts'] >= self.max_attempts:
+                logger.warning(f"Skipping {item.arxiv_id} after {entry['attempts']} failed attempts: {entry['error']}")
+                continue
+            elif entry['state'] in (ImportJournal.PARSED, ImportJournal.EMBEDDED):
+                item.article = self._load_article(item.arxiv_id)
+            yield item
+
+    def _load_article(self, arxiv_id: str) -> Optional[Article]:
+        """Load a previously parsed article from the registry, or None if that is not possible."""
+        paths = self.article_registry.get_paths(arxiv_id)
+        if not paths or not paths['article'].exists():
+            return None
+        try:
+            with open(paths['article'], encoding='utf-8') as f:
+                return Article(**json.load(f))
+        except Exception as e:
+            logger.info(f"Could not resume {arxiv_id} from {paths['article']}: {str(e)}")
+            return None
+
+    def _download(self, item: ImportItem) -> Iterable[ImportItem]:
+        if item.article is not None:
+            # Resumed from the registry
+            yield item
+            return
+
+        item.source = self.parser.route(item.arxiv_id)[0]
+        try:
+            item.fmt, item.data = self.parser.fetch(item.arxiv_id, item.source)
+            self.journal.mark(item.arxiv_id, ImportJournal.FETCHED)
+        except ParserException as e:
+            # The parse stage falls back to the remaining sources
+            logger.info(f"Download from {item.source} failed for {item.arxiv_id}: {str(e)}")
+        yield item
+
+    def _parse(self, item: ImportItem) -> Iterable[ImportItem]:
+        if item.article is not None:
+            yield item
+            return
+
+        content = None
+        source = item.source
+        if item.data is not None:
+            try:
+                with item.data:
+                    content = self.parser.parse(item.fmt, item.data)
+            except ParserException as e:
+                logger.info(f"Parsing {item.fmt} failed for {item.arxiv_id}: {str(e)}")
+            item.data = None
+        if not content or not content['success']:
+            remaining = [s for s in self.parser.route(item.arxiv_id) if s != item.source]
+            tried_formats = [item.fmt] if item.fmt else []
+            content = self.parser.extract_paper_text(item.arxiv_id, sources=remaining, tried_formats=tried_formats)
+            source = self.parser.route(item.arxiv_id)[0]
+
+        article_directory = self.article_registry.create_article_dir_from_dict(item.paper)
+        paper_data = self.parser.build_paper_data(item.paper, content)
+        self.parser.write_paper_data(paper_data, str(article_directory))
+        item.article = Article(**paper_data)
+        self.journal.mark(item.arxiv_id, ImportJournal.PARSED, source=source)
+        yield item
+
+    def _embed(self, batch: List[ImportItem]) -> Iterable[List[ImportItem]]:
+        embeddings = self.model.encode_array([item.article.abstract for item in batch])
+        for item, embedding in zip(batch, embeddings):
+            item.embedding = embedding
+        # Snapshot papers are not in the journal until they are upserted
+        embedded = [item.arxiv_id for item in batch if not item.metadata_only]
+        if embedded:
+            self.journal.mark(embedded, ImportJournal.EMBEDDED)
+        yield batch
+
+    def _chunk(self, batch: List[ImportItem]) -> Iterable[List[ImportItem]]:
+        for item in batch:
+            item.chunks = self.chunker.chunk(item.article)
+        texts = [chunk.text for item in batch for chunk in item.chunks]
+        if texts:
+            # The chunks of the whole batch are embedded together, the model batches them by length
+            embeddings = self.model.encode_array(texts)
+            offset = 0
+            for item in batch:
+                item.chunk_embeddings = embeddings[offset:offset + len(item.chunks)]
+                offset += len(item.chunks)
+        yield batch
+
+    def _upsert(self, batch: List[ImportItem]) -> Iterable[ImportItem]:
+        self.db_client.insert([item.article for item in batch], np.stack([item.embedding for item in batch]),
+                              wait=self.upsert_wait)
+        # Articles through the chunk stage, the earlier chunks of those without chunks now are deleted too
+        chunked = [item for item in batch if item.chunks is not None]
+        if chunked:
+            with_chunks = [item for item in chunked if item.chunks]
+            self.db_client.insert_chunks([chunk for item in with_chunks for chunk in item.chunks],
+                                         np.concatenate([item.chunk_embeddings for item in with_chunks])
+                                         if with_chunks else [],
+                                         wait=self.upsert_wait, arxiv_ids=[item.arxiv_id for item in chunked])
+        # The day is only needed for snapshot papers, the articles of the run method are journaled since their listing
+        imported = [(item.arxiv_id, self._imported_state(item), item.day if item.metadata_only else None)
+                    for item in batch]
+        if self.upsert_wait:
+            self._mark_imported(imported)
+        else:
+            # Only acknowledged so far, a crash before _wait_for_upserts leaves the articles to be upserted again
+            with self._unapplied_lock:
+                self._unapplied.extend(imported)
+        logger.info(f"Inserted {len(batch)} papers: {_describe(batch)}")
+        return []
@@ -0,0 +1,125 @@
+"""
+Reader of arXiv metadata snapshots, for seeding the database without going through the rate-limited ArXiv API.
+
+A snapshot is a JSON-lines file (optionally gzipped) with one metadata record per paper, in the format of the arXiv
+metadata dump published on Kaggle:
+
+{"id": "2412.02957", "title": "...", "authors": "...", "abstract": "...", "categories": "cs.LG cs.AI",
+ "versions": [{"version": "v1", "created": "Wed, 4 Dec 2024 02:05:55 GMT"}],
+ "authors_parsed": [["Lee", "Namkyeong", ""]], ...}
+
+The file is read line by line, and lines are only decoded as JSON when they mention one of the wanted categories, so
+a snapshot of millions of records is filtered in minutes with constant memory.
+"""
+import gzip
+import json
+import logging
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, TextIO
+
+logger = logging.getLogger(__name__)
+
+# Old style identifiers such as 'hep-th/9901001' are not supported by the database point ids
+_NEW_STYLE_ID = re.compile(r'^\d{4}\.\d{4,5}$')
+
+
+@dataclass
+class SnapshotStats:
+    """Counters of a snapshot read."""
+    lines: int = 0
+    matched: int = 0
+    invalid: int = 0
+    unsupported_ids: int = 0
+
+
+class SnapshotReader:
+    """Streams the papers of an arXiv metadata snapshot that match categories and a time window."""
+
+    def __init__(
+            self,
+            path: str | Path,
+            categories: Optional[Iterable[str]] = None,
+            start: Optional[datetime] = None,
+            end: Optional[datetime] = None
+    ):
+        """
+        Initialise the reader. The file is not opened until iteration.
+
+        Args:
+            path: Path of the snapshot file. Files ending with .gz are decompressed on the fly.
+            categories: Categories of which a paper must have at least one. All papers by default.
+            start: Earliest first version submission time (inclusive). Must be timezone aware.
+            end: Latest first version submission time (exclusive). Must be timezone aware.
+        """
+        self.path = Path(path)
+        self.categories = set(categories) if categories else None
+        self.start = start
+        self.end = end
+        self.stats = SnapshotStats()
+
+    def _open(self) -> TextIO:
+        if self.path.suffix == '.gz':
+            return gzip.open(self.path, 'rt', encoding='utf-8')
+        return open(self.path, 'r', encoding='utf-8')
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        """Yield the matching papers as dictionaries in the format of ArxivBase.list_papers."""
+        categories = self.categories
+        with self._open() as f:
+            for line in f:
+                self.stats.lines += 1
+                # Cheap substring test before decoding the line
+                if categories and not any(category in line for category in categories):
+                    continue
+                try:
+                    paper = self.to_paper(json.loads(line))
+                except (ValueError, KeyError, IndexError, TypeError) as e:
+                    self.stats.invalid += 1
+                    logger.debug(f"Skipping invalid snapshot record on line {self.stats.lines}: {str(e)}")
+                    continue
+                if paper is None:
+                    self.stats.unsupported_ids += 1
+                    continue
+                if categories and categories.isdisjoint(paper['categories']):
+                    continue
+                published = datetime.fromisoformat(paper['published'])
+                if (self.start and published < self.start) or (self.end and published >= self.end):
+                    continue
+                self.stats.matched += 1
+                yield paper
+
+    @staticmethod
+    def to_paper(record: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Convert a snapshot record into a paper dictionary, or None if its identifier is not supported."""
+        if not _NEW_STYLE_ID.match(record['id']):
+            return None
+        versions = record['versions']
+        published = parsedate_to_datetime(versions[0]['created'])
+        if record.get('authors_parsed'):
+            authors = [' '.join(part for part in (first, last) if part)
+                       for last, first, *_ in record['authors_parsed']]
+        else:
+            authors = [author.strip() for author in record['authors'].replace(' and ', ',').split(',')
+                       if author.strip()]
+        return {
+            'arxiv_id': record['id'] + versions[-1]['version'],
+            'title': ' '.join(record['title'].split()),
+            'authors': authors,
+            'published': published.isoformat(timespec='seconds').replace('+00:00', 'Z'),
+            'abstract': ' '.join(record['abstract'].split()),
+            'categories': record['categories'].split(),
+        }
+
+    @staticmethod
+    def to_content(paper: Dict[str, Any]) -> Dict[str, Any]:
+        """Abstract-only parse result of a snapshot paper, see ArxivParser.build_paper_data."""
+        return {
+            'format': 'abstract',
+            'sections': [],
+            'main_text': paper['abstract'],
+            'success': True
+        }
@@ -0,0 +1,24 @@
+"""
+Module for batching tests.
+"""
+from src.arxiv_agent.ml.batching import token_budget_batches
+
+
+def test_batches_within_budget():
+    lengths = [10, 300, 12, 280, 11, 512, 9]
+    batches = token_budget_batches(lengths, max_tokens=600)
+    assert batches == [[5], [1, 3], [2, 4, 0, 6]]
+    for batch in batches:
+        assert max(lengths[i] for i in batch) * len(batch) <= 600
+
+
+def test_every_text_once():
+    lengths = [(i * 37) % 200 for i in range(100)]
+    batches = token_budget_batches(lengths, max_tokens=1000)
+    assert sorted(i for batch in batches for i in batch) == list(range(100))
+
+
+def test_over_budget_and_empty():
+    assert token_budget_batches([2000, 3000], max_tokens=512) == [[1], [0]]
+    assert token_budget_batches([], max_tokens=512) == []
+    assert token_budget_batches([0, 0, 0], max_tokens=2) == [[0, 1], [2]]
@@ -0,0 +1,44 @@
+"""
+Module for chunking tests.
+"""
+import pytest
+from src.arxiv_agent.ml.chunking import Chunker
+from src.arxiv_agent.models.articles import Article
+
+
+def article(main_text, sections=()):
+    return Article(arxiv_id='2402.12345v1', title='Title', authors=['A. Author'], published='2024-02-08T10:00:00Z',
+                   abstract='Abstract.', categories=['cs.AI'], format='tex', sections=list(sections),
+                   main_text=main_text, processed_at='2024-02-09T10:00:00Z')
+
+
+def words(prefix, count):
+    return ' '.join(f"{prefix}{i}" for i in range(count))
+
+
+def test_sections_and_windows():
+    text = '\n\n'.join([words('a', 30), 'Introduction', words('i', 100), 'Method', words('m', 25)])
+    chunks = Chunker(words=40, overlap_words=10).chunk(article(text, ['Introduction', 'Method']))
+    assert [(chunk.index, chunk.section) for chunk in chunks] == [
+        (0, ''), (1, 'Introduction'), (2, 'Introduction'), (3, 'Introduction'), (4, 'Method')]
+    assert chunks[1].text.split()[-10:] == chunks[2].text.split()[:10]
+    assert chunks[3].text.split()[-1] == 'i99'
+    assert chunks[4].text == words('m', 25)
+
+
+def test_short_sections_merged():
+    text = '\n\n'.join(['Introduction', words('i', 5), 'Method', words('m', 30)])
+    chunks = Chunker(words=40, overlap_words=10).chunk(article(text, ['Introduction', 'Method']))
+    assert len(chunks) == 1
+    assert chunks[0].section == 'Introduction'
+    assert chunks[0].text == words('i', 5) + ' ' + words('m', 30)
+
+
+def test_max_chunks():
+    chunks = Chunker(words=20, overlap_words=0, max_chunks=3).chunk(article(words('w', 200)))
+    assert [chunk.text.split()[0] for chunk in chunks] == ['w0', 'w20', 'w40']
+
+
+def test_invalid_overlap():
+    with pytest.raises(ValueError):
+        Chunker(words=20, overlap_words=20)
@@ -0,0 +1,128 @@
+"""
+Module for embedding cache tests.
+"""
+import threading
+import pytest
+from typing import List
+from src.arxiv_agent.ml.embedding_cache import CachedEmbeddingModel, EmbeddingCache, QueryEmbeddingCache
+from src.arxiv_agent.ml.embedding_model_base import EmbeddingModel
+
+
+class CountingModel(EmbeddingModel):
+    model_name = 'counting'
+
+    def __init__(self):
+        self.encoded: List[str] = []
+
+    def encode(self, text):
+        self.encoded.append(text)
+        return [float(len(text)), 0.5]
+
+    def encode_batch(self, texts, batch_size=32):
+        self.encoded.extend(texts)
+        return [[float(len(text)), 0.5] for text in texts]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = EmbeddingCache(tmp_path / EmbeddingCache.FILENAME, max_size_bytes=1024 ** 2)
+    yield cache
+    cache.close()
+
+
+def test_key_normalization():
+    assert EmbeddingCache.key('m', ' A  text\n') == EmbeddingCache.key('m', 'A text')
+    assert EmbeddingCache.key('m', 'A text') != EmbeddingCache.key('other', 'A text')
+
+
+def test_encode_batch(cache):
+    model = CountingModel()
+    cached = CachedEmbeddingModel(model, cache)
+    assert cached.encode_batch(['one', 'three', 'one ']) == [[3.0, 0.5], [5.0, 0.5], [3.0, 0.5]]
+    assert model.encoded == ['one', 'three']
+
+    assert cached.encode_batch(['two', 'three']) == [[3.0, 0.5], [5.0, 0.5]]
+    assert cached.encode('one') == [3.0, 0.5]
+    assert model.encoded == ['one', 'three', 'two']
+    assert (cache.hits, cache.misses) == (2, 4)
+
+
+def test_counters_thread_safe(cache):
+    cache.put_many('m', ['cached'], [[1.0, 0.0]])
+
+    def read():
+        for _ in range(100):
+            cache.get_arrays('m', ['cached', 'missing'])
+
+    threads = [threading.Thread(target=read) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert (cache.hits, cache.misses) == (400, 400)
+
+
+class NormalizingModel(CountingModel):
+    model_name = 'counting:onnx-int8'
+
+    def __init__(self, normalize):
+        super().__init__()
+        self.normalize = normalize
+
+
+def test_cache_name(cache):
+    assert CachedEmbeddingModel.cache_name(CountingModel()) == 'counting'
+    assert CachedEmbeddingModel.cache_name(NormalizingModel(False)) == 'counting:onnx-int8'
+    assert CachedEmbeddingModel.cache_name(NormalizingModel(True)) == 'counting:onnx-int8:normalized'
+
+    # Embeddings of the same model with and without normalisation are cached apart
+    plain = NormalizingModel(False)
+    normalized = NormalizingModel(True)
+    CachedEmbeddingModel(plain, cache).encode('text')
+    CachedEmbeddingModel(normalized, cache).encode('text')
+    assert plain.encoded == ['text']
+    assert normalized.encoded == ['text']
+
+
+def test_persistence(tmp_path, cache):
+    CachedEmbeddingModel(CountingModel(), cache).encode('persisted')
+    cache.close()
+
+    reopened = EmbeddingCache(cache.path, max_size_bytes=1024 ** 2)
+    assert reopened.get_many('counting', ['persisted', 'missing']) == [[9.0, 0.5], None]
+    assert reopened.size() == 8
+    reopened.close()
+
+
+def test_eviction(tmp_path):
+    # Room for ten 2-dimensional float32 vectors
+    cache = EmbeddingCache(tmp_path / EmbeddingCache.FILENAME, max_size_bytes=80)
+    cache.put_many('m', [f"text {i}" for i in range(10)], [[float(i), 0.0] for i in range(10)])
+    cache.get_many('m', ['text 0'])
+    cache.put_many('m', ['text 10'], [[10.0, 0.0]])
+    assert cache.size() == 72
+    assert len(cache) == 9
+    # The recently used and the new embedding are kept
+    assert cache.get_many('m', ['text 0', 'text 10']) == [[0.0, 0.0], [10.0, 0.0]]
+    cache.close()
+
+
+def test_query_cache():
+    model = CountingModel()
+    cache = QueryEmbeddingCache(max_size=2)
+    assert cache.get_or_compute('Graph  networks', model.encode) == [15.0, 0.5]
+    assert cache.get_or_compute('graph networks ', model.encode) == [15.0, 0.5]
+    cache.get_or_compute('b', model.encode)
+    cache.get_or_compute('c', model.encode)
+    assert len(cache) == 2
+    cache.get_or_compute('graph networks', model.encode)
+    assert model.encoded == ['Graph  networks', 'b', 'c', 'graph networks']
+    assert (cache.hits, cache.misses) == (1, 4)
+
+
+def test_query_cache_ttl():
+    model = CountingModel()
+    cache = QueryEmbeddingCache(ttl_seconds=0)
+    cache.get_or_compute('query', model.encode)
+    cache.get_or_compute('query', model.encode)
+    assert model.encoded == ['query', 'query']
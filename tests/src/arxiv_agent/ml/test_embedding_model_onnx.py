@@ -0,0 +1,88 @@
+"""
+Module for ONNX embedding model tests. Running the model needs onnxruntime and an exported model, so the model is
+tested with a stub tokenizer and a stub inference session.
+"""
+from types import SimpleNamespace
+import numpy as np
+import pytest
+from src.arxiv_agent.ml import embedding_model_factory
+from src.arxiv_agent.ml.embedding_model_onnx import EmbeddingOnnx, pool
+
+
+def test_pool():
+    hidden_states = np.arange(2 * 3 * 2, dtype=np.float32).reshape(2, 3, 2)
+    attention_mask = np.array([[1, 1, 0], [1, 1, 1]])
+    assert pool(hidden_states, attention_mask, 'cls').tolist() == [[0, 1], [6, 7]]
+    # Padding is left out of the mean
+    assert pool(hidden_states, attention_mask, 'mean').tolist() == [[1, 2], [8, 9]]
+    with pytest.raises(ValueError):
+        pool(hidden_states, attention_mask, 'max')
+
+
+def test_unknown_backend(monkeypatch):
+    monkeypatch.setenv('APP_NAME', 'arxiv_parser')
+    monkeypatch.setenv('ENV', 'dev')
+    monkeypatch.setattr(embedding_model_factory.ConfigurationLoader, 'get_config',
+                        lambda self: {'embedding': {'backend': 'tensorflow'}})
+    with pytest.raises(ValueError, match='tensorflow'):
+        embedding_model_factory.create_embedding_model()
+
+
+class StubTokenizer:
+    """Tokenizer with a token per word, the id of a token being the length of the word."""
+
+    def encode_batch(self, texts):
+        return [SimpleNamespace(ids=[len(word) for word in text.split()]) for text in texts]
+
+
+class StubSession:
+    """Inference session embedding a token id as [id, 1], recording its inputs."""
+
+    def __init__(self):
+        self.inputs = []
+
+    def run(self, output_names, inputs):
+        self.inputs.append(inputs)
+        input_ids = inputs['input_ids']
+        return [np.stack([input_ids, np.ones_like(input_ids)], axis=-1).astype(np.float32)]
+
+
+def make_model(normalize, max_batch_tokens=0):
+    # onnxruntime is not needed, the model is set up without loading an export
+    model = object.__new__(EmbeddingOnnx)
+    model.model_name = 'stub:onnx-int8'
+    model.pooling = 'mean'
+    model.max_seq_length = 512
+    model.dimensions = 2
+    model.normalize = normalize
+    model.max_batch_tokens = max_batch_tokens
+    model.tokenizer = StubTokenizer()
+    model.pad_id = 0
+    model.session = StubSession()
+    model.input_names = {'input_ids', 'attention_mask', 'token_type_ids'}
+    return model
+
+
+def test_encode_array():
+    model = make_model(normalize=False)
+    embeddings = model.encode_array(['ab abcd', 'abcdef'], batch_size=2)
+    assert embeddings.dtype == np.float32
+    # The mean of the real tokens, the padding of the shorter text is left out
+    assert embeddings.tolist() == [[3.0, 1.0], [6.0, 1.0]]
+
+    inputs = model.session.inputs[0]
+    assert inputs['input_ids'].tolist() == [[2, 4], [6, 0]]
+    assert inputs['attention_mask'].tolist() == [[1, 1], [1, 0]]
+    assert inputs['token_type_ids'].tolist() == [[0, 0], [0, 0]]
+    assert all(array.dtype == np.int64 for array in inputs.values())
+
+
+def test_encode_array_normalized_in_input_order():
+    model = make_model(normalize=True, max_batch_tokens=8)
+    texts = ['abc', 'a ' * 7, 'abcd abcd', 'ab']
+    embeddings = model.encode_array(texts)
+    assert len(model.session.inputs) > 1
+    assert embeddings.dtype == np.float32
+    assert np.allclose(np.linalg.norm(embeddings, axis=1), 1.0)
+    expected = np.array([[3, 1], [1, 1], [4, 1], [2, 1]], dtype=np.float32)
+    assert np.allclose(embeddings, expected / np.linalg.norm(expected, axis=1, keepdims=True))
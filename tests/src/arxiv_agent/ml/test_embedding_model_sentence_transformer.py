@@ -0,0 +1,61 @@
+"""
+Module for SentenceTransformer embedding model tests, run with a fake model instead of a downloaded one.
+"""
+import numpy as np
+import pytest
+
+pytest.importorskip('sentence_transformers')
+from src.arxiv_agent.ml.embedding_model_sentence_transformer import EmbeddingSentenceTransformer
+
+
+class FakeSentenceTransformer:
+    """Model embedding a text as [its length, 1], with a token per word, recording the batches."""
+
+    max_seq_length = 512
+
+    def __init__(self):
+        self.batches = []
+
+    def get_sentence_embedding_dimension(self):
+        return 2
+
+    def tokenizer(self, texts, **kwargs):
+        return {'input_ids': [text.split() for text in texts]}
+
+    def encode(self, texts, batch_size, convert_to_numpy, normalize_embeddings):
+        self.batches.append(list(texts))
+        embeddings = np.array([[len(text), 1.0] for text in texts], dtype=np.float64)
+        if normalize_embeddings:
+            embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings
+
+
+def make_model(max_batch_tokens, normalize=False):
+    # The model is not loaded, see FakeSentenceTransformer
+    model = object.__new__(EmbeddingSentenceTransformer)
+    model.model_name = 'fake'
+    model.normalize = normalize
+    model.max_batch_tokens = max_batch_tokens
+    model.model = FakeSentenceTransformer()
+    return model
+
+
+def test_token_budget_keeps_input_order():
+    texts = ['w ' * n for n in (3, 40, 1, 25, 7, 60, 2, 12)]
+    model = make_model(max_batch_tokens=64)
+    embeddings = model.encode_array(texts)
+
+    # Batched by length over several budgets, returned in the order of the texts
+    assert len(model.model.batches) > 1
+    assert [text for batch in model.model.batches for text in batch] != texts
+    assert embeddings.dtype == np.float32
+    assert embeddings[:, 0].tolist() == [len(text) for text in texts]
+
+
+@pytest.mark.parametrize('max_batch_tokens', [0, 64])
+def test_normalized_float32(max_batch_tokens):
+    model = make_model(max_batch_tokens, normalize=True)
+    embeddings = model.encode_array(['a b c', 'a', 'a b'])
+    assert embeddings.dtype == np.float32
+    assert embeddings.flags['C_CONTIGUOUS']
+    assert np.allclose(np.linalg.norm(embeddings, axis=1), 1.0)
@@ -0,0 +1,85 @@
+"""
+Module for embedding server and client tests.
+"""
+import threading
+import numpy as np
+import pytest
+import requests
+from src.arxiv_agent.ml.embedding_model_base import EmbeddingModel
+from src.arxiv_agent.ml.embedding_model_client import EmbeddingModelClient
+from src.arxiv_agent.ml.embedding_server import EmbeddingServer, MicroBatcher
+
+
+class FakeModel(EmbeddingModel):
+    """Embeds a text as [length, number of words], recording the batches."""
+
+    def __init__(self):
+        self.batches = []
+
+    def encode(self, text):
+        return self.encode_array([text])[0].tolist()
+
+    def encode_batch(self, texts, batch_size=32):
+        return self.encode_array(texts, batch_size).tolist()
+
+    def encode_array(self, texts, batch_size=32):
+        self.batches.append(list(texts))
+        return np.array([[len(text), len(text.split())] for text in texts], dtype=np.float32)
+
+
+@pytest.fixture
+def server():
+    server = EmbeddingServer(MicroBatcher(FakeModel(), max_wait_ms=200), 'fake-model', port=0)
+    server.start()
+    yield server
+    server.shutdown()
+
+
+def test_concurrent_requests_are_batched():
+    model = FakeModel()
+    batcher = MicroBatcher(model, max_batch_texts=100, max_wait_ms=200)
+    texts = [f"text number {i}" for i in range(8)]
+    futures = [batcher.submit([text]) for text in texts]
+    assert [future.result()[0].tolist() for future in futures] == [[len(text), 3] for text in texts]
+    assert model.batches == [texts]
+
+    metrics = batcher.metrics()
+    assert metrics['requests'] == 8
+    assert metrics['batches'] == 1
+    assert metrics['mean_batch_texts'] == 8
+    batcher.close()
+
+
+def test_batch_limit():
+    model = FakeModel()
+    batcher = MicroBatcher(model, max_batch_texts=3, max_wait_ms=200)
+    futures = [batcher.submit(['a', 'b']) for _ in range(3)]
+    for future in futures:
+        future.result()
+    # The first batch closes when it reaches the limit
+    assert [len(batch) for batch in model.batches] == [4, 2]
+    batcher.close()
+
+
+def test_client(server, monkeypatch):
+    monkeypatch.setenv('APP_NAME', 'arxiv_parser')
+    monkeypatch.setenv('ENV', 'dev')
+    client = EmbeddingModelClient(url=server.url)
+    assert client.model_name == 'fake-model'
+    assert requests.get(f"{server.url}/health").json() == {'model_name': 'fake-model', 'dimensions': 2}
+    assert client.encode("two words") == [9, 2]
+
+    results = {}
+    threads = [threading.Thread(target=lambda i=i: results.update({i: client.encode_array(['x' * i])}))
+               for i in range(1, 5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert {i: embeddings.tolist() for i, embeddings in results.items()} == {i: [[i, 1]] for i in range(1, 5)}
+    assert client.encode_array([]).shape == (0, 0)
+    # The texts of the clients and the probe text of /health
+    assert client.metrics()['texts'] == 6
+
+    response = requests.post(f"{server.url}/embed", json={'texts': 'not a list'})
+    assert response.status_code == 400
@@ -0,0 +1,61 @@
+"""
+Module for model registry tests.
+"""
+import threading
+import time
+import pytest
+from src.arxiv_agent.ml.model_registry import ModelRegistry
+
+
+def test_get_shares_instances():
+    registry = ModelRegistry()
+    loads = []
+
+    def load():
+        loads.append(1)
+        return object()
+
+    model = registry.get(('embedding', 'a'), load)
+    assert registry.get(('embedding', 'a'), load) is model
+    assert registry.get(('embedding', 'b'), load) is not model
+    assert len(loads) == 2
+    assert registry.loaded() == [('embedding', 'a'), ('embedding', 'b')]
+
+
+def test_concurrent_first_use_loads_once():
+    registry = ModelRegistry()
+    loads = []
+
+    def load():
+        loads.append(1)
+        time.sleep(0.05)
+        return object()
+
+    models = []
+    threads = [threading.Thread(target=lambda: models.append(registry.get('model', load))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(loads) == 1
+    assert all(model is models[0] for model in models)
+
+
+def test_failed_load_is_retried():
+    registry = ModelRegistry()
+
+    def fail():
+        raise OSError("no model")
+
+    with pytest.raises(OSError):
+        registry.get('model', fail)
+    # Preload failures are logged only
+    registry.preload('model', fail).join()
+    assert registry.loaded() == []
+    assert registry.get('model', lambda: 'loaded') == 'loaded'
+
+
+def test_preload():
+    registry = ModelRegistry()
+    registry.preload('model', lambda: 'loaded').join()
+    assert registry.get('model', lambda: pytest.fail("loaded twice")) == 'loaded'
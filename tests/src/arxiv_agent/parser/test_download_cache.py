@@ -0,0 +1,149 @@
+"""
+Module for download cache tests.
+"""
+import io
+import threading
+import pytest
+from src.arxiv_agent.parser.base import ArxivBase, ParserException
+from src.arxiv_agent.parser.download_cache import DownloadCache
+
+
+@pytest.fixture
+def make_cache(tmp_path):
+    caches = []
+
+    def make(max_size_bytes=1024 * 1024, offline=False):
+        cache = DownloadCache(tmp_path / DownloadCache.DIRNAME, max_size_bytes, offline)
+        caches.append(cache)
+        return cache
+
+    yield make
+    for cache in caches:
+        cache.close()
+
+
+def test_split_version():
+    assert DownloadCache.split_version('2402.12345v2') == ('2402.12345', 'v2')
+    assert DownloadCache.split_version('2402.12345') == ('2402.12345', '')
+    assert DownloadCache.split_version('solv-int/9901001v1') == ('solv-int/9901001', 'v1')
+    assert DownloadCache.split_version('solv-int/9901001') == ('solv-int/9901001', '')
+
+
+def test_put_open(make_cache):
+    cache = make_cache()
+    assert cache.open('2402.12345v1', 'tex') is None
+    cache.put('2402.12345v1', 'tex', b'tex source')
+    with cache.open('2402.12345v1', 'tex') as f:
+        assert f.read() == b'tex source'
+    # Keyed by version and format
+    assert cache.open('2402.12345v2', 'tex') is None
+    assert cache.open('2402.12345v1', 'pdf') is None
+    assert (cache.hits, cache.misses) == (1, 3)
+
+
+def test_put_file_keeps_position(make_cache):
+    cache = make_cache()
+    source = io.BytesIO(b'headerbody')
+    source.seek(6)
+    cache.put_file('2402.12345v1', 'pdf', source)
+    assert source.tell() == 6
+    with cache.open('2402.12345v1', 'pdf') as f:
+        assert f.read() == b'body'
+
+
+def test_identical_downloads_stored_once(make_cache):
+    cache = make_cache()
+    cache.put('2402.12345v1', 'tex', b'same bytes')
+    cache.put('2402.12345v2', 'tex', b'same bytes')
+    assert cache.size() == len(b'same bytes')
+    assert len([path for path in cache.root.glob('*/*')]) == 1
+
+
+def test_lru_eviction(make_cache, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr('src.arxiv_agent.parser.download_cache.time.time', lambda: now[0])
+    cache = make_cache(max_size_bytes=300)
+
+    for i in range(3):
+        now[0] += 1
+        cache.put(f"2402.0000{i}v1", 'tex', bytes([i]) * 100)
+    # Reading the oldest entry makes the second one the least recently used
+    now[0] += 1
+    cache.open('2402.00000v1', 'tex').close()
+
+    now[0] += 1
+    cache.put('2402.00003v1', 'tex', b'x' * 100)
+    # Evicted down to the watermark of 270 bytes
+    assert cache.size() == 200
+    assert cache.open('2402.00001v1', 'tex') is None
+    assert cache.open('2402.00002v1', 'tex') is None
+    cache.open('2402.00000v1', 'tex').close()
+    cache.open('2402.00003v1', 'tex').close()
+
+
+def test_blob_removed_from_outside(make_cache):
+    cache = make_cache()
+    cache.put('2402.12345v1', 'tex', b'tex source')
+    for path in cache.root.glob('*/*'):
+        path.unlink()
+    assert cache.open('2402.12345v1', 'tex') is None
+    assert cache.misses == 1
+
+
+def test_counters_thread_safe(make_cache):
+    cache = make_cache()
+    cache.put('2402.12345v1', 'tex', b'tex source')
+
+    def read():
+        for _ in range(200):
+            f = cache.open('2402.12345v1', 'tex')
+            f.close()
+            cache.open('2402.99999v1', 'tex')
+
+    threads = [threading.Thread(target=read) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert (cache.hits, cache.misses) == (800, 800)
+
+
+class CachedLister(ArxivBase):
+    def __init__(self, cache, transport):
+        super().__init__(transport, cache)
+
+    def download(self, arxiv_id):
+        return self._download(arxiv_id, 'tex', f"https://arxiv.org/e-print/{arxiv_id}")
+
+    def parse(self, data):
+        raise NotImplementedError
+
+
+class CountingTransport:
+    def __init__(self):
+        self.urls = []
+
+    def download(self, url):
+        self.urls.append(url)
+        return io.BytesIO(b'downloaded')
+
+
+def test_download_through_cache(make_cache):
+    transport = CountingTransport()
+    parser = CachedLister(make_cache(), transport)
+    for _ in range(2):
+        with parser.download('2402.12345v1') as f:
+            assert f.read() == b'downloaded'
+    assert transport.urls == ['https://arxiv.org/e-print/2402.12345v1']
+
+
+def test_offline(make_cache):
+    make_cache().put('2402.12345v1', 'tex', b'cached')
+    transport = CountingTransport()
+    parser = CachedLister(make_cache(offline=True), transport)
+
+    with parser.download('2402.12345v1') as f:
+        assert f.read() == b'cached'
+    with pytest.raises(ParserException, match="offline"):
+        parser.download('2402.54321v1')
+    assert transport.urls == []
@@ -0,0 +1,134 @@
+"""
+Module for ArXiv API listing tests, run against canned Atom feeds.
+"""
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlparse
+import pytest
+from src.arxiv_agent.parser.base import ArxivBase, ParserException
+
+FEED = """<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom" xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/">
+<opensearch:totalResults>{total}</opensearch:totalResults>
+{entries}
+</feed>"""
+
+ENTRY = """<entry>
+<id>http://arxiv.org/abs/{id}</id>
+<published>2024-02-08T10:00:00Z</published>
+<title>A paper
+ about {id}</title>
+<summary>  Abstract of {id}.
+</summary>
+<author><name>Namkyeong Lee</name></author>
+<author><name>Ada Lovelace</name></author>
+<category term="cs.AI"/>
+<category term="cs.LG"/>
+</entry>"""
+
+
+def feed(ids, total):
+    return FEED.format(total=total, entries=''.join(ENTRY.format(id=arxiv_id) for arxiv_id in ids)).encode()
+
+
+class CannedTransport:
+    """Transport answering the requests with the next canned feed and recording the query parameters."""
+
+    def __init__(self, pages):
+        self.pages = list(pages)
+        self.queries = []
+
+    def get(self, url):
+        self.queries.append({key: values[0] for key, values in parse_qs(urlparse(url).query).items()})
+        return SimpleNamespace(content=self.pages.pop(0))
+
+
+class Lister(ArxivBase):
+    RESULTS_PER_REQUEST = 2
+
+    def download(self, arxiv_id):
+        raise NotImplementedError
+
+    def parse(self, data):
+        raise NotImplementedError
+
+
+START = datetime(2024, 2, 8, tzinfo=timezone.utc)
+END = datetime(2024, 2, 9, tzinfo=timezone.utc)
+
+
+def test_query():
+    transport = CannedTransport([feed(['2402.00001v1'], total=1)])
+    papers = list(Lister(transport, cache=None).list_papers(['cs.LG', 'cs.AI', 'cs.LG'], START, END))
+
+    assert len(transport.queries) == 1
+    query = transport.queries[0]
+    # Every category once, OR'd in one query, with an inclusive minute window ending before END
+    assert query['search_query'] == "(cat:cs.AI OR cat:cs.LG) AND submittedDate:[202402080000 TO 202402082359]"
+    assert query['sortBy'] == 'submittedDate'
+    assert query['sortOrder'] == 'ascending'
+    assert papers == [{
+        'arxiv_id': '2402.00001v1',
+        'title': 'A paper\n about 2402.00001v1',
+        'authors': ['Namkyeong Lee', 'Ada Lovelace'],
+        'published': '2024-02-08T10:00:00Z',
+        'abstract': 'Abstract of 2402.00001v1.',
+        'categories': ['cs.AI', 'cs.LG'],
+    }]
+
+
+def test_single_category_query():
+    transport = CannedTransport([feed([], total=0)])
+    start = datetime(2024, 2, 8, 6, 30, tzinfo=timezone.utc)
+    assert list(Lister(transport, cache=None).list_papers(['cs.AI'], start, END)) == []
+    assert transport.queries[0]['search_query'] == "cat:cs.AI AND submittedDate:[202402080630 TO 202402082359]"
+
+
+def test_pagination_stops_at_total():
+    transport = CannedTransport([
+        feed(['2402.00001v1', '2402.00002v1'], total=5),
+        feed(['2402.00003v1', '2402.00004v1'], total=5),
+        feed(['2402.00005v1'], total=5),
+    ])
+    papers = list(Lister(transport, cache=None).list_papers(['cs.AI'], START, END))
+
+    assert [paper['arxiv_id'] for paper in papers] == [f"2402.0000{i}v1" for i in range(1, 6)]
+    assert [query['start'] for query in transport.queries] == ['0', '2', '4']
+    assert all(query['max_results'] == '2' for query in transport.queries)
+
+
+def test_pagination_stops_at_empty_page():
+    transport = CannedTransport([
+        feed(['2402.00001v1', '2402.00002v1'], total=10),
+        feed([], total=10),
+    ])
+    papers = list(Lister(transport, cache=None).list_papers(['cs.AI'], START, END))
+
+    assert len(papers) == 2
+    assert len(transport.queries) == 2
+
+
+def test_window_over_query_limit_split():
+    transport = CannedTransport([
+        feed([], total=30001),
+        feed(['2402.00001v1'], total=1),
+        feed(['2402.00002v1', '2402.00003v1'], total=2),
+    ])
+    papers = list(Lister(transport, cache=None).list_papers(['cs.AI'], START, END))
+
+    assert [paper['arxiv_id'] for paper in papers] == ['2402.00001v1', '2402.00002v1', '2402.00003v1']
+    assert [query['search_query'] for query in transport.queries] == [
+        "cat:cs.AI AND submittedDate:[202402080000 TO 202402082359]",
+        "cat:cs.AI AND submittedDate:[202402080000 TO 202402081159]",
+        "cat:cs.AI AND submittedDate:[202402081200 TO 202402082359]",
+    ]
+
+
+def test_minute_over_query_limit_raises():
+    class LimitedLister(Lister):
+        MAX_QUERY_RESULTS = 3
+
+    transport = CannedTransport([feed([], total=10)])
+    end = datetime(2024, 2, 8, 0, 1, tzinfo=timezone.utc)
+    with pytest.raises(ParserException, match="over the 3"):
+        list(LimitedLister(transport, cache=None).list_papers(['cs.AI'], START, end))
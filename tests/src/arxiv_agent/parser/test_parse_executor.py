@@ -0,0 +1,75 @@
+"""
+Module for parse executor tests.
+"""
+import os
+import time
+import pytest
+from src.arxiv_agent.parser.base import ParserException
+from src.arxiv_agent.parser.parse_executor import ParseExecutor
+
+
+class StubParser:
+    """Parser whose behaviour is chosen by the source: sleep, allocate, exit, or return the source as text."""
+
+    def parse(self, fmt, data):
+        if data == b'sleep':
+            time.sleep(60)
+        elif data == b'allocate':
+            return {'success': True, 'main_text': str(len(bytearray(1024 * 1024 * 1024)))}
+        elif data == b'exit':
+            os._exit(3)
+        return {'success': True, 'main_text': data.decode()}
+
+
+@pytest.fixture
+def make_executor(monkeypatch):
+    monkeypatch.setenv('APP_NAME', 'arxiv_parser')
+    monkeypatch.setenv('ENV', 'dev')
+    executors = []
+
+    def make(**kwargs):
+        executor = ParseExecutor(processes=1, parser_factory=StubParser, **kwargs)
+        executors.append(executor)
+        return executor
+
+    yield make
+    for executor in executors:
+        executor.close()
+
+
+def test_parse(make_executor):
+    executor = make_executor()
+    assert executor.parse('tex', b'text')['main_text'] == 'text'
+    assert executor.parse('tex', b'more text')['main_text'] == 'more text'
+
+
+def test_timeout(make_executor):
+    executor = make_executor(task_timeout=0.5)
+    started = time.monotonic()
+    with pytest.raises(ParserException, match="timed out"):
+        executor.parse('tex', b'sleep')
+    assert time.monotonic() - started < 10
+    # The killed worker is replaced
+    assert executor.parse('tex', b'text')['main_text'] == 'text'
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="RLIMIT_AS is not available")
+def test_memory_limit(make_executor):
+    executor = make_executor(memory_limit_mb=64)
+    with pytest.raises(ParserException, match="memory limit|died"):
+        executor.parse('tex', b'allocate')
+    assert executor.parse('tex', b'text')['main_text'] == 'text'
+
+
+def test_recovers_from_dead_worker(make_executor):
+    executor = make_executor()
+    assert executor.parse('tex', b'first')['main_text'] == 'first'
+    with pytest.raises(ParserException, match="exit code 3"):
+        executor.parse('tex', b'exit')
+    assert executor.parse('tex', b'text')['main_text'] == 'text'
+
+
+def test_worker_replaced_after_max_tasks(make_executor):
+    executor = make_executor(max_tasks_per_worker=2)
+    for i in range(5):
+        assert executor.parse('tex', f"text {i}".encode())['main_text'] == f"text {i}"
@@ -0,0 +1,126 @@
+"""
+Module for format detection and routing tests, run with in-memory sources.
+"""
+import gzip
+import io
+import tarfile
+import pytest
+from src.arxiv_agent.parser.base import ParserException
+from src.arxiv_agent.parser.parser import ArxivParser
+
+TEX = b"\\documentclass{article}\n\\begin{document}\nHello\n\\end{document}\n"
+PDF = b"%PDF-1.5\n%\xe2\xe3\xcf\xd3\n1 0 obj\n<< /Type /Catalog >>\nendobj\n"
+HTML = b"<!DOCTYPE html>\n<html lang=\"en\"><head><title>Paper</title></head></html>"
+
+
+def tar_gz(files):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode='w:gz') as tar:
+        for name, data in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize('data, fmt', [
+    (tar_gz({'main.tex': TEX, 'figure.pdf': PDF}), 'tex'),
+    (gzip.compress(TEX), 'tex'),
+    (TEX, 'tex'),
+    (PDF, 'pdf'),
+    (b"\n  " + PDF, 'pdf'),
+    (HTML, 'html'),
+])
+def test_detect_format(data, fmt):
+    assert ArxivParser.detect_format(data) == fmt
+    f = io.BytesIO(data)
+    f.seek(5)
+    assert ArxivParser.detect_format(f) == fmt
+    # Left at the start for the parser
+    assert f.tell() == 0
+
+
+class StubSource:
+    """Parser of one format serving an in-memory download and succeeding or failing to parse."""
+
+    def __init__(self, name, data, success=True, error=None):
+        self.name = name
+        self.data = data
+        self.success = success
+        self.error = error
+        self.downloads = []
+
+    def download(self, arxiv_id):
+        self.downloads.append(arxiv_id)
+        if self.data is None:
+            raise ParserException(f"{self.name} download failed")
+        return io.BytesIO(self.data)
+
+    def parse(self, data):
+        if self.error:
+            raise ParserException(self.error)
+        return {'success': self.success, 'format': self.name, 'main_text': f"text from {self.name}"}
+
+
+def make_parser(eprint, pdf, html):
+    parser = ArxivParser()
+    parser.tex_parser = parser.parsers['tex'] = eprint
+    parser.parsers['pdf'] = pdf
+    parser.parsers['html'] = html
+    return parser
+
+
+def test_eprint_tex():
+    parser = make_parser(StubSource('tex', tar_gz({'main.tex': TEX})), StubSource('pdf', PDF), StubSource('html', HTML))
+    assert parser.extract_paper_text('2402.12345v1')['format'] == 'tex'
+    stats = parser.stats
+    assert stats.downloads == {'eprint': 1}
+    assert stats.parsed == {'tex': 1}
+    assert stats.fallbacks == 0
+
+
+def test_pdf_from_eprint_is_not_downloaded_again():
+    pdf = StubSource('pdf', PDF, error="No text in PDF")
+    html = StubSource('html', HTML)
+    parser = make_parser(StubSource('tex', PDF), pdf, html)
+
+    result = parser.extract_paper_text('2402.12345v1')
+    assert result['format'] == 'html'
+    # The PDF served by the e-print endpoint failed, so the PDF source is skipped
+    assert pdf.downloads == []
+    stats = parser.stats
+    assert stats.downloads == {'eprint': 1, 'html': 1}
+    assert stats.pdf_from_eprint == 1
+    assert stats.failed == {'pdf': 1}
+    assert stats.parsed == {'html': 1}
+    assert stats.fallbacks == 1
+    # The working source is used first from now on, for every version of the paper
+    assert parser.route('2402.12345v2') == ['html', 'eprint', 'pdf']
+
+
+def test_fallback_chain():
+    parser = make_parser(StubSource('tex', TEX, success=False), StubSource('pdf', None), StubSource('html', HTML))
+    assert parser.extract_paper_text('2402.12345v1')['format'] == 'html'
+    stats = parser.stats
+    assert stats.downloads == {'eprint': 1, 'pdf': 1, 'html': 1}
+    assert stats.failed == {'tex': 1}
+    assert stats.fallbacks == 2
+
+
+def test_tried_formats_skip_sources():
+    html = StubSource('html', HTML)
+    parser = make_parser(StubSource('tex', TEX), StubSource('pdf', PDF), html)
+    result = parser.extract_paper_text('2402.12345v1', sources=['pdf', 'html'], tried_formats=['pdf'])
+    assert result['format'] == 'html'
+    assert parser.stats.downloads == {'html': 1}
+    assert parser.stats.fallbacks == 1
+
+
+def test_all_sources_fail():
+    parser = make_parser(StubSource('tex', TEX, error="Broken TeX"), StubSource('pdf', None),
+                         StubSource('html', HTML, success=False))
+    with pytest.raises(ParserException, match="All parsers failed for 2402.12345v1: EPRINT parsing failed: Broken TeX"):
+        parser.extract_paper_text('2402.12345v1')
+    stats = parser.stats
+    assert stats.failed == {'tex': 1, 'html': 1}
+    assert stats.parsed == {}
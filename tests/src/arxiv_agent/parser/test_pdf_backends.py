@@ -0,0 +1,122 @@
+"""
+Module for PDF backend selection and page range extraction tests, run with a stub backend.
+"""
+import logging
+import pytest
+from src.arxiv_agent.parser import pdf_backends
+from src.arxiv_agent.parser.parse_executor import ParseExecutor
+from src.arxiv_agent.parser.pdf_backends import PDFBackend, PdfminerBackend, PypdfBackend, PyMuPDFBackend
+from src.arxiv_agent.parser.pdf_parser import ArxivPDFParser
+
+
+class StubBackend(PDFBackend):
+    """Backend of fake PDFs whose content is their page count, e.g. b'%PDF 20'."""
+
+    name = 'stub'
+
+    def page_count(self, f, path=None):
+        return int(f.read().split()[1])
+
+    def extract(self, f, path=None, start=0, end=None):
+        end = self.page_count(f) if end is None else end
+        return ''.join(f"Page {i}\n\f" for i in range(start, end))
+
+
+class StubParser:
+    """Parser of the parse workers, extracting PDFs with the stub backend."""
+
+    def __init__(self):
+        self.pdf_parser = ArxivPDFParser(backend=StubBackend(), cache=None)
+
+    def parse(self, fmt, data):
+        return self.pdf_parser.parse(data)
+
+
+def test_page_ranges():
+    assert ArxivPDFParser.page_ranges(20, 8) == [range(0, 8), range(8, 16), range(16, 20)]
+    assert ArxivPDFParser.page_ranges(8, 8) == [range(0, 8)]
+    assert ArxivPDFParser.page_ranges(0, 8) == []
+
+
+def test_parse_max_pages():
+    parser = ArxivPDFParser(backend=StubBackend(), max_pages=3, cache=None)
+    content = parser.parse(b'%PDF 20')
+    assert content['format'] == 'pdf'
+    assert content['main_text'] == 'Page 0\n\fPage 1\n\fPage 2\n\f'
+    assert parser.page_count(b'%PDF 20') == 20
+
+
+@pytest.fixture
+def make_executor(monkeypatch):
+    monkeypatch.setenv('APP_NAME', 'arxiv_parser')
+    monkeypatch.setenv('ENV', 'dev')
+    executors = []
+
+    def make(**kwargs):
+        executor = ParseExecutor(parser_factory=StubParser, **kwargs)
+        executors.append(executor)
+        return executor
+
+    yield make
+    for executor in executors:
+        executor.close()
+
+
+def test_split_pdf_merged_in_page_order(make_executor):
+    executor = make_executor(processes=3, pdf_pages_per_task=4)
+    content = executor.parse('pdf', b'%PDF 18')
+    assert content['main_text'] == ''.join(f"Page {i}\n\f" for i in range(18))
+    assert content['success']
+
+
+def test_short_pdf_not_split(make_executor):
+    executor = make_executor(processes=2, pdf_pages_per_task=8)
+    assert executor.parse('pdf', b'%PDF 5')['main_text'] == ''.join(f"Page {i}\n\f" for i in range(5))
+
+
+@pytest.fixture
+def installed(monkeypatch):
+    """Choose which backends are installed."""
+    monkeypatch.setattr(pdf_backends, '_logged_choices', set())
+
+    def install(*names):
+        for backend in (PyMuPDFBackend, PypdfBackend, PdfminerBackend):
+            monkeypatch.setattr(backend, 'available', classmethod(lambda cls, names=names: cls.name in names))
+
+    return install
+
+
+def test_auto_prefers_first_installed(installed, caplog):
+    installed('pypdf', 'pdfminer')
+    with caplog.at_level(logging.INFO, logger=pdf_backends.__name__):
+        assert isinstance(pdf_backends.get_pdf_backend('auto'), PypdfBackend)
+        assert isinstance(pdf_backends.get_pdf_backend('auto'), PypdfBackend)
+    # The choice is logged once
+    messages = [record.message for record in caplog.records if 'Extracting PDF text' in record.message]
+    assert messages == ["Extracting PDF text with pypdf, the first installed of pymupdf, pypdf, pdfminer"]
+
+
+def test_auto_order(installed):
+    installed('pymupdf', 'pypdf', 'pdfminer')
+    assert isinstance(pdf_backends.get_pdf_backend('auto', ['pdfminer', 'pymupdf']), PdfminerBackend)
+    with pytest.raises(ValueError, match="Unknown PDF backend"):
+        pdf_backends.get_pdf_backend('auto', ['pdfbox', 'pdfminer'])
+
+    installed('pdfminer')
+    with pytest.raises(ValueError, match="None of the PDF backends"):
+        pdf_backends.get_pdf_backend('auto', ['pymupdf', 'pypdf'])
+
+
+def test_pinned_backend(installed):
+    installed('pdfminer')
+    assert isinstance(pdf_backends.get_pdf_backend('pdfminer'), PdfminerBackend)
+    with pytest.raises(ValueError, match="not installed"):
+        pdf_backends.get_pdf_backend('pymupdf')
+    with pytest.raises(ValueError, match="Unknown PDF backend"):
+        pdf_backends.get_pdf_backend('pdfbox')
+
+
+def test_parser_uses_configured_order(installed, monkeypatch):
+    installed('pypdf', 'pdfminer')
+    monkeypatch.setattr(ArxivPDFParser, '_conf', lambda self: {'backend': 'auto', 'auto_order': ['pdfminer', 'pypdf']})
+    assert isinstance(ArxivPDFParser(cache=None).backend, PdfminerBackend)
@@ -0,0 +1,114 @@
+"""
+Module for spool file and streamed download tests.
+"""
+import os
+import pytest
+import requests
+from src.arxiv_agent.parser.spool import SpoolFile
+from src.arxiv_agent.parser.transport import ArxivTransport, DownloadTooLargeError
+
+
+def test_in_memory(tmp_path):
+    with SpoolFile(max_memory=10, dir=str(tmp_path)) as spool:
+        spool.write(b'0123456789')
+        assert spool.path is None
+        spool.seek(0)
+        assert spool.read() == b'0123456789'
+    assert os.listdir(tmp_path) == []
+
+
+def test_rollover(tmp_path):
+    spool = SpoolFile(max_memory=10, dir=str(tmp_path))
+    spool.write(b'01234')
+    spool.write(b'56789a')
+    # Moved to disk once over the limit, keeping the content and the position
+    assert spool.path is not None
+    assert os.path.dirname(spool.path) == str(tmp_path)
+    assert spool.tell() == 11
+    spool.write(b'bc')
+    spool.seek(0)
+    assert spool.read() == b'0123456789abc'
+    with open(spool.path, 'rb') as f:
+        assert f.read() == b'0123456789abc'
+
+    path = spool.path
+    spool.close()
+    assert not os.path.exists(path)
+
+
+def test_rollover_failure_removes_file(tmp_path, monkeypatch):
+    spool = SpoolFile(max_memory=4, dir=str(tmp_path))
+    spool.write(b'0123')
+
+    def fail(*args):
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr('tempfile._TemporaryFileWrapper.seek', fail, raising=False)
+    with pytest.raises(OSError):
+        spool.write(b'4')
+    assert os.listdir(tmp_path) == []
+
+
+class StreamedResponse:
+    """Response streaming a body in chunks."""
+
+    def __init__(self, chunks, headers=None):
+        self.chunks = chunks
+        self.headers = headers or {}
+        self.ok = True
+        self.url = 'https://arxiv.org/e-print/2402.12345v1'
+        self.closed = False
+
+    def iter_content(self, chunk_size):
+        yield from self.chunks
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def transport(tmp_path, monkeypatch):
+    monkeypatch.setenv('APP_NAME', 'arxiv_parser')
+    monkeypatch.setenv('ENV', 'dev')
+    transport = ArxivTransport(spool_dir=str(tmp_path))
+    transport.spool_memory_bytes = 8
+    transport.max_download_bytes = 32
+    return transport
+
+
+def test_spool_download(tmp_path, transport):
+    response = StreamedResponse([b'0123456789', b'0123456789'])
+    spool, size = transport._spool(response)
+    assert size == 20
+    assert response.closed
+    assert spool.path is not None
+    assert spool.read() == b'0123456789' * 2
+    spool.close()
+    assert os.listdir(tmp_path) == []
+
+
+def test_size_cap_from_header(tmp_path, transport):
+    response = StreamedResponse([b'never read'], headers={'Content-Length': '33'})
+    with pytest.raises(DownloadTooLargeError):
+        transport._spool(response)
+    assert response.closed
+
+
+def test_size_cap_while_streaming(tmp_path, transport):
+    response = StreamedResponse([b'0123456789'] * 4)
+    with pytest.raises(DownloadTooLargeError):
+        transport._spool(response)
+    assert response.closed
+    # The spooled part is deleted
+    assert os.listdir(tmp_path) == []
+
+
+def test_stream_error_removes_file(tmp_path, transport):
+    def broken():
+        yield b'0123456789'
+        raise requests.exceptions.ChunkedEncodingError("Connection broken")
+
+    response = StreamedResponse(broken())
+    with pytest.raises(requests.exceptions.ChunkedEncodingError):
+        transport._spool(response)
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,125 @@
+"""
+Module for TeX to text conversion tests.
+"""
+import io
+import tarfile
+import time
+import pytest
+from src.arxiv_agent.parser.tex_parser import ArxivTexParser
+from src.arxiv_agent.parser.tex_to_text import tex_to_text, tokenize
+
+MAIN_TEX = r"""\documentclass{article}
+\usepackage{amsmath}
+\newcommand{\R}{\mathbb{R}}
+\begin{document}
+\begin{abstract}
+We study things~\cite{a}. % reviewer comment
+\end{abstract}
+\section{Introduction}\label{sec:intro}
+Text with $x^2$ math and \emph{emphasis}, costs 5\% more.
+\input{sections/method}
+\begin{figure}[t]
+\includegraphics[width=\linewidth]{fig.png}
+\caption{A \textbf{nice} figure.}
+\end{figure}
+\begin{equation}
+E = mc^2
+\end{equation}
+\bibliography{refs}
+\end{document}
+Text after the end of the document.
+"""
+
+METHOD_TEX = r"\section*{Method}Methods go here.\subsection[Short]{Long Title}"
+
+MAIN_BBL = r"""\begin{thebibliography}{9}
+\bibitem[A(2020)]{a} Author A. \newblock Paper one.
+\bibitem{b} Author B. Paper two.
+\end{thebibliography}
+"""
+
+
+@pytest.fixture
+def files():
+    return {
+        'paper/main.tex': MAIN_TEX,
+        'paper/sections/method.tex': METHOD_TEX,
+        'paper/main.bbl': MAIN_BBL,
+    }
+
+
+def test_structure(files):
+    content = tex_to_text(MAIN_TEX, files, 'paper/main.tex')
+    assert content['sections'] == ['Introduction', 'Method', 'Long Title']
+    assert content['figures'] == ['A nice figure.']
+    assert content['equations'] == ['E = mc^2']
+    assert content['bibliography'] == [['a', 'Author A. Paper one.'], ['b', 'Author B. Paper two.']]
+
+
+def test_main_text(files):
+    text = tex_to_text(MAIN_TEX, files, 'paper/main.tex')['main_text']
+    assert 'Text with math and emphasis, costs 5% more.' in text
+    assert 'Methods go here.' in text
+    for left_out in ('reviewer comment', 'x^2', 'mc^2', 'sec:intro', 'fig.png', 'mathbb', 'Paper one',
+                     'after the end'):
+        assert left_out not in text
+    assert text.split('\n\n')[:2] == ['We study things .', 'Introduction']
+
+
+def test_missing_input():
+    content = tex_to_text(MAIN_TEX)
+    assert content['sections'] == ['Introduction']
+    assert content['bibliography'] == []
+
+
+def test_recursive_input():
+    content = tex_to_text(r"\section{A}\input{main}", {'main.tex': r"\section{A}\input{main}"})
+    assert content['sections'] == ['A']
+
+
+@pytest.mark.parametrize('separator', [' ', '\t', '\n'])
+def test_unbraced_input(separator):
+    content = tex_to_text(f"Before \\input{separator}sections/method{separator}after.",
+                          {'sections/method.tex': 'Input.'})
+    assert content['main_text'] == 'Before Input. after.'
+
+
+def test_math_and_environments():
+    content = tex_to_text(r"A $$x$$ B \[y\] C \(z\) D \begin{align}w\end{align} E \begin{comment}c\end{comment} F")
+    assert content['main_text'] == 'A B C D E F'
+    assert content['equations'] == ['x', 'y', 'w']
+
+
+def test_unclosed_math():
+    content = tex_to_text(r"A \[ B $$ C \begin{equation} D \( E")
+    # Left as text, an unclosed environment like any other
+    assert content['main_text'] == 'A B C\n\nD E'
+
+
+@pytest.mark.parametrize('opener', ['\\[', '$$', '\\(', '\\begin{equation}', '\\begin{verbatim}'])
+def test_unclosed_openers_linear(opener):
+    source = f"{opener} text " * 50000
+    started = time.monotonic()
+    tokens = tokenize(source)
+    assert time.monotonic() - started < 5
+    assert ''.join(tokens) == source
+
+
+def test_tokens_concatenate():
+    source = r"\section{A} 5\% $x$ \\[2pt] \[y\] {\em b}~c" + "\\"
+    assert ''.join(tokenize(source)) == source
+
+
+def test_parse_archive(files):
+    archive = io.BytesIO()
+    with tarfile.open(fileobj=archive, mode='w:gz') as tar:
+        for name, source in [('paper/figure.png', 'not text'), *files.items()]:
+            data = source.encode('utf-8')
+            member = tarfile.TarInfo(name)
+            member.size = len(data)
+            tar.addfile(member, io.BytesIO(data))
+
+    content = ArxivTexParser(cache=None).parse(archive.getvalue())
+    assert content['success']
+    assert content['sections'] == ['Introduction', 'Method', 'Long Title']
+    assert len(content['bibliography']) == 2
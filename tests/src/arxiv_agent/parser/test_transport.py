@@ -0,0 +1,137 @@
+"""
+Module for transport tests, run with a fake clock and a fake session.
+"""
+import pytest
+import requests
+from src.arxiv_agent.parser.transport import ArxivTransport, TokenBucket
+
+
+class FakeClock:
+    """Clock that only advances when sleeping."""
+
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def make_bucket(rate, capacity):
+    clock = FakeClock()
+    return TokenBucket(rate, capacity, clock=clock, sleep=clock.sleep), clock
+
+
+def test_bucket_burst():
+    bucket, clock = make_bucket(rate=0.5, capacity=3)
+    assert [bucket.acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+    # Empty after the burst, the next token takes 1 / rate seconds
+    assert bucket.acquire() == pytest.approx(2.0)
+    assert clock.sleeps == [pytest.approx(2.0)]
+
+
+def test_bucket_refill_capped():
+    bucket, clock = make_bucket(rate=1.0, capacity=2)
+    bucket.acquire()
+    bucket.acquire()
+    clock.now += 60
+    # An idle minute refills only up to the capacity
+    assert [bucket.acquire() for _ in range(2)] == [0.0, 0.0]
+    assert bucket.acquire() == pytest.approx(1.0)
+
+
+def test_bucket_pause():
+    bucket, clock = make_bucket(rate=1.0, capacity=5)
+    bucket.pause(30)
+    # No tokens during the pause, and the bucket is empty after it
+    assert bucket.acquire() == pytest.approx(31.0)
+    assert clock.now == pytest.approx(131.0)
+    # A shorter pause does not shorten a running one
+    bucket.pause(10)
+    bucket.pause(2)
+    assert bucket.acquire() == pytest.approx(11.0)
+
+
+def response(status, headers=None, content=b''):
+    r = requests.Response()
+    r.status_code = status
+    r.headers.update(headers or {})
+    r._content = content
+    r._content_consumed = True
+    r.url = 'http://export.arxiv.org/api/query'
+    return r
+
+
+class FakeSession:
+    """Session returning canned responses in order."""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def get(self, url, timeout=None, stream=False):
+        self.calls += 1
+        r = self.responses.pop(0)
+        if isinstance(r, Exception):
+            raise r
+        return r
+
+
+@pytest.fixture
+def make_transport(monkeypatch):
+    monkeypatch.setenv('APP_NAME', 'arxiv_parser')
+    monkeypatch.setenv('ENV', 'dev')
+
+    def make(responses, max_retries=3):
+        transport = ArxivTransport(requests_per_second=1000, burst=1, max_retries=max_retries, backoff=10.0)
+        clock = FakeClock()
+        transport.limiter = TokenBucket(1000, 1, clock=clock, sleep=clock.sleep)
+        transport.session = FakeSession(responses)
+        return transport, clock
+
+    return make
+
+
+def test_retry_after(make_transport):
+    transport, clock = make_transport([response(503, {'Retry-After': '7'}), response(200, content=b'feed')])
+    assert transport.get('http://export.arxiv.org/api/query').content == b'feed'
+    # The limiter is paused for the time the server asked for
+    assert sum(clock.sleeps) == pytest.approx(7.0, abs=0.01)
+    stats = transport.stats
+    assert (stats.requests, stats.throttled, stats.retries) == (2, 1, 1)
+
+
+def test_exponential_backoff(make_transport):
+    transport, clock = make_transport([response(503), response(429), response(503), response(200, content=b'ok'),
+                                       response(503), response(200, content=b'ok')])
+    transport.get('http://export.arxiv.org/api/query')
+    assert [round(s) for s in clock.sleeps if s > 1] == [10, 20, 40]
+
+    # A successful response resets the backoff
+    clock.sleeps.clear()
+    transport.get('http://export.arxiv.org/api/query')
+    assert [round(s) for s in clock.sleeps if s > 1] == [10]
+
+
+def test_connection_error_retried(make_transport):
+    transport, clock = make_transport([requests.exceptions.ConnectionError("reset"), response(200, content=b'ok')])
+    assert transport.get('http://export.arxiv.org/api/query').content == b'ok'
+    assert transport.stats.retries == 1
+
+
+def test_gives_up_after_max_retries(make_transport):
+    transport, clock = make_transport([response(503)] * 3, max_retries=2)
+    with pytest.raises(requests.exceptions.HTTPError):
+        transport.get('http://export.arxiv.org/api/query')
+    assert transport.session.calls == 3
+
+
+def test_non_retryable_status(make_transport):
+    transport, clock = make_transport([response(404)])
+    with pytest.raises(requests.exceptions.HTTPError):
+        transport.get('http://export.arxiv.org/api/query')
+    assert transport.stats.retries == 0
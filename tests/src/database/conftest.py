@@ -0,0 +1,38 @@
+"""
+Fixtures of the database tests: a Qdrant client on an in-memory Qdrant holding seven articles.
+"""
+import threading
+import numpy as np
+import pytest
+from qdrant_client import QdrantClient
+from src.arxiv_agent.models.articles import Article
+from src.database.collection_settings import CollectionSettings
+from src.database.database_client_qdrant import DatabaseClientQdrant
+
+
+def make_article(i: int, **fields) -> Article:
+    return Article(**{
+        'arxiv_id': f'2402.{i:05d}v1', 'title': f'Title {i}', 'authors': ['Ada Lovelace'],
+        'published': '2024-02-01T00:00:00Z', 'abstract': 'x' * i, 'categories': ['cs.AI'], 'format': 'tex',
+        'sections': ['Introduction'], 'main_text': f'Main text of {i}', 'bibliography': [['ref', f'Reference {i}']],
+        'processed_at': '2024-02-01T00:00:00Z', **fields})
+
+
+@pytest.fixture
+def db_client(tmp_path):
+    # The client is set up without connecting to a Qdrant server
+    db_client = object.__new__(DatabaseClientQdrant)
+    db_client.conf = {'database': {'collection': 'articles', 'embedding_dimensions': 2},
+                      'articles': {'download_location': str(tmp_path / 'registry')}}
+    db_client._client = QdrantClient(":memory:")
+    db_client.collection_settings = CollectionSettings(hnsw_ef=64)
+    db_client.default_fields = DatabaseClientQdrant.DEFAULT_FIELDS
+    db_client._article_registry = None
+    db_client._pending_points = {}
+    db_client._pending_lock = threading.Lock()
+    db_client.chunk_collection = 'articles-chunks'
+    db_client._chunk_collection_checked = False
+    db_client._ensure_collection()
+    articles = [make_article(i) for i in range(1, 8)]
+    db_client.insert(articles, np.ones((len(articles), 2), dtype=np.float32))
+    return db_client
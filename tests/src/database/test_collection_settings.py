@@ -0,0 +1,55 @@
+"""
+Module for collection settings tests.
+"""
+import pytest
+from qdrant_client import models
+from src.database.collection_settings import CollectionSettings
+
+
+def test_defaults():
+    settings = CollectionSettings.from_config({})
+    assert settings == CollectionSettings()
+    assert settings.search_params() is None
+    assert settings.quantization_config() is None
+
+
+def test_from_config():
+    settings = CollectionSettings.from_config({
+        'hnsw': {'m': 32, 'ef_construct': 200, 'ef': 64},
+        'quantization': {'type': 'scalar', 'oversampling': 2.0},
+        'on_disk_vectors': True,
+        'optimizers': {'indexing_threshold': 10000},
+    })
+    kwargs = settings.create_collection_kwargs(768)
+    assert kwargs['vectors_config'] == models.VectorParams(size=768, distance=models.Distance.DOT, on_disk=True)
+    assert kwargs['hnsw_config'].m == 32
+    assert isinstance(kwargs['quantization_config'], models.ScalarQuantization)
+    assert kwargs['optimizers_config'].indexing_threshold == 10000
+    assert settings.optimizers_config(bulk=True).indexing_threshold == 0
+    assert settings.search_params() == models.SearchParams(
+        hnsw_ef=64, quantization=models.QuantizationSearchParams(rescore=True, oversampling=2.0))
+
+
+def test_indexing_restored_without_configured_threshold():
+    # Configurations without the threshold restore the documented default after a bulk load, not an empty diff
+    settings = CollectionSettings.from_config({'optimizers': {'memmap_threshold': 50000}})
+    assert settings.optimizers_config(bulk=True).indexing_threshold == 0
+    assert settings.optimizers_config().indexing_threshold == 20000
+
+
+def test_unknown_quantization():
+    with pytest.raises(ValueError):
+        CollectionSettings.from_config({'quantization': {'type': 'product'}})
+
+
+def test_update_collection_settings(db_client, monkeypatch):
+    updates = []
+    monkeypatch.setattr(db_client._client, 'update_collection', lambda **kwargs: updates.append(kwargs))
+    db_client.collection_settings = CollectionSettings(on_disk_vectors=True, on_disk_payload=True)
+    db_client.update_collection_settings()
+    update = updates[0]
+    assert update['collection_name'] == 'articles-v0'
+    # Quantisation is switched off explicitly, None would keep the current one
+    assert update['quantization_config'] == models.Disabled.DISABLED
+    assert update['vectors_config'] == {'': models.VectorParamsDiff(on_disk=True)}
+    assert update['collection_params'] == models.CollectionParamsDiff(on_disk_payload=True)
@@ -0,0 +1,49 @@
+"""
+Module for tests of article lookups by id.
+"""
+from qdrant_client import models
+from conftest import make_article
+
+
+def test_get_by_id(db_client):
+    assert db_client.get_by_id('2402.00003v1') == make_article(3)
+    assert db_client.get_by_id('2402.00003').arxiv_id == '2402.00003v1'
+    assert db_client.get_by_id('2402.00003v2') is None
+    assert db_client.get_by_id('2402.00099v1') is None
+
+
+def test_get_many(db_client):
+    articles = db_client.get_many(['2402.00002v1', '2402.00099v1', '2402.00005', '2402.00002v1'], fields=['title'])
+    assert [article and article.title for article in articles] == ['Title 2', None, 'Title 5', 'Title 2']
+    assert articles[0].loaded_fields == ('arxiv_id', 'title')
+    assert db_client.get_many([]) == []
+
+
+def test_get_many_falls_back_to_keyword_index(db_client):
+    # Old style ids have no point id of their own, they are found by the arxiv_id index
+    article = make_article(1, arxiv_id='hep-th/9901001v1')
+    db_client._client.upsert(collection_name='articles', points=models.Batch(
+        ids=[42], vectors=[[1.0, 1.0]], payloads=[article.model_dump(mode='json')]))
+    articles = db_client.get_many(['hep-th/9901001v1', '2402.00001v1'])
+    assert [article.arxiv_id for article in articles] == ['hep-th/9901001v1', '2402.00001v1']
+
+
+def test_get_many_falls_back_for_ids_without_version(db_client):
+    # An id without a version matches the stored versions, the latest one is returned
+    articles = [make_article(1, arxiv_id='hep-th/9901001v1'), make_article(2, arxiv_id='hep-th/9901001v2'),
+                make_article(3, arxiv_id='hep-th/9901002v1')]
+    db_client._client.upsert(collection_name='articles', points=models.Batch(
+        ids=[41, 42, 43], vectors=[[1.0, 1.0]] * 3, payloads=[article.model_dump(mode='json') for article in articles]))
+    found = db_client.get_many(['hep-th/9901001', 'hep-th/9901002', 'hep-th/9901003', 'hep-th/9901001v1'])
+    assert [article and article.arxiv_id for article in found] == \
+        ['hep-th/9901001v2', 'hep-th/9901002v1', None, 'hep-th/9901001v1']
+
+
+def test_keyword_index(db_client):
+    # Payload indexes are not kept by the in-memory Qdrant, so check what the collection is created with
+    calls = []
+    db_client._client.create_payload_index = lambda **kwargs: calls.append(kwargs)
+    db_client._client.create_collection = lambda **kwargs: None
+    db_client.create_collection('new', 2)
+    assert {call['field_name']: call['field_schema'] for call in calls}['arxiv_id'] == \
+        models.PayloadSchemaType.KEYWORD
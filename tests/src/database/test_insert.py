@@ -0,0 +1,62 @@
+"""
+Module for article and chunk write tests, run against an in-memory Qdrant, see conftest.py.
+"""
+from unittest.mock import MagicMock
+import numpy as np
+from qdrant_client import models
+from conftest import make_article
+from src.arxiv_agent.ml.chunking import Chunk
+
+
+def test_insert_ndarray(db_client, monkeypatch):
+    upserts = []
+    upsert = db_client._client.upsert
+    monkeypatch.setattr(db_client._client, 'upsert', lambda **kwargs: upserts.append(kwargs) or upsert(**kwargs))
+    embeddings = np.array([[0.6, 0.8], [1.0, 0.0]], dtype=np.float32)
+    db_client.insert([make_article(8), make_article(9)], embeddings)
+
+    # The whole batch is converted to JSON lists at once
+    points = upserts[0]['points']
+    assert isinstance(points, models.Batch)
+    assert all(type(vector) is list and type(vector[0]) is float for vector in points.vectors)
+    stored = db_client._client.retrieve('articles', ids=points.ids, with_vectors=True)
+    assert np.allclose([point.vector for point in stored], embeddings)
+
+
+def stale_chunks_filter(*counts):
+    return models.FilterSelector(filter=models.Filter(should=[
+        models.Filter(must=[
+            models.FieldCondition(key='parent_id', match=models.MatchValue(value=parent_id)),
+            models.FieldCondition(key='chunk_index', range=models.Range(gte=count)),
+        ])
+        for parent_id, count in counts
+    ]))
+
+
+def test_insert_chunks_replaces_earlier_chunks(db_client):
+    client = db_client._client = MagicMock()
+    db_client._chunk_collection_checked = True
+    chunks = [Chunk('2402.00001v2', 0, 'Introduction', 'first'), Chunk('2402.00001v2', 1, 'Method', 'second')]
+    db_client.insert_chunks(chunks, np.ones((2, 2), dtype=np.float32), arxiv_ids=['2402.00001v2', '2402.00002v1'])
+
+    upsert = client.upsert.call_args.kwargs
+    assert upsert['collection_name'] == 'articles-chunks'
+    assert upsert['points'].ids == [240200001000, 240200001001]
+    assert upsert['points'].payloads[1] == {'arxiv_id': '2402.00001v2', 'parent_id': 240200001, 'chunk_index': 1,
+                                            'section': 'Method', 'text': 'second'}
+    # Chunks past the new ones are stale, and every chunk of an article without chunks now
+    delete = client.delete.call_args.kwargs
+    assert delete['collection_name'] == 'articles-chunks'
+    assert delete['points_selector'] == stale_chunks_filter((240200001, 2), (240200002, 0))
+
+
+def test_insert_no_chunks_deletes_earlier_chunks(db_client):
+    client = db_client._client = MagicMock()
+    db_client._chunk_collection_checked = True
+    db_client.insert_chunks([], [], arxiv_ids=['2402.00003v1'])
+    client.upsert.assert_not_called()
+    assert client.delete.call_args.kwargs['points_selector'] == stale_chunks_filter((240200003, 0))
+
+    client.reset_mock()
+    db_client.insert_chunks([], [])
+    client.delete.assert_not_called()
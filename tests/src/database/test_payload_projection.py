@@ -0,0 +1,40 @@
+"""
+Module for tests of search and scroll payload projections and lazy loading of the other article fields.
+"""
+import json
+import numpy as np
+import pytest
+from conftest import make_article
+from src.arxiv_agent.models.lazy_article import LazyArticle
+
+
+def test_default_projection(db_client):
+    results = db_client.vector_search(np.array([1, 0], dtype=np.float32), limit=3)
+    article = results[0].article
+    assert isinstance(article, LazyArticle)
+    assert article.loaded_fields == db_client.DEFAULT_FIELDS
+    assert article.published.year == 2024
+    assert 'main_text' not in repr(article)
+
+
+def test_missing_fields_load_from_payload(db_client):
+    article = db_client.scroll(limit=1, fields=['title'])[0]
+    assert article.loaded_fields == ('arxiv_id', 'title')
+    number = int(article.arxiv_id[5:10])
+    assert article.main_text == f'Main text of {number}'
+    assert article.bibliography == [['ref', f'Reference {number}']]
+    assert article.to_article() == make_article(number)
+
+
+def test_missing_fields_load_from_registry(db_client):
+    article = db_client.scroll(limit=1)[0]
+    registered = make_article(int(article.arxiv_id[5:10]), main_text='Main text of the article.json')
+    article_dir = db_client.article_registry.create_article_dir(registered)
+    with open(article_dir / 'article.json', 'w', encoding='utf-8') as f:
+        json.dump(registered.model_dump(mode='json'), f)
+    assert article.main_text == 'Main text of the article.json'
+
+
+def test_unknown_field(db_client):
+    with pytest.raises(ValueError):
+        db_client.scroll(fields=['title', 'summary'])
@@ -0,0 +1,117 @@
+"""
+Module for reindex tests, run against an in-memory Qdrant, see conftest.py.
+"""
+import numpy as np
+import pytest
+from src.arxiv_agent.ml.embedding_model_base import EmbeddingModel
+from src.database.reindex import Reindexer
+from conftest import make_article
+
+
+class FakeModel(EmbeddingModel):
+    """Embeds a text as [length, 1, 0], failing after a number of batches if asked to."""
+
+    def __init__(self, fail_after=None):
+        self.fail_after = fail_after
+        self.batches = 0
+
+    def encode(self, text):
+        return self.encode_array([text])[0].tolist()
+
+    def encode_batch(self, texts, batch_size=32):
+        return self.encode_array(texts, batch_size).tolist()
+
+    def encode_array(self, texts, batch_size=32):
+        if self.fail_after is not None and self.batches >= self.fail_after:
+            raise RuntimeError("model crashed")
+        self.batches += 1
+        return np.array([[len(text), 1, 0] for text in texts], dtype=np.float32)
+
+
+@pytest.fixture(autouse=True)
+def no_catch_up_margin(monkeypatch):
+    # The fixture articles are written right before the reindex, a margin would copy them again
+    monkeypatch.setattr(Reindexer, 'CATCH_UP_MARGIN', 0.0)
+
+
+def test_reindex(db_client, tmp_path):
+    stats = Reindexer(db_client, FakeModel(), tmp_path / 'state', batch_size=3).reindex_articles()
+    assert (stats.source, stats.target, stats.points) == ('articles-v0', 'articles-v1', 7)
+    assert db_client.get_aliases() == {'articles': 'articles-v1'}
+    results = db_client.vector_search(np.array([1, 0, 0], dtype=np.float32), limit=2)
+    assert [result.article.arxiv_id for result in results] == ['2402.00007v1', '2402.00006v1']
+    assert list((tmp_path / 'state').iterdir()) == []
+    # The first version is kept for rollback too
+    assert db_client.list_collections() == ['articles-v0', 'articles-v1']
+
+    stats = Reindexer(db_client, FakeModel(), tmp_path).reindex_articles(delete_old=True)
+    assert (stats.source, stats.target) == ('articles-v1', 'articles-v2')
+    assert db_client.get_aliases() == {'articles': 'articles-v2'}
+    assert db_client.list_collections() == ['articles-v0', 'articles-v2']
+
+
+def test_resume(db_client, tmp_path):
+    with pytest.raises(RuntimeError):
+        Reindexer(db_client, FakeModel(fail_after=1), tmp_path, batch_size=3).reindex_articles()
+    # Searches still use the old collection
+    assert db_client.get_aliases() == {'articles': 'articles-v0'}
+    assert db_client.count_points('articles-v1') == 3
+
+    # Written during the reindex, before the scroll position, so only the catch-up copies it. It is caught up with by
+    # its write time, not by when it was parsed.
+    db_client.insert(make_article(0, abstract='new', processed_at='2020-01-01T00:00:00Z'), [1.0, 1.0])
+
+    model = FakeModel()
+    reindexer = Reindexer(db_client, model, tmp_path, batch_size=3)
+    stats = reindexer.reindex_articles(delete_old=True)
+    assert stats.points == 8
+    # Only the remaining pages are embedded, and the new article once more
+    assert model.batches == 3
+    assert db_client.count_points('articles') == 8
+
+
+def test_writes_while_indexing_caught_up(db_client, tmp_path):
+    reindexer = Reindexer(db_client, FakeModel(), tmp_path)
+    index = reindexer._index
+
+    def index_and_write(target):
+        index(target)
+        db_client.insert(make_article(3, abstract='updated'), [1.0, 1.0])
+
+    reindexer._index = index_and_write
+    stats = reindexer.reindex_articles()
+    assert stats.points == 8
+    assert db_client.get_by_id('2402.00003v1').abstract == 'updated'
+    assert db_client.count_points('articles') == 7
+
+
+def test_plain_collection(db_client, tmp_path):
+    db_client.create_collection('legacy', 2)
+    db_client.upsert_points('legacy', [1, 2], [[1.0, 0.0], [0.0, 1.0]], [{'abstract': 'a'}, {'abstract': 'bb'}])
+    reindexer = Reindexer(db_client, FakeModel(), tmp_path)
+    with pytest.raises(ValueError, match="plain collection"):
+        reindexer.reindex('legacy', 'abstract', db_client.create_collection)
+    assert 'legacy-v1' not in db_client.list_collections()
+
+    stats = reindexer.reindex('legacy', 'abstract', db_client.create_collection, replace_collection=True)
+    assert (stats.source, stats.target, stats.points) == ('legacy', 'legacy-v1', 2)
+    assert db_client.get_aliases()['legacy'] == 'legacy-v1'
+    assert db_client.count_points('legacy') == 2
+
+
+def test_writes_during_switch_caught_up(db_client, tmp_path):
+    reindexer = Reindexer(db_client, FakeModel(), tmp_path)
+    switch = reindexer._switch
+
+    def write_and_switch(name, source, target):
+        # Written into the old collection after the last catch-up
+        db_client.insert([make_article(4, abstract='late'), make_article(5, abstract='stale')], [[1.0, 1.0]] * 2)
+        switch(name, source, target)
+        # Written into the new collection after the switch, newer than the write into the old collection
+        db_client.insert(make_article(5, abstract='after the switch'), [1.0, 1.0, 0.0])
+
+    reindexer._switch = write_and_switch
+    stats = reindexer.reindex_articles()
+    assert stats.points == 8
+    assert db_client.get_by_id('2402.00004v1').abstract == 'late'
+    assert db_client.get_by_id('2402.00005v1').abstract == 'after the switch'
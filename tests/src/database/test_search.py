@@ -0,0 +1,82 @@
+"""
+Module for search tests, run against an in-memory Qdrant, see conftest.py.
+"""
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+from qdrant_client import models
+from src.arxiv_agent.ml import embedding_model_factory
+from src.arxiv_agent.ml.embedding_cache import QueryEmbeddingCache
+from src.arxiv_agent.ml.model_registry import ModelRegistry
+
+
+class CountingModel:
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, text):
+        self.encoded.append(text)
+        return [1.0, 0.0]
+
+
+def test_text_search_cached_query(db_client, monkeypatch):
+    model = CountingModel()
+    db_client.query_cache = QueryEmbeddingCache()
+    db_client.embedding_model_key = ('embedding', 'test_text_search_cached_query')
+    ModelRegistry.get_instance().get(db_client.embedding_model_key, lambda: model)
+
+    def read_config():
+        raise AssertionError("The configuration is read on a search")
+
+    monkeypatch.setattr(embedding_model_factory, 'embedding_model_key', read_config)
+    for _ in range(3):
+        assert len(db_client.text_search('graph networks', limit=2)) == 2
+    assert model.encoded == ['graph networks']
+
+
+def group(arxiv_id, *hits):
+    return SimpleNamespace(lookup=SimpleNamespace(payload={'arxiv_id': arxiv_id, 'title': f"Title of {arxiv_id}"}),
+                           hits=[SimpleNamespace(score=score, payload={'text': text}) for score, text in hits])
+
+
+def test_chunk_search(db_client):
+    client = db_client._client = MagicMock()
+    db_client._chunk_collection_checked = True
+    db_client.chunks_per_article = 3
+    client.query_points_groups.return_value = SimpleNamespace(groups=[
+        group('2402.00002v1', (0.9, 'best passage'), (0.7, 'second passage')),
+        # The article of a group can be gone from the article collection
+        SimpleNamespace(lookup=None, hits=[SimpleNamespace(score=0.8, payload={'text': 'orphan'})]),
+        group('2402.00001v1', (0.6, 'only passage')),
+    ])
+    results = db_client.chunk_search([1.0, 0.0], limit=2, fields=['title'])
+
+    kwargs = client.query_points_groups.call_args.kwargs
+    assert kwargs['collection_name'] == 'articles-chunks'
+    assert kwargs['group_by'] == 'parent_id'
+    assert kwargs['query'] == [1.0, 0.0]
+    assert (kwargs['limit'], kwargs['group_size']) == (2, 3)
+    assert kwargs['with_payload'] == ['text']
+    assert kwargs['with_lookup'] == models.WithLookup(collection='articles', with_payload=['arxiv_id', 'title'],
+                                                      with_vectors=False)
+    assert [(result.article.arxiv_id, result.score, result.passages) for result in results] == [
+        ('2402.00002v1', 0.9, ('best passage', 'second passage')),
+        ('2402.00001v1', 0.6, ('only passage',)),
+    ]
+    assert results[0].article.title == 'Title of 2402.00002v1'
+
+
+def test_text_search_full_text(db_client):
+    model = CountingModel()
+    db_client.query_cache = QueryEmbeddingCache()
+    db_client.embedding_model_key = ('embedding', 'test_text_search_full_text')
+    ModelRegistry.get_instance().get(db_client.embedding_model_key, lambda: model)
+    client = db_client._client = MagicMock()
+    db_client._chunk_collection_checked = True
+    db_client.chunks_per_article = 2
+    client.query_points_groups.return_value = SimpleNamespace(groups=[group('2402.00003v1', (0.5, 'passage'))])
+
+    results = db_client.text_search('graph networks', limit=1, full_text=True)
+    assert [result.passages for result in results] == [('passage',)]
+    kwargs = client.query_points_groups.call_args.kwargs
+    assert (kwargs['query'], kwargs['limit'], kwargs['group_size']) == ([1.0, 0.0], 1, 2)
+    client.query_points.assert_not_called()
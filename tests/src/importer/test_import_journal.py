@@ -0,0 +1,109 @@
+"""
+Module for import journal tests.
+"""
+import pytest
+from datetime import datetime, timezone
+from src.importer.journal import ImportJournal
+
+
+DAY = datetime(2024, 2, 8, tzinfo=timezone.utc)
+NEXT_DAY = datetime(2024, 2, 9, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = ImportJournal.for_registry_root(tmp_path)
+    yield journal
+    journal.close()
+
+
+def test_for_registry_root(tmp_path, journal):
+    assert journal.path == tmp_path / "import_journal.sqlite3"
+    assert journal.path.exists()
+
+
+def test_get_unknown(journal):
+    assert journal.get("2402.12345") is None
+    assert journal.get_state("2402.12345") is None
+
+
+def test_mark_progress(journal):
+    journal.mark("2402.12345", ImportJournal.LISTED, DAY)
+    assert journal.get_state("2402.12345") == ImportJournal.LISTED
+
+    journal.mark("2402.12345", ImportJournal.PARSED)
+    entry = journal.get("2402.12345")
+    assert entry['state'] == ImportJournal.PARSED
+    assert entry['day'] == "2024-02-08"
+
+
+def test_mark_many(journal):
+    journal.mark(["2402.00001", "2402.00002"], ImportJournal.EMBEDDED, DAY)
+    assert journal.get_state("2402.00001") == ImportJournal.EMBEDDED
+    assert journal.get_state("2402.00002") == ImportJournal.EMBEDDED
+
+
+def test_mark_requires_day_for_new_article(journal):
+    with pytest.raises(ValueError):
+        journal.mark("2402.12345", ImportJournal.FETCHED)
+
+
+def test_mark_unknown_state(journal):
+    with pytest.raises(ValueError):
+        journal.mark("2402.12345", "downloaded", DAY)
+
+
+def test_mark_failed_keeps_state(journal):
+    journal.mark("2402.12345", ImportJournal.FETCHED, DAY)
+    journal.mark_failed("2402.12345", "parse failed")
+    journal.mark_failed("2402.12345", "parse failed again")
+
+    entry = journal.get("2402.12345")
+    assert entry['state'] == ImportJournal.FETCHED
+    assert entry['attempts'] == 2
+    assert entry['error'] == "parse failed again"
+
+    # Progress clears the error but keeps the attempt count
+    journal.mark("2402.12345", ImportJournal.PARSED)
+    entry = journal.get("2402.12345")
+    assert entry['error'] is None
+    assert entry['attempts'] == 2
+
+
+def test_unfinished(journal):
+    journal.mark("2402.00001", ImportJournal.UPSERTED, DAY)
+    journal.mark("2402.00002", ImportJournal.PARSED, DAY)
+    journal.mark("2402.00003", ImportJournal.LISTED, DAY)
+    journal.mark("2402.00004", ImportJournal.LISTED, NEXT_DAY)
+    journal.mark("2402.00005", ImportJournal.METADATA_ONLY, DAY)
+    journal.mark_failed("2402.00003", "failed")
+
+    assert sorted(journal.unfinished(DAY)) == ["2402.00002", "2402.00003"]
+    assert journal.unfinished(DAY, max_attempts=1) == ["2402.00002"]
+    assert journal.unfinished(NEXT_DAY) == ["2402.00004"]
+
+
+def test_first_incomplete_day(journal):
+    assert journal.get_first_incomplete_day() is None
+
+    journal.start_day(DAY)
+    journal.start_day(NEXT_DAY)
+    assert journal.get_first_incomplete_day() == DAY
+
+    journal.complete_day(DAY)
+    assert journal.get_first_incomplete_day() == NEXT_DAY
+
+    journal.complete_day(NEXT_DAY)
+    assert journal.get_first_incomplete_day() is None
+
+
+def test_persistence(tmp_path):
+    journal = ImportJournal.for_registry_root(tmp_path)
+    journal.mark("2402.12345", ImportJournal.UPSERTED, DAY)
+    journal.start_day(DAY)
+    journal.close()
+
+    reopened = ImportJournal.for_registry_root(tmp_path)
+    assert reopened.get_state("2402.12345") == ImportJournal.UPSERTED
+    assert reopened.get_first_incomplete_day() == DAY
+    reopened.close()
@@ -0,0 +1,408 @@
+"""
+Module for import pipeline tests.
+"""
+import io
+import queue
+import threading
+import time
+import pytest
+from datetime import datetime, timedelta, timezone
+from src.article_registry import ArticleRegistry
+from src.arxiv_agent.ml.chunking import Chunk
+from src.arxiv_agent.ml.embedding_model_base import EmbeddingModel
+from src.arxiv_agent.parser.base import ParserException
+from src.arxiv_agent.parser.parser import ArxivParser
+from src.importer.journal import ImportJournal
+from src.importer.pipeline import _DONE, _BatchingStage, _Stage, ImportPipeline
+
+
+DAY = datetime(2024, 2, 8, tzinfo=timezone.utc)
+
+
+def paper(i):
+    return {
+        'arxiv_id': f"2402.{i:05d}v1",
+        'title': f"Title {i}",
+        'authors': ['Ada Lovelace'],
+        'published': '2024-02-08T10:00:00Z',
+        'abstract': f"Abstract of 2402.{i:05d}v1",
+        'categories': ['cs.AI'],
+    }
+
+
+class FakeParser:
+    """Parser listing papers from memory and recording the stages every paper goes through."""
+
+    build_paper_data = staticmethod(ArxivParser.build_paper_data)
+    write_paper_data = staticmethod(ArxivParser.write_paper_data)
+
+    def __init__(self, papers, events, failing=()):
+        self.papers = papers
+        self.events = events
+        self.failing = set(failing)
+
+    def list_papers(self, categories, start, end):
+        for p in self.papers:
+            self.events.append((p['arxiv_id'], 'listing'))
+            yield p
+
+    def remember_source(self, arxiv_id, source):
+        pass
+
+    def route(self, arxiv_id):
+        return ['eprint']
+
+    def fetch(self, arxiv_id, source):
+        self.events.append((arxiv_id, 'download'))
+        return 'tex', io.BytesIO(arxiv_id.encode())
+
+    def parse(self, fmt, data):
+        arxiv_id = data.read().decode()
+        self.events.append((arxiv_id, 'parse'))
+        if arxiv_id in self.failing:
+            raise ParserException(f"Broken source of {arxiv_id}")
+        return {'success': True, 'format': fmt, 'sections': [], 'main_text': f"Text of {arxiv_id}"}
+
+    def extract_paper_text(self, arxiv_id, sources=None, tried_formats=()):
+        raise ParserException(f"No other source for {arxiv_id}")
+
+
+class FakeModel(EmbeddingModel):
+    def __init__(self, events):
+        self.events = events
+
+    def encode(self, text):
+        return [float(len(text))]
+
+    def encode_batch(self, texts, batch_size=32):
+        self.events.extend((text.split()[-1], 'embed') for text in texts)
+        return [[float(len(text))] for text in texts]
+
+
+class FakeDatabase:
+    def __init__(self, events):
+        self.events = events
+        self.batches = []
+
+    def insert(self, articles, embeddings, wait=True):
+        assert embeddings.shape == (len(articles), 1)
+        self.events.extend((article.arxiv_id, 'upsert') for article in articles)
+        self.batches.append([article.arxiv_id for article in articles])
+
+    def wait_for_pending_updates(self):
+        pass
+
+
+@pytest.fixture
+def make_pipeline(tmp_path, monkeypatch):
+    monkeypatch.setenv('APP_NAME', 'arxiv_parser')
+    monkeypatch.setenv('ENV', 'dev')
+    journals = []
+
+    def make(papers, events, failing=(), db=None, **kwargs):
+        journal = ImportJournal.for_registry_root(tmp_path)
+        journals.append(journal)
+        return ImportPipeline(FakeParser(papers, events, failing), ArticleRegistry(tmp_path / 'registry'),
+                              FakeModel(events), db or FakeDatabase(events), journal, chunker=None, **kwargs)
+
+    yield make
+    for journal in journals:
+        journal.close()
+
+
+def join(stages, timeout=10.0):
+    """Join the threads of stages, failing instead of hanging when a worker does not stop."""
+    for stage in stages:
+        for thread in stage._threads:
+            thread.join(timeout)
+            assert not thread.is_alive(), f"{thread.name} did not stop"
+
+
+def connect(*stages):
+    for upstream, downstream in zip(stages, stages[1:]):
+        upstream.downstream = downstream
+
+
+def test_stage_order(make_pipeline):
+    events = []
+    pipeline = make_pipeline([paper(i) for i in range(5)], events, workers={'download': 3, 'parse': 3},
+                             batch_size=2, batch_max_wait=0.05, upsert_wait=True)
+    stats = pipeline.run(DAY, DAY + timedelta(days=1))
+
+    for i in range(5):
+        arxiv_id = paper(i)['arxiv_id']
+        assert [stage for event_id, stage in events if event_id == arxiv_id] == list(ImportPipeline.STAGES)
+        assert pipeline.journal.get_state(arxiv_id) == ImportJournal.UPSERTED
+    assert stats['upsert'].processed == 5
+    assert pipeline.journal.get_first_incomplete_day() is None
+
+
+def test_explicit_zero_settings(make_pipeline):
+    pipeline = make_pipeline([], [], batch_max_wait=0, queue_size=0)
+    # Zero is kept, not replaced by the configuration: flush right away, unbounded queues
+    assert (pipeline.batch_max_wait, pipeline.queue_size) == (0, 0)
+
+
+def test_bounded_queue_back_pressure():
+    produced = []
+    upstream = _Stage('produce', lambda i: produced.append(i) or [i], 1, queue.Queue())
+    downstream = _Stage('consume', lambda i: [], 1, queue.Queue(maxsize=2))
+    connect(upstream, downstream)
+    for i in range(10):
+        upstream.inbox.put(i)
+    upstream.inbox.put(_DONE)
+    upstream.start()
+
+    deadline = time.monotonic() + 5
+    while not downstream.inbox.full() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.1)
+    # The producer blocks on the full queue until the consumer catches up
+    assert downstream.inbox.qsize() == 2
+    assert len(produced) == 3
+
+    downstream.start()
+    join([upstream, downstream])
+    assert len(produced) == 10
+    assert downstream.stats.processed == 10
+
+
+def test_done_stops_all_workers():
+    received = []
+    lock = threading.Lock()
+
+    def consume(i):
+        with lock:
+            received.append(i)
+        return []
+
+    upstream = _Stage('produce', lambda i: [i], 3, queue.Queue())
+    downstream = _Stage('consume', consume, 4, queue.Queue(maxsize=2))
+    connect(upstream, downstream)
+    for i in range(20):
+        upstream.inbox.put(i)
+    for _ in range(upstream.workers):
+        upstream.inbox.put(_DONE)
+    upstream.start()
+    downstream.start()
+
+    join([upstream, downstream])
+    assert sorted(received) == list(range(20))
+    # Every downstream worker got exactly one _DONE, none is left behind
+    assert downstream.inbox.empty()
+
+
+def test_outputs_passed_on_while_produced():
+    first_received = threading.Event()
+    failures = []
+
+    def produce(n):
+        yield 0
+        # Only continues once the consumer has the first output, i.e. outputs are not collected first
+        assert first_received.wait(timeout=5)
+        yield 1
+        raise ValueError("listing broken")
+
+    received = []
+
+    def consume(i):
+        received.append(i)
+        first_received.set()
+        return []
+
+    upstream = _Stage('produce', produce, 1, queue.Queue(), on_error=lambda item, error: failures.append(item))
+    downstream = _Stage('consume', consume, 1, queue.Queue(maxsize=1))
+    connect(upstream, downstream)
+    upstream.inbox.put(2)
+    upstream.inbox.put(_DONE)
+    upstream.start()
+    downstream.start()
+
+    join([upstream, downstream])
+    # The outputs before the failure are not lost
+    assert received == [0, 1]
+    assert failures == [2]
+    assert upstream.stats.failed == 1
+
+
+def test_stage_failure_does_not_hang():
+    failures = []
+
+    def fail_odd(i):
+        if i % 2:
+            raise ValueError(f"odd {i}")
+        return [i]
+
+    def fail_hook(item, error):
+        failures.append(item)
+        raise RuntimeError("journal unavailable")
+
+    received = []
+    upstream = _Stage('produce', fail_odd, 2, queue.Queue(), on_error=fail_hook)
+    downstream = _Stage('consume', lambda i: received.append(i) or [], 1, queue.Queue(maxsize=1))
+    connect(upstream, downstream)
+    for i in range(6):
+        upstream.inbox.put(i)
+    for _ in range(upstream.workers):
+        upstream.inbox.put(_DONE)
+    upstream.start()
+    downstream.start()
+
+    join([upstream, downstream])
+    assert sorted(received) == [0, 2, 4]
+    assert sorted(failures) == [1, 3, 5]
+    assert upstream.stats.failed == 3
+    assert upstream.stats.processed == 3
+
+
+def test_failed_article_is_journaled(make_pipeline):
+    events = []
+    pipeline = make_pipeline([paper(i) for i in range(3)], events, failing=[paper(1)['arxiv_id']],
+                             batch_max_wait=0.05, upsert_wait=True)
+    stats = pipeline.run(DAY, DAY + timedelta(days=1))
+
+    assert stats['parse'].failed == 1
+    assert stats['upsert'].processed == 2
+    entry = pipeline.journal.get(paper(1)['arxiv_id'])
+    assert entry['state'] == ImportJournal.FETCHED
+    assert entry['attempts'] == 1
+    assert "No other source" in entry['error']
+    assert pipeline.journal.get_state(paper(0)['arxiv_id']) == ImportJournal.UPSERTED
+
+
+def test_batching_by_size():
+    batches = []
+    stage = _BatchingStage('batch', lambda batch: batches.append(batch) or [], 1, queue.Queue(), batch_size=3,
+                           max_wait=60.0)
+    for i in range(7):
+        stage.inbox.put(i)
+    stage.inbox.put(_DONE)
+    stage.start()
+
+    join([stage])
+    # The last, partial batch is flushed at the end
+    assert batches == [[0, 1, 2], [3, 4, 5], [6]]
+    assert stage.stats.processed == 7
+
+
+def test_batching_by_time():
+    batches = []
+    stage = _BatchingStage('batch', lambda batch: batches.append(batch) or [], 1, queue.Queue(), batch_size=100,
+                           max_wait=0.05)
+    stage.start()
+    stage.inbox.put(0)
+    stage.inbox.put(1)
+
+    deadline = time.monotonic() + 5
+    while not batches and time.monotonic() < deadline:
+        time.sleep(0.01)
+    # Flushed after the maximum wait while the stage is still running
+    assert batches == [[0, 1]]
+
+    stage.inbox.put(2)
+    stage.inbox.put(_DONE)
+    join([stage])
+    assert batches == [[0, 1], [2]]
+
+
+class UnappliedDatabase(FakeDatabase):
+    """Database acknowledging upserts without applying them until wait_for_pending_updates."""
+
+    def __init__(self, events, journal_states):
+        super().__init__(events)
+        self.journal_states = journal_states
+        self.waits = []
+
+    def insert(self, articles, embeddings, wait=True):
+        assert not wait
+        super().insert(articles, embeddings, wait)
+
+    def wait_for_pending_updates(self):
+        self.waits.append({arxiv_id: self.journal_states(arxiv_id) for batch in self.batches for arxiv_id in batch})
+
+
+def test_unapplied_upserts_journaled_after_wait(make_pipeline):
+    events = []
+    pipeline = None
+    db = UnappliedDatabase(events, lambda arxiv_id: pipeline.journal.get_state(arxiv_id))
+    pipeline = make_pipeline([paper(i) for i in range(3)], events, db=db, batch_size=2, batch_max_wait=0.05,
+                             upsert_wait=False)
+    pipeline.run(DAY, DAY + timedelta(days=1))
+
+    # Not journaled as upserted before Qdrant has applied the writes
+    assert len(db.waits) == 1
+    assert set(db.waits[0].values()) == {ImportJournal.EMBEDDED}
+    for i in range(3):
+        assert pipeline.journal.get_state(paper(i)['arxiv_id']) == ImportJournal.UPSERTED
+    assert pipeline.journal.get_first_incomplete_day() is None
+
+
+def test_metadata_only_imported_with_full_text(make_pipeline):
+    events = []
+    pipeline = make_pipeline([paper(i) for i in range(2)], events, batch_max_wait=0.05, upsert_wait=True)
+    # Imported from a snapshot before
+    pipeline.journal.mark(paper(0)['arxiv_id'], ImportJournal.METADATA_ONLY, DAY)
+    pipeline.journal.mark(paper(1)['arxiv_id'], ImportJournal.UPSERTED, DAY)
+    stats = pipeline.run(DAY, DAY + timedelta(days=1))
+
+    assert [stage for event_id, stage in events if event_id == paper(0)['arxiv_id']] == list(ImportPipeline.STAGES)
+    assert [stage for event_id, stage in events if event_id == paper(1)['arxiv_id']] == ['listing']
+    assert stats['upsert'].processed == 1
+    assert pipeline.journal.get_state(paper(0)['arxiv_id']) == ImportJournal.UPSERTED
+
+
+class WatermarkParser(FakeParser):
+    """Parser listing like a harvester, recording the watermarks it is given."""
+
+    def __init__(self, papers, events, failing=()):
+        super().__init__(papers, events, failing)
+        self.watermarks = []
+
+    def set_watermark(self, categories, day):
+        self.watermarks.append(day)
+
+
+@pytest.mark.parametrize('failing, watermarks', [
+    ((), [DAY, DAY + timedelta(days=1)]),
+    # An incomplete first day holds the watermark back, although the second day is complete
+    ((paper(1)['arxiv_id'],), []),
+])
+def test_watermark_advanced_over_completed_days(make_pipeline, failing, watermarks):
+    events = []
+    pipeline = make_pipeline([], events, batch_size=2, batch_max_wait=0.05, upsert_wait=True)
+    lister = WatermarkParser([paper(i) for i in range(3)], events, failing)
+    pipeline.parser = pipeline.lister = lister
+    pipeline.run(DAY, DAY + timedelta(days=2))
+    assert lister.watermarks == watermarks
+
+
+class FakeChunker:
+    """Chunker giving every article a chunk, except the articles of an empty main text."""
+
+    def __init__(self, empty):
+        self.empty = set(empty)
+
+    def chunk(self, article):
+        if article.arxiv_id in self.empty:
+            return []
+        return [Chunk(article.arxiv_id, 0, 'Introduction', article.main_text)]
+
+
+class ChunkDatabase(FakeDatabase):
+    def __init__(self, events):
+        super().__init__(events)
+        self.chunk_inserts = []
+
+    def insert_chunks(self, chunks, embeddings, wait=True, arxiv_ids=None):
+        assert len(chunks) == len(embeddings)
+        self.chunk_inserts.append(([chunk.arxiv_id for chunk in chunks], sorted(arxiv_ids)))
+
+
+def test_chunks_replaced_for_articles_without_chunks(make_pipeline):
+    events = []
+    db = ChunkDatabase(events)
+    pipeline = make_pipeline([paper(1), paper(2)], events, db=db, batch_size=2, batch_max_wait=1.0, upsert_wait=True)
+    pipeline.chunker = FakeChunker(empty=[paper(2)['arxiv_id']])
+    pipeline.run(DAY, DAY + timedelta(days=1))
+    # The article without chunks now is passed on, so that its earlier chunks are deleted
+    assert db.chunk_inserts == [([paper(1)['arxiv_id']], [paper(1)['arxiv_id'], paper(2)['arxiv_id']])]
@@ -0,0 +1,121 @@
+"""
+Module for metadata snapshot import tests.
+"""
+import gzip
+import json
+import pytest
+from datetime import datetime, timezone
+from src.article_registry import ArticleRegistry
+from src.arxiv_agent.ml.embedding_model_base import EmbeddingModel
+from src.importer.journal import ImportJournal
+from src.importer.pipeline import ImportPipeline
+from src.importer.snapshot import SnapshotReader
+
+
+def record(arxiv_id, categories='cs.LG', created='Wed, 7 Feb 2024 10:00:00 GMT'):
+    return {
+        'id': arxiv_id,
+        'title': 'A  Title\n  on two lines',
+        'authors': 'Namkyeong Lee and Ada Lovelace',
+        'abstract': '  An abstract\n spanning lines. ',
+        'categories': categories,
+        'versions': [{'version': 'v1', 'created': created}, {'version': 'v2', 'created': 'Fri, 9 Feb 2024'}],
+        'authors_parsed': [['Lee', 'Namkyeong', ''], ['Lovelace', 'Ada', '']],
+    }
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    path = tmp_path / 'snapshot.json.gz'
+    lines = [json.dumps(r) for r in (
+        record('2402.00001'),
+        record('2402.00002', categories='math.AG'),
+        record('2401.00003', created='Mon, 1 Jan 2024 10:00:00 GMT'),
+        record('cs/0112017'),
+    )]
+    lines.insert(2, '{"id": "2402.00004", "categories": "cs.LG"')
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+    return path
+
+
+def test_to_paper():
+    paper = SnapshotReader.to_paper(record('2402.00001'))
+    assert paper == {
+        'arxiv_id': '2402.00001v2',
+        'title': 'A Title on two lines',
+        'authors': ['Namkyeong Lee', 'Ada Lovelace'],
+        'published': '2024-02-07T10:00:00Z',
+        'abstract': 'An abstract spanning lines.',
+        'categories': ['cs.LG'],
+    }
+    assert SnapshotReader.to_paper(record('hep-th/9901001')) is None
+
+
+def test_read_filtered(snapshot):
+    reader = SnapshotReader(snapshot, ['cs.LG', 'cs.AI'], start=datetime(2024, 2, 1, tzinfo=timezone.utc))
+    assert [paper['arxiv_id'] for paper in reader] == ['2402.00001v2']
+    assert reader.stats.lines == 5
+    assert reader.stats.matched == 1
+    assert reader.stats.invalid == 1
+    assert reader.stats.unsupported_ids == 1
+
+
+class FakeModel(EmbeddingModel):
+    def encode(self, text):
+        return [float(len(text))]
+
+    def encode_batch(self, texts, batch_size=32):
+        return [[float(len(text))] for text in texts]
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.articles = []
+
+    def insert(self, articles, embeddings, wait=True):
+        assert embeddings.shape == (len(articles), 1)
+        self.articles.extend(articles)
+
+    def wait_for_pending_updates(self):
+        pass
+
+
+def test_run_snapshot(tmp_path, monkeypatch, snapshot):
+    monkeypatch.setenv('APP_NAME', 'arxiv_parser')
+    monkeypatch.setenv('ENV', 'dev')
+    journal = ImportJournal.for_registry_root(tmp_path)
+    db = FakeDatabase()
+    pipeline = ImportPipeline(None, ArticleRegistry(tmp_path / 'registry'), FakeModel(), db, journal)
+
+    stats = pipeline.run_snapshot(SnapshotReader(snapshot, ['cs.LG']))
+    assert [article.arxiv_id for article in db.articles] == ['2402.00001v2', '2401.00003v2']
+    assert db.articles[0].main_text == 'An abstract spanning lines.'
+    assert stats['upsert'].processed == 2
+    # Left for the full text import
+    assert journal.get_state('2402.00001v2') == ImportJournal.METADATA_ONLY
+
+    # A rerun skips the imported papers
+    pipeline.run_snapshot(SnapshotReader(snapshot, ['cs.LG']))
+    assert len(db.articles) == 2
+    journal.close()
+
+
+def test_run_snapshot_journals_batches(tmp_path, monkeypatch, snapshot):
+    monkeypatch.setenv('APP_NAME', 'arxiv_parser')
+    monkeypatch.setenv('ENV', 'dev')
+    journal = ImportJournal.for_registry_root(tmp_path)
+    marks = []
+    mark = journal.mark
+    monkeypatch.setattr(journal, 'mark', lambda arxiv_ids, state, day=None, source=None: (
+        marks.append((list(arxiv_ids), state, day)), mark(arxiv_ids, state, day, source)))
+    pipeline = ImportPipeline(None, ArticleRegistry(tmp_path / 'registry'), FakeModel(), FakeDatabase(), journal,
+                              batch_size=2, batch_max_wait=60)
+
+    pipeline.run_snapshot(SnapshotReader(snapshot, ['cs.LG']))
+    # Only the upserted batch is journaled, with one call per published day of its papers
+    assert sorted(marks) == [
+        (['2401.00003v2'], ImportJournal.METADATA_ONLY, datetime(2024, 1, 1, tzinfo=timezone.utc)),
+        (['2402.00001v2'], ImportJournal.METADATA_ONLY, datetime(2024, 2, 7, tzinfo=timezone.utc)),
+    ]
+    journal.close()